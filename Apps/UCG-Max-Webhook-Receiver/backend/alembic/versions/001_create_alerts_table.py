@@ -26,11 +26,12 @@ def upgrade():
         sa.Column('summary', sa.Text(), nullable=False),
         sa.Column('details', sa.JSON(), nullable=True),
         sa.Column('raw_payload', sa.JSON(), nullable=True),
-        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
-        sa.Column('received_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('received_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
         sa.Column('idempotency_key', sa.String(255), nullable=True),
         sa.PrimaryKeyConstraint('id'),
-        sa.UniqueConstraint('alert_id')
+        # Named like PostgreSQL's default so migration 003 can drop it on every database
+        sa.UniqueConstraint('alert_id', name='alerts_alert_id_key')
     )
     op.create_index('idx_alerts_timestamp', 'alerts', ['timestamp'], unique=False)
     op.create_index('idx_alerts_severity', 'alerts', ['severity'], unique=False)
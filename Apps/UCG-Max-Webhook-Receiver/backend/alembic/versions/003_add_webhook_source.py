@@ -14,6 +14,17 @@ down_revision = '002'
 branch_labels = None
 depends_on = None
 
+# Fields made nullable for generic webhooks
+NULLABLE_COLUMNS = (
+    ('source', sa.String(255)),
+    ('device', sa.String(255)),
+    ('severity', sa.String(50)),
+    ('alert_type', sa.String(100)),
+    ('summary', sa.Text()),
+    ('details', sa.JSON()),
+    ('idempotency_key', sa.String(255)),
+)
+
 
 def upgrade():
     # Add webhook_source column with default value
@@ -22,6 +33,14 @@ def upgrade():
     # Create index on webhook_source
     op.create_index('idx_alerts_webhook_source', 'alerts', ['webhook_source'])
     
+    if op.get_bind().dialect.name == 'sqlite':
+        # SQLite cannot drop constraints or alter columns in place; batch mode copies the table
+        with op.batch_alter_table('alerts') as batch_op:
+            batch_op.drop_constraint('alerts_alert_id_key', type_='unique')
+            for name, type_ in NULLABLE_COLUMNS:
+                batch_op.alter_column(name, existing_type=type_, nullable=True)
+        return
+
     # Drop unique constraint on alert_id (if it exists)
     try:
         op.drop_constraint('alerts_alert_id_key', 'alerts', type_='unique')
@@ -30,13 +49,8 @@ def upgrade():
         pass
     
     # Make fields nullable for generic webhooks
-    op.alter_column('alerts', 'source', existing_type=sa.String(255), nullable=True)
-    op.alter_column('alerts', 'device', existing_type=sa.String(255), nullable=True)
-    op.alter_column('alerts', 'severity', existing_type=sa.String(50), nullable=True)
-    op.alter_column('alerts', 'alert_type', existing_type=sa.String(100), nullable=True)
-    op.alter_column('alerts', 'summary', existing_type=sa.Text(), nullable=True)
-    op.alter_column('alerts', 'details', existing_type=sa.JSON(), nullable=True)
-    op.alter_column('alerts', 'idempotency_key', existing_type=sa.String(255), nullable=True)
+    for name, type_ in NULLABLE_COLUMNS:
+        op.alter_column('alerts', name, existing_type=type_, nullable=True)
 
 
 def downgrade():
@@ -44,14 +58,16 @@ def downgrade():
     op.drop_index('idx_alerts_webhook_source')
     op.drop_column('alerts', 'webhook_source')
     
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table('alerts') as batch_op:
+            batch_op.create_unique_constraint('alerts_alert_id_key', ['alert_id'])
+            for name, type_ in NULLABLE_COLUMNS:
+                batch_op.alter_column(name, existing_type=type_, nullable=False)
+        return
+
     # Re-add unique constraint on alert_id
     op.create_unique_constraint('alerts_alert_id_key', 'alerts', ['alert_id'])
     
     # Make fields not nullable
-    op.alter_column('alerts', 'source', existing_type=sa.String(255), nullable=False)
-    op.alter_column('alerts', 'device', existing_type=sa.String(255), nullable=False)
-    op.alter_column('alerts', 'severity', existing_type=sa.String(50), nullable=False)
-    op.alter_column('alerts', 'alert_type', existing_type=sa.String(100), nullable=False)
-    op.alter_column('alerts', 'summary', existing_type=sa.Text(), nullable=False)
-    op.alter_column('alerts', 'details', existing_type=sa.JSON(), nullable=False)
-    op.alter_column('alerts', 'idempotency_key', existing_type=sa.String(255), nullable=False)
+    for name, type_ in NULLABLE_COLUMNS:
+        op.alter_column('alerts', name, existing_type=type_, nullable=False)
@@ -0,0 +1,27 @@
+"""add (timestamp, id) index for keyset pagination
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17 09:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keyset pagination orders by timestamp, so backfill rows stored without one
+    op.execute("UPDATE alerts SET timestamp = received_at WHERE timestamp IS NULL")
+
+    # Composite index backing ORDER BY timestamp DESC, id DESC and the cursor predicate
+    op.create_index('idx_alerts_timestamp_id', 'alerts', ['timestamp', 'id'])
+
+
+def downgrade():
+    op.drop_index('idx_alerts_timestamp_id', table_name='alerts')
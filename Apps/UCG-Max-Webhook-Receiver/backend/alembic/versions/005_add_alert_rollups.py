@@ -0,0 +1,45 @@
+"""add alert rollup tables
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Hourly counts per (bucket, webhook_source, severity, alert_type, device);
+    # empty strings stand in for NULL so the unique constraint identifies each row
+    op.create_table('alert_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('bucket', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('webhook_source', sa.String(100), nullable=False, server_default=''),
+        sa.Column('severity', sa.String(50), nullable=False, server_default=''),
+        sa.Column('alert_type', sa.String(100), nullable=False, server_default=''),
+        sa.Column('device', sa.String(255), nullable=False, server_default=''),
+        sa.Column('count', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('bucket', 'webhook_source', 'severity', 'alert_type', 'device', name='uq_alert_rollups_dims')
+    )
+
+    # Materialization watermark, one row per rollup
+    op.create_table('alert_rollup_state',
+        sa.Column('name', sa.String(50), nullable=False),
+        sa.Column('last_alert_id', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('pending_alert_id', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('alert_rollup_state')
+    op.drop_table('alert_rollups')
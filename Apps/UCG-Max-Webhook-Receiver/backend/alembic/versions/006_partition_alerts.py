@@ -0,0 +1,30 @@
+"""partition alerts by received_at when ALERTS_PARTITIONING is set
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17 11:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app import partitioning
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Opt-in: without ALERTS_PARTITIONING (or on SQLite) the plain table is kept.
+    # Large existing tables can be converted ahead of time with scripts/partition_alerts.py.
+    bind = op.get_bind()
+    if partitioning.enabled(bind.dialect.name):
+        partitioning.convert_table(bind)
+
+
+def downgrade():
+    # Partitioned tables are left in place; they behave like the plain table for the app
+    pass
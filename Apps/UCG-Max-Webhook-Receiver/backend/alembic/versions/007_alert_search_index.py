@@ -0,0 +1,79 @@
+"""add full-text search document and index for alerts
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app import models, partitioning, search
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+alerts = sa.table(
+    'alerts',
+    sa.column('id', sa.Integer),
+    *[sa.column(name, sa.Text) for name in search.DOCUMENT_FIELDS],
+    sa.column('details', sa.JSON),
+    sa.column('raw_payload', sa.JSON),
+    sa.column('search_text', sa.Text),
+)
+
+
+def backfill(bind):
+    """Build search documents for existing alerts in id batches."""
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(alerts).where(alerts.c.id > last_id).order_by(alerts.c.id).limit(BATCH_SIZE)
+        ).mappings().all()
+        if not rows:
+            break
+        bind.execute(
+            alerts.update().where(alerts.c.id == sa.bindparam('row_id')).values(search_text=sa.bindparam('document')),
+            [{'row_id': row['id'], 'document': search.document(dict(row))} for row in rows],
+        )
+        last_id = rows[-1]['id']
+
+
+def upgrade():
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+    # A table partitioned by 006 was created from the current model and already has the column
+    if 'search_text' not in {c['name'] for c in sa.inspect(bind).get_columns('alerts')}:
+        op.add_column('alerts', sa.Column('search_text', sa.Text(), nullable=True))
+    backfill(bind)
+
+    # Indexes are built after the backfill so rows are indexed once
+    if dialect == 'postgresql':
+        op.execute("CREATE INDEX IF NOT EXISTS idx_alerts_search ON alerts USING gin (to_tsvector('simple', search_text))")
+    elif dialect in ('mysql', 'mariadb'):
+        if not (partitioning.enabled(dialect) and partitioning.is_partitioned(bind)):
+            op.execute("CREATE FULLTEXT INDEX idx_alerts_search_fulltext ON alerts (search_text)")
+    elif dialect == 'sqlite':
+        for statement in models.SQLITE_FTS_DDL:
+            op.execute(statement)
+        op.execute("INSERT INTO alerts_fts(alerts_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS idx_alerts_search")
+    elif dialect in ('mysql', 'mariadb'):
+        if 'idx_alerts_search_fulltext' in {i['name'] for i in sa.inspect(bind).get_indexes('alerts')}:
+            op.drop_index('idx_alerts_search_fulltext', table_name='alerts')
+    elif dialect == 'sqlite':
+        for trigger in ('alerts_fts_ai', 'alerts_fts_ad', 'alerts_fts_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS alerts_fts")
+    op.drop_column('alerts', 'search_text')
@@ -0,0 +1,50 @@
+"""make (webhook_source, idempotency_key) unique
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-17 13:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app import partitioning
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+CONSTRAINT = 'uq_alerts_source_idempotency_key'
+
+
+def upgrade():
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+    if partitioning.enabled(dialect) and partitioning.is_partitioned(bind):
+        # Unique keys on partitioned tables must include received_at; handlers look keys up instead
+        return
+
+    # Earlier check-then-insert races may have stored duplicates; keep the key on the
+    # first copy only so the constraint can be created without deleting alerts
+    op.execute(
+        "UPDATE alerts SET idempotency_key = NULL "
+        "WHERE idempotency_key IS NOT NULL AND id NOT IN ("
+        "SELECT id FROM (SELECT MIN(id) AS id FROM alerts WHERE idempotency_key IS NOT NULL "
+        "GROUP BY webhook_source, idempotency_key) AS first_copy)"
+    )
+    if dialect == 'sqlite':
+        op.create_index(CONSTRAINT, 'alerts', ['webhook_source', 'idempotency_key'], unique=True)
+    else:
+        op.create_unique_constraint(CONSTRAINT, 'alerts', ['webhook_source', 'idempotency_key'])
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if bind.dialect.name == 'sqlite':
+        if CONSTRAINT in {i['name'] for i in inspector.get_indexes('alerts')}:
+            op.drop_index(CONSTRAINT, table_name='alerts')
+    elif CONSTRAINT in {c['name'] for c in inspector.get_unique_constraints('alerts')}:
+        op.drop_constraint(CONSTRAINT, 'alerts', type_='unique')
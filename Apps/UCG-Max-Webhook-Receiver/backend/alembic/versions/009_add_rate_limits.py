@@ -0,0 +1,28 @@
+"""add rate_limits table for shared rate limiting
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-17 18:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # GCRA theoretical arrival time per limiter key, used when RATE_LIMIT_STORAGE=database
+    op.create_table('rate_limits',
+        sa.Column('key', sa.String(255), nullable=False),
+        sa.Column('tat', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade():
+    op.drop_table('rate_limits')
@@ -0,0 +1,40 @@
+"""add alert_payloads for compact payload storage
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-17 20:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Content-addressed details/raw_payload documents, used when PAYLOAD_STORAGE=compact
+    op.create_table('alert_payloads',
+        sa.Column('digest', sa.String(64), nullable=False),
+        sa.Column('encoding', sa.String(10), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('data', sa.LargeBinary().with_variant(mysql.MEDIUMBLOB(), 'mysql', 'mariadb'), nullable=False),
+        sa.PrimaryKeyConstraint('digest')
+    )
+    # A table partitioned by 006 was created from the current model and already has both
+    inspector = sa.inspect(op.get_bind())
+    if 'payload_digest' not in {c['name'] for c in inspector.get_columns('alerts')}:
+        op.add_column('alerts', sa.Column('payload_digest', sa.String(64), nullable=True))
+    # Retention looks blobs up by reference to find the unreferenced ones
+    if 'ix_alerts_payload_digest' not in {i['name'] for i in inspector.get_indexes('alerts')}:
+        op.create_index('ix_alerts_payload_digest', 'alerts', ['payload_digest'])
+
+
+def downgrade():
+    op.drop_index('ix_alerts_payload_digest', table_name='alerts')
+    op.drop_column('alerts', 'payload_digest')
+    op.drop_table('alert_payloads')
@@ -0,0 +1,82 @@
+"""replace single-column alert indexes with (filter, timestamp, id) composites
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-17 18:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app import partitioning
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+# Lists filter on one column and order by (timestamp, id) DESC
+COMPOSITE_INDEXES = {
+    'idx_alerts_severity_timestamp': ['severity', 'timestamp', 'id'],
+    'idx_alerts_type_timestamp': ['alert_type', 'timestamp', 'id'],
+    'idx_alerts_device_timestamp': ['device', 'timestamp', 'id'],
+    'idx_alerts_source_timestamp': ['webhook_source', 'timestamp', 'id'],
+}
+
+# Created by migrations 001 and 003; each is a prefix of a composite above
+SINGLE_COLUMN_INDEXES = {
+    'idx_alerts_timestamp': ['timestamp'],
+    'idx_alerts_severity': ['severity'],
+    'idx_alerts_type': ['alert_type'],
+    'idx_alerts_device': ['device'],
+    'idx_alerts_webhook_source': ['webhook_source'],
+}
+
+# Created by Base.metadata.create_all on databases that were never migrated:
+# duplicates of the primary key, the unique idempotency key and the indexes
+# above, or on columns no query filters by
+CREATE_ALL_INDEXES = (
+    'ix_alerts_id', 'ix_alerts_alert_id', 'ix_alerts_webhook_source', 'ix_alerts_source',
+    'ix_alerts_device', 'ix_alerts_severity', 'ix_alerts_alert_type', 'ix_alerts_timestamp',
+    'ix_alerts_idempotency_key',
+)
+
+UNIQUE_KEY = 'uq_alerts_source_idempotency_key'
+
+
+def existing_indexes(bind):
+    inspector = sa.inspect(bind)
+    # SQLite lists a unique index from migration 008 as an index, and the
+    # constraint from create_all only as a unique constraint
+    names = {i['name'] for i in inspector.get_indexes('alerts')}
+    return names | {c['name'] for c in inspector.get_unique_constraints('alerts')}
+
+
+def upgrade():
+    bind = op.get_bind()
+    existing = existing_indexes(bind)
+
+    # Build the replacements first so filtered lists never lose their index
+    for name, columns in COMPOSITE_INDEXES.items():
+        if name not in existing:
+            op.create_index(name, 'alerts', columns)
+
+    if UNIQUE_KEY not in existing and partitioning.IDEMPOTENCY_INDEX not in existing:
+        # Partitioned tables have no unique key; keep the duplicate lookup indexed
+        op.create_index(partitioning.IDEMPOTENCY_INDEX, 'alerts', ['webhook_source', 'idempotency_key'])
+
+    for name in list(SINGLE_COLUMN_INDEXES) + list(CREATE_ALL_INDEXES):
+        if name in existing:
+            op.drop_index(name, table_name='alerts')
+
+
+def downgrade():
+    bind = op.get_bind()
+    existing = existing_indexes(bind)
+    for name, columns in SINGLE_COLUMN_INDEXES.items():
+        if name not in existing:
+            op.create_index(name, 'alerts', columns)
+    for name in COMPOSITE_INDEXES:
+        if name in existing:
+            op.drop_index(name, table_name='alerts')
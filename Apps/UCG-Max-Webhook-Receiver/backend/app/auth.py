@@ -2,12 +2,59 @@ from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
 from passlib.context import CryptContext
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from typing import Optional, Tuple
+import hashlib
+import hmac
+import threading
+import time
 from .config import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
+class TokenCache:
+    """Bounded LRU of verified JWTs: token -> (username, exp), dropped once expired."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._tokens: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[str]:
+        with self._lock:
+            entry = self._tokens.get(token)
+            if entry is None or entry[1] <= time.time():
+                if entry is not None:
+                    del self._tokens[token]
+                self.misses += 1
+                return None
+            self._tokens.move_to_end(token)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, token: str, username: str, exp: float):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._tokens[token] = (username, exp)
+            self._tokens.move_to_end(token)
+            while len(self._tokens) > self.maxsize:
+                self._tokens.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"size": len(self._tokens), "hits": self.hits, "misses": self.misses}
+
+token_cache = TokenCache(settings.token_cache_size)
+
+_admin_hash: Optional[str] = None
+_admin_hash_lock = threading.Lock()
+# Keyed digest of the last password that passed bcrypt, so repeat logins skip it
+_verified_digest: Optional[bytes] = None
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -24,38 +71,67 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm="HS256")
     return encoded_jwt
 
+def admin_password_hash() -> str:
+    """bcrypt hash of the admin password: ADMIN_PASSWORD_HASH, or ADMIN_PASSWORD hashed once."""
+    global _admin_hash
+    if _admin_hash is None:
+        with _admin_hash_lock:
+            if _admin_hash is None:
+                _admin_hash = settings.admin_password_hash or get_password_hash(settings.admin_password)
+    return _admin_hash
+
+def _password_digest(password: str) -> bytes:
+    return hmac.new(settings.secret_key.encode(), password.encode(), hashlib.sha256).digest()
+
 def authenticate_user(username: str, password: str):
-    if username == settings.admin_user and verify_password(password, get_password_hash(settings.admin_password)):
+    global _verified_digest
+    if username != settings.admin_user:
+        return False
+    digest = _password_digest(password)
+    if _verified_digest is not None and hmac.compare_digest(digest, _verified_digest):
+        return {"username": username}
+    # Wrong passwords always pay the full bcrypt cost
+    if verify_password(password, admin_password_hash()):
+        _verified_digest = digest
         return {"username": username}
     return False
 
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    token = credentials.credentials
+    username = token_cache.get(token)
+    if username is not None:
+        return username
     try:
-        payload = jwt.decode(credentials.credentials, settings.secret_key, algorithms=["HS256"])
+        payload = jwt.decode(token, settings.secret_key, algorithms=["HS256"])
         username: str = payload.get("sub")
         if username is None:
             raise HTTPException(status_code=401, detail="Invalid token")
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    token_cache.put(token, username, payload.get("exp", float("inf")))
     return username
 
-def verify_hmac_or_bearer(request_body: bytes, headers: dict):
+def verify_bearer(headers) -> bool:
     auth_header = headers.get('authorization')
     if auth_header and auth_header.startswith('Bearer '):
-        token = auth_header.split(' ')[1]
-        if token == settings.bearer_token:
-            return True
-    # HMAC
+        return auth_header.split(' ')[1] == settings.bearer_token
+    return False
+
+def provided_signature(headers) -> Optional[str]:
+    """Hex HMAC-SHA256 from X-Hub-Signature-256 / X-Hub-Signature, without the sha256= prefix."""
     signature = headers.get('x-hub-signature-256') or headers.get('x-hub-signature')
-    if signature:
-        import hmac
-        import hashlib
-        secret = settings.hmac_secret.encode()
-        expected = hmac.new(secret, request_body, hashlib.sha256).hexdigest()
-        if signature.startswith('sha256='):
-            provided = signature.split('=')[1]
-        else:
-            provided = signature
-        if hmac.compare_digest(expected, provided):
-            return True
-    return False
\ No newline at end of file
+    if not signature:
+        return None
+    return signature.split('=')[1] if signature.startswith('sha256=') else signature
+
+def body_hmac(body: bytes = b""):
+    """HMAC-SHA256 of a request body under HMAC_SECRET; update() it as further chunks arrive."""
+    return hmac.new(settings.hmac_secret.encode(), body, hashlib.sha256)
+
+def signature_matches(mac, provided: Optional[str]) -> bool:
+    return provided is not None and hmac.compare_digest(mac.hexdigest(), provided)
+
+def verify_hmac_or_bearer(request_body: bytes, headers: dict):
+    if verify_bearer(headers):
+        return True
+    return signature_matches(body_hmac(request_body), provided_signature(headers))
@@ -0,0 +1,111 @@
+"""Compact payload storage (PAYLOAD_STORAGE=compact).
+
+The generic path stores the whole request body as raw_payload next to the
+columns mapped from it, so payload JSON dominates table size and I/O. In compact
+mode an alert's details and raw_payload are serialized canonically into one
+document, hashed, compressed and stored once in alert_payloads keyed by the
+digest; the alert row only carries payload_digest. Repeated identical alerts
+share one blob, list queries never read blobs, and /api/alerts/{id} unpacks
+its blob on demand. Rows written before switching keep their inline columns.
+"""
+import hashlib
+import json
+import logging
+import zlib
+from typing import List, Optional, Tuple
+
+from sqlalchemy import delete, exists, select
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import settings
+
+try:
+    import zstandard
+except ImportError:  # only needed for PAYLOAD_COMPRESSION=zstd
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+PAYLOAD_FIELDS = ('details', 'raw_payload')
+
+if settings.payload_storage not in ("inline", "compact"):
+    raise ValueError(f"Unknown PAYLOAD_STORAGE {settings.payload_storage!r}, expected inline or compact")
+if settings.payload_compression not in ("zlib", "zstd"):
+    raise ValueError(f"Unknown PAYLOAD_COMPRESSION {settings.payload_compression!r}, expected zlib or zstd")
+if settings.payload_compression == "zstd" and zstandard is None:
+    raise ValueError("PAYLOAD_COMPRESSION=zstd needs the zstandard package installed")
+
+
+def enabled() -> bool:
+    return settings.payload_storage == "compact"
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return zlib.compress(data, 6)
+
+
+def decompress(data: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd payload blobs need the zstandard package installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def pack(alert: dict) -> Tuple[dict, Optional[dict]]:
+    """Split a row dict into the alert row without payloads and its alert_payloads row.
+
+    The caller's dict is left untouched so a failed batch can be retried as is.
+    """
+    row = {k: v for k, v in alert.items() if k not in PAYLOAD_FIELDS}
+    document = {name: alert.get(name) for name in PAYLOAD_FIELDS}
+    if all(value is None for value in document.values()):
+        row["payload_digest"] = None
+        return row, None
+    # Canonical form, so the same content always hashes to the same digest
+    data = json.dumps(document, sort_keys=True, separators=(",", ":"), default=str).encode()
+    digest = hashlib.sha256(data).hexdigest()
+    row["payload_digest"] = digest
+    encoding = settings.payload_compression
+    return row, {"digest": digest, "encoding": encoding, "size": len(data), "data": compress(data, encoding)}
+
+
+def pack_all(alerts: List[dict]) -> Tuple[List[dict], List[dict]]:
+    """Alert rows carrying digests only, and the distinct blobs they refer to."""
+    rows, blobs = [], {}
+    for alert in alerts:
+        row, blob = pack(alert)
+        rows.append(row)
+        if blob is not None:
+            blobs[blob["digest"]] = blob
+    # Sorted so concurrent writers take blob row locks in the same order
+    return rows, [blobs[digest] for digest in sorted(blobs)]
+
+
+def unpack(db: Session, digest: str) -> dict:
+    """details and raw_payload stored under ``digest``."""
+    blob = db.get(models.AlertPayload, digest)
+    if blob is None:
+        logger.warning(f"Payload blob {digest} is missing")
+        return {}
+    return json.loads(decompress(blob.data, blob.encoding))
+
+
+def purge_orphans(db: Session, chunk_size: int = 1000) -> int:
+    """Delete blobs no alert refers to any more, in bounded chunks."""
+    table = models.AlertPayload.__table__
+    orphans = select(table.c.digest).where(
+        ~exists().where(models.Alert.payload_digest == table.c.digest)
+    ).limit(chunk_size)
+    purged = 0
+    while True:
+        digests = db.execute(orphans).scalars().all()
+        if not digests:
+            return purged
+        purged += db.execute(delete(table).where(table.c.digest.in_(digests))).rowcount
+        db.commit()
+        if len(digests) < chunk_size:
+            return purged
@@ -0,0 +1,143 @@
+"""In-memory cache of encoded /api/alerts and /api/alerts/{id} responses.
+
+Entries are invalidated by generation counters rather than by scanning: there
+is one counter per severity, device and alert_type value, plus one for all
+alerts. Writing or deleting an alert bumps the counters for its values. A
+cached list depends on the counters of its equality filters, or on the global
+counter when it has none, and is only served while those are unchanged. Bulk
+deletes and retention bump an epoch that every entry depends on.
+
+Counters are captured before the query runs, so a write that lands during the
+query leaves the new entry already stale. Like the /api/metrics counters the
+cache is per process; with several workers, writes through other workers are
+only picked up when ALERT_CACHE_TTL expires.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, NamedTuple, Optional, Tuple
+
+from .config import settings
+
+# Filters compared by equality, which a written alert can be matched against
+KEYED_FILTERS = ('severity', 'device', 'alert_type')
+
+# Larger responses (huge page_size) are served but not kept
+MAX_ENTRY_BYTES = 1024 * 1024
+
+# Distinct filter values tracked before the counters are reset by an epoch bump
+MAX_GENERATIONS = 100000
+
+
+class Entry(NamedTuple):
+    body: bytes
+    etag: str
+    generations: tuple
+    expires: float
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """RFC 9110 weak comparison against an If-None-Match header."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+
+def _normalize(value) -> str:
+    # MySQL's default collations compare case-insensitively, so keyed values must too
+    return str(value).strip().lower()
+
+
+def _field(alert, name: str):
+    return alert.get(name) if isinstance(alert, dict) else getattr(alert, name, None)
+
+
+class ResultCache:
+    def __init__(self, maxsize: int = 1000, ttl: float = 30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Entry]" = OrderedDict()
+        self._generations: Dict[Tuple[str, str], int] = {}
+        self.epoch = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def generations(self, filters: Optional[dict]) -> tuple:
+        """Counters a result for ``filters`` depends on; None for single-alert lookups."""
+        with self._lock:
+            if filters is None:
+                return (self.epoch,)
+            keyed = [(name, _normalize(filters[name])) for name in KEYED_FILTERS if filters.get(name)]
+            return (self.epoch,) + tuple(self._generations.get(key, 0) for key in keyed or [("*", "")])
+
+    def get(self, key: Hashable, generations: tuple) -> Optional[Entry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.generations != generations or entry.expires < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, generations: tuple, body: bytes) -> Entry:
+        entry = Entry(body, make_etag(body), generations, time.monotonic() + self.ttl)
+        if not self.enabled or len(body) > MAX_ENTRY_BYTES:
+            return entry
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate(self, alerts: Iterable) -> None:
+        """Bump the counters of alerts (dicts or ORM rows) just written or deleted."""
+        with self._lock:
+            keys = {("*", "")}
+            for alert in alerts:
+                keys.update((name, _normalize(_field(alert, name))) for name in KEYED_FILTERS if _field(alert, name))
+            if len(self._generations) + len(keys) > MAX_GENERATIONS:
+                self._clear()
+                return
+            for key in keys:
+                self._generations[key] = self._generations.get(key, 0) + 1
+
+    def _clear(self) -> None:
+        self.epoch += 1
+        self._entries.clear()
+        self._generations.clear()
+
+    def clear(self) -> None:
+        """Drop everything, for deletes that cannot be attributed to single alerts."""
+        with self._lock:
+            self._clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "epoch": self.epoch,
+            }
+
+
+alert_cache = ResultCache(maxsize=settings.alert_cache_size, ttl=settings.alert_cache_ttl)
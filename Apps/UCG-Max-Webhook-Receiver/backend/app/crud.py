@@ -1,20 +1,167 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_, func
-from . import models, schemas
-from datetime import datetime, timedelta
+from sqlalchemy import String, cast, or_, and_, func, insert, text, tuple_
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from . import blobs, idempotency, models, partitioning, schemas, search, telemetry
+from .config import settings
+from datetime import datetime, timedelta, timezone
+import base64
+import json
+import time
 
-def create_alert(db: Session, alert: schemas.AlertCreate):
-    db_alert = models.Alert(**alert.dict())
+def create_alert(db: Session, alert):
+    """Insert one alert, given as an AlertCreate or an already-mapped row dict."""
+    data = alert if isinstance(alert, dict) else alert.model_dump()
+    search_text = search.document(data)
+    rows, blob_rows = blobs.pack_all([data]) if blobs.enabled() else ([data], [])
+    db_alert = models.Alert(**rows[0], search_text=search_text)
     db.add(db_alert)
-    db.commit()
+    try:
+        with telemetry.stage("insert"):
+            if blob_rows:
+                db.execute(insert_ignoring_duplicates(db, models.AlertPayload), blob_rows)
+            db.flush()
+        with telemetry.stage("commit"):
+            db.commit()
+    except IntegrityError:
+        # (webhook_source, idempotency_key) already stored; the caller reports a duplicate
+        db.rollback()
+        raise
     db.refresh(db_alert)
     return db_alert
 
+# How each database names the idempotency key in a duplicate-key error:
+# the constraint on PostgreSQL/MariaDB/MySQL, its columns on SQLite
+IDEMPOTENCY_KEY_MARKERS = ('uq_alerts_source_idempotency_key', 'alerts.webhook_source, alerts.idempotency_key')
+
+def is_duplicate_key(error: IntegrityError) -> bool:
+    """Whether ``error`` is the (webhook_source, idempotency_key) unique key, not e.g. a NOT NULL column."""
+    constraint = getattr(getattr(error.orig, 'diag', None), 'constraint_name', None)
+    if constraint is not None:
+        return constraint == 'uq_alerts_source_idempotency_key'
+    message = str(error.orig)
+    return any(marker in message for marker in IDEMPOTENCY_KEY_MARKERS)
+
+def insert_ignoring_duplicates(db: Session, model=models.Alert):
+    """INSERT that silently skips rows already stored: alerts by idempotency key, payload blobs by digest."""
+    dialect = db.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(model).on_conflict_do_nothing()
+    if dialect == 'sqlite':
+        return sqlite.insert(model).on_conflict_do_nothing()
+    if dialect in ('mysql', 'mariadb'):
+        key = model.__table__.primary_key.columns.values()[0]
+        return mysql.insert(model).on_duplicate_key_update({key.name: key})
+    return insert(model)
+
+def create_alerts(db: Session, alerts: list) -> list:
+    """Insert a batch of alert dicts with a single multi-row INSERT, skipping duplicate keys.
+
+    Returns the alerts that were inserted, without those the INSERT skipped
+    because their idempotency key was already stored. Each gets its ``id``
+    where the database reports it; otherwise (MariaDB/MySQL without RETURNING,
+    alerts without a key) ``inserted_after_id`` is the largest id before the
+    INSERT, which the metrics reconcile compares with.
+    """
+    if not alerts:
+        return []
+    for alert in alerts:
+        if alert.get('search_text') is None:
+            alert['search_text'] = search.document(alert)
+    rows, blob_rows = blobs.pack_all(alerts) if blobs.enabled() else (alerts, [])
+    keys = [alert_key(alert) for alert in alerts if alert.get('idempotency_key')]
+    # PostgreSQL and SQLite report the inserted rows in order; MariaDB/MySQL are compared with the ids before
+    returning = db.get_bind().dialect.insert_executemany_returning
+    before = None if returning else max_alert_id(db)
+    statement = insert_ignoring_duplicates(db)
+    with telemetry.stage("insert"):
+        if blob_rows:
+            db.execute(insert_ignoring_duplicates(db, models.AlertPayload), blob_rows)
+        if returning:
+            inserted = db.execute(statement.returning(
+                models.Alert.webhook_source, models.Alert.idempotency_key, models.Alert.id,
+                sort_by_parameter_order=True,
+            ), rows).all()
+        else:
+            db.execute(statement, rows)
+            inserted = []
+    if keys and not returning:
+        stored = db.query(models.Alert.webhook_source, models.Alert.idempotency_key, models.Alert.id).filter(
+            tuple_(models.Alert.webhook_source, models.Alert.idempotency_key).in_(keys)
+        )
+        ids = {(source, key): id for source, key, id in stored if id > before}
+    with telemetry.stage("commit"):
+        db.commit()
+    written = []
+    if returning:
+        # Rows come back in batch order, minus those skipped; alerts without a key are never skipped
+        pending = iter(inserted)
+        row = next(pending, None)
+        for alert in alerts:
+            if row is None:
+                break
+            if alert.get('idempotency_key') and alert_key(alert) != (row[0], row[1]):
+                continue
+            alert['id'] = row[2]
+            written.append(alert)
+            row = next(pending, None)
+        return written
+    for alert in alerts:
+        if not alert.get('idempotency_key'):
+            alert['inserted_after_id'] = before
+            written.append(alert)
+        elif alert_key(alert) in ids:
+            # A key repeated within the batch is inserted once
+            alert['id'] = ids.pop(alert_key(alert))
+            written.append(alert)
+    return written
+
+def alert_key(alert: dict) -> tuple:
+    """(webhook_source, idempotency_key) of an alert dict, as the unique key stores it."""
+    return (alert.get('webhook_source') or models.Alert.webhook_source.default.arg, alert['idempotency_key'])
+
 def get_alert(db: Session, alert_id: int):
     return db.query(models.Alert).filter(models.Alert.id == alert_id).first()
 
-def get_alerts(db: Session, skip: int = 0, limit: int = 100, filters: dict = None):
-    query = db.query(models.Alert)
+def get_alert_detail(db: Session, alert_id: int):
+    """One alert with details and raw_payload, unpacked from its blob when stored compactly."""
+    alert = get_alert(db, alert_id)
+    if alert is None:
+        return None
+    detail = schemas.Alert.model_validate(alert)
+    if alert.payload_digest:
+        detail = detail.model_copy(update=blobs.unpack(db, alert.payload_digest))
+    return detail
+
+def get_alert_by_idempotency_key(db: Session, idempotency_key: str, webhook_source: str = None):
+    query = db.query(models.Alert).filter(models.Alert.idempotency_key == idempotency_key)
+    if webhook_source is not None:
+        query = query.filter(models.Alert.webhook_source == webhook_source)
+    return query.first()
+
+def existing_idempotency_keys(db: Session, keys: list) -> set:
+    """The (webhook_source, idempotency_key) pairs among ``keys`` that are already stored."""
+    if not keys:
+        return set()
+    rows = db.query(models.Alert.webhook_source, models.Alert.idempotency_key).filter(
+        tuple_(models.Alert.webhook_source, models.Alert.idempotency_key).in_(keys)
+    )
+    return {tuple(row) for row in rows}
+
+def encode_cursor(alert) -> str:
+    """Opaque keyset cursor pointing just past ``alert`` in (timestamp, id) DESC order."""
+    raw = json.dumps([alert.timestamp.isoformat() if alert.timestamp else None, alert.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        timestamp, alert_id = json.loads(raw)
+        return (datetime.fromisoformat(timestamp) if timestamp else None), int(alert_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def apply_filters(query, filters: dict = None):
     if filters:
         if filters.get('severity'):
             query = query.filter(models.Alert.severity == filters['severity'])
@@ -24,29 +171,151 @@ def get_alerts(db: Session, skip: int = 0, limit: int = 100, filters: dict = Non
             query = query.filter(models.Alert.device == filters['device'])
         if filters.get('start'):
             query = query.filter(models.Alert.timestamp >= filters['start'])
+            if partitioning.enabled(query.session.get_bind().dialect.name, warn=False):
+                # Implied bound on the partition key so the planner can skip old partitions;
+                # alerts stamped more than PARTITION_SKEW_HOURS after receipt fall outside it
+                try:
+                    start = datetime.fromisoformat(str(filters['start']))
+                    query = query.filter(models.Alert.received_at >= partitioning.received_lower_bound(start))
+                except ValueError:
+                    pass
         if filters.get('end'):
             query = query.filter(models.Alert.timestamp <= filters['end'])
         if filters.get('q'):
-            q = filters['q']
-            # Simple search on summary field only for cross-database compatibility
-            # JSON searching is database-specific and removed for MariaDB/MySQL support
-            query = query.filter(models.Alert.summary.ilike(f'%{q}%'))
-    return query.offset(skip).limit(limit).all()
+            # Full-text index on summary, device, source and selected payload fields
+            query = query.filter(search.match(query.session.get_bind(), filters['q']))
+        for path, value in filters.get('payload') or ():
+            query = query.filter(payload_field(query.session.get_bind().dialect.name, path) == value)
+    return query
+
+def parse_payload_filters(terms: list) -> tuple:
+    """``key:value`` terms, with dotted keys for nested objects, as ((key, ...), value) pairs."""
+    parsed = []
+    for term in terms or ():
+        path, sep, value = term.partition(':')
+        keys = tuple(path.split('.'))
+        if not sep or not all(keys):
+            raise ValueError(f"Invalid payload filter: {term} (expected key:value or a.b:value)")
+        parsed.append((keys, value))
+    return tuple(sorted(parsed))
+
+def payload_field(dialect: str, path: tuple):
+    """raw_payload value at ``path`` as text: JSON1 json_extract on SQLite, ->> / #>> on PostgreSQL."""
+    value = models.Alert.raw_payload[path if len(path) > 1 else path[0]].as_string()
+    if dialect == 'sqlite':
+        # json_extract returns numbers as numbers; compare their text like the other databases
+        value = cast(value, String)
+    return value
+
+# Columns a list request may select with fields=; the summary view leaves the JSON payloads out
+LIST_COLUMNS = (
+    'id', 'alert_id', 'webhook_source', 'source', 'device', 'severity', 'alert_type', 'timestamp',
+    'summary', 'details', 'raw_payload', 'idempotency_key', 'created_at', 'received_at',
+)
+SUMMARY_COLUMNS = ('id', 'alert_id', 'webhook_source', 'source', 'device', 'severity', 'alert_type', 'timestamp', 'summary', 'received_at')
+
+def alert_query(db: Session, columns: list = None):
+    """Alert entities, or plain rows of just ``columns``, which skip ORM hydration and the identity map."""
+    if columns is None:
+        return db.query(models.Alert)
+    return db.query(*[getattr(models.Alert, c) for c in columns])
+
+def list_query(db: Session, filters: dict = None, columns: list = None):
+    """Filtered alerts in list order, before paging."""
+    query = apply_filters(alert_query(db, columns), filters)
+    if filters and filters.get('q'):
+        # Most relevant matches first; keyset pages and exports stay in time order
+        query = search.order_by_relevance(query, db.get_bind(), filters['q'])
+    return query.order_by(models.Alert.timestamp.desc(), models.Alert.id.desc())
+
+def get_alerts(db: Session, skip: int = 0, limit: int = 100, filters: dict = None, columns: list = None):
+    return list_query(db, filters, columns).offset(skip).limit(limit).all()
+
+def get_alerts_page(db: Session, cursor: str = None, limit: int = 100, filters: dict = None, columns: list = None):
+    """Keyset pagination over (timestamp DESC, id DESC); every page costs one index range scan.
+
+    ``columns`` must include timestamp and id, which the next cursor is built from.
+    """
+    query = apply_filters(alert_query(db, columns), filters)
+    if cursor:
+        timestamp, alert_id = decode_cursor(cursor)
+        if timestamp is None:
+            query = query.filter(models.Alert.timestamp.is_(None), models.Alert.id < alert_id)
+        else:
+            query = query.filter(or_(
+                models.Alert.timestamp < timestamp,
+                and_(models.Alert.timestamp == timestamp, models.Alert.id < alert_id),
+            ))
+    query = query.order_by(models.Alert.timestamp.desc(), models.Alert.id.desc())
+    alerts = query.limit(limit + 1).all()
+    next_cursor = encode_cursor(alerts[limit - 1]) if 0 < limit < len(alerts) else None
+    return {"items": alerts[:limit], "next_cursor": next_cursor}
+
+def iter_alert_rows(db: Session, columns: list, filters: dict = None, chunk_size: int = 1000):
+    """Stream the given columns as Core rows through a server-side cursor."""
+    query = apply_filters(db.query(*[getattr(models.Alert, c) for c in columns]), filters)
+    query = query.order_by(models.Alert.timestamp.desc(), models.Alert.id.desc())
+    # yield_per implies stream_results, i.e. a server-side cursor on Postgres and MariaDB
+    yield from query.execution_options(yield_per=chunk_size)
 
 def delete_alert(db: Session, alert_id: int):
     db_alert = db.query(models.Alert).filter(models.Alert.id == alert_id).first()
     if db_alert:
         db.delete(db_alert)
         db.commit()
+        if db_alert.idempotency_key:
+            idempotency.forget([idempotency.key_for(db_alert.webhook_source, db_alert.idempotency_key)])
     return db_alert
 
-def bulk_delete_alerts(db: Session, filters: dict):
-    query = db.query(models.Alert)
-    if filters:
-        # Similar to get_alerts
-        pass  # Implement similar filters
-    query.delete()
-    db.commit()
+def delete_alerts_chunked(
+    db: Session,
+    filters: dict = None,
+    received_before: datetime = None,
+    max_id: int = None,
+    chunk_size: int = 1000,
+    pause: float = 0.0,
+) -> int:
+    """Delete matching alerts in bounded primary-key ranges, committing after each chunk.
+
+    Each chunk locks at most ``chunk_size`` rows and keeps the undo log small, so
+    webhooks keep inserting while a large purge runs.
+    """
+    def matching(query):
+        query = apply_filters(query, filters)
+        if received_before is not None:
+            query = query.filter(models.Alert.received_at < received_before)
+        if max_id is not None:
+            query = query.filter(models.Alert.id <= max_id)
+        return query
+
+    deleted = 0
+    last_id = 0
+    while True:
+        rows = (
+            matching(db.query(models.Alert.id, models.Alert.webhook_source, models.Alert.idempotency_key))
+            .filter(models.Alert.id > last_id)
+            .order_by(models.Alert.id)
+            .limit(chunk_size)
+            .all()
+        )
+        if not rows:
+            break
+        ids = [row[0] for row in rows]
+        low, last_id = ids[0], ids[-1]
+        deleted += (
+            matching(db.query(models.Alert))
+            .filter(models.Alert.id >= low, models.Alert.id <= last_id)
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        # Deleted alerts may be sent again without being rejected as duplicates
+        idempotency.forget(idempotency.key_for(source, key) for _, source, key in rows if key)
+        if pause and len(ids) == chunk_size:
+            time.sleep(pause)
+    return deleted
+
+def bulk_delete_alerts(db: Session, filters: dict, chunk_size: int = 1000):
+    return delete_alerts_chunked(db, filters=filters, chunk_size=chunk_size)
 
 def get_metrics(db: Session):
     total = db.query(func.count(models.Alert.id)).scalar()
@@ -58,7 +327,52 @@ def get_metrics(db: Session):
         "last_24h_count": last_24h
     }
 
-def cleanup_old_alerts(db: Session, days: int):
+BUCKET_FORMATS = {
+    # strftime patterns for databases without date_trunc
+    'minute': ('%Y-%m-%d %H:%i:00', '%Y-%m-%d %H:%M:00'),
+    'hour': ('%Y-%m-%d %H:00:00', '%Y-%m-%d %H:00:00'),
+    'day': ('%Y-%m-%d 00:00:00', '%Y-%m-%d 00:00:00'),
+}
+
+def bucket_expression(db: Session, column, granularity: str):
+    """Truncate ``column`` to the start of its minute/hour/day bucket on any supported database."""
+    dialect = db.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return func.date_trunc(granularity, column)
+    mysql_format, sqlite_format = BUCKET_FORMATS[granularity]
+    if dialect in ('mysql', 'mariadb'):
+        return func.date_format(column, mysql_format)
+    return func.strftime(sqlite_format, column)
+
+def parse_bucket(value) -> datetime:
+    """Normalise a bucket value (datetime or string, depending on dialect) to an aware UTC datetime."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def max_alert_id(db: Session) -> int:
+    return db.query(func.max(models.Alert.id)).scalar() or 0
+
+def count_alerts_by(db: Session, column: str, max_id: int = None):
+    col = getattr(models.Alert, column)
+    query = db.query(col, func.count(models.Alert.id))
+    if max_id is not None:
+        query = query.filter(models.Alert.id <= max_id)
+    return dict(query.group_by(col).all())
+
+def count_alerts_per_bucket(db: Session, granularity: str, since: datetime, max_id: int = None):
+    bucket = bucket_expression(db, models.Alert.received_at, granularity)
+    query = db.query(bucket, func.count(models.Alert.id)).filter(models.Alert.received_at >= since)
+    if max_id is not None:
+        query = query.filter(models.Alert.id <= max_id)
+    rows = query.group_by(bucket).all()
+    return {parse_bucket(b): count for b, count in rows if b is not None}
+
+def cleanup_old_alerts(db: Session, days: int, max_id: int = None, chunk_size: int = 1000, pause: float = 0.0):
     cutoff = datetime.utcnow() - timedelta(days=days)
-    db.query(models.Alert).filter(models.Alert.received_at < cutoff).delete()
-    db.commit()
\ No newline at end of file
+    return delete_alerts_chunked(db, received_before=cutoff, max_id=max_id, chunk_size=chunk_size, pause=pause)
+
+def ping(db: Session):
+    db.execute(text("SELECT 1"))
@@ -1,24 +1,175 @@
-from sqlalchemy import create_engine
+from typing import Union
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
 from .config import settings
+from .telemetry import time_checkout
 
-# Create engine with connection pool settings to prevent "MySQL server has gone away"
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,  # Test connections before using them
-    pool_recycle=3600,   # Recycle connections after 1 hour
-    pool_size=5,         # Number of connections to maintain
-    max_overflow=10,     # Allow up to 10 additional connections
-    echo=False
+def is_memory_sqlite(url: str) -> bool:
+    return url.startswith("sqlite") and (":memory:" in url or url.partition("://")[2] in ("", "/"))
+
+def is_embedded_sqlite(url: str) -> bool:
+    """A SQLite database file, served by one writer connection and a pool of readers."""
+    return url.startswith("sqlite") and not is_memory_sqlite(url)
+
+def sqlite_pragmas(read_only: bool = False) -> list:
+    """Settings applied to every embedded SQLite connection as it is opened."""
+    pragmas = [
+        # Readers never block the writer and the writer never blocks readers
+        "PRAGMA journal_mode=WAL",
+        # With WAL a commit only syncs at checkpoints; a power cut can lose the last commits, never corrupt the file
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+        f"PRAGMA cache_size=-{settings.sqlite_cache_mb * 1024}",
+        f"PRAGMA mmap_size={settings.sqlite_mmap_mb * 1024 * 1024}",
+        "PRAGMA temp_store=MEMORY",
+        # Truncate the WAL back to 64 MiB after checkpoints instead of keeping its largest size
+        f"PRAGMA journal_size_limit={64 * 1024 * 1024}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    return pragmas
+
+def tune_sqlite(engine, read_only: bool = False):
+    pragmas = sqlite_pragmas(read_only)
+
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+    return engine
+
+EMBEDDED_SQLITE = is_embedded_sqlite(settings.database_url)
+
+if EMBEDDED_SQLITE and settings.workers != 1:
+    # The single writer below is per process; several processes would contend for the file lock again
+    raise ValueError("Embedded SQLite needs WORKERS=1; use MariaDB or PostgreSQL to run several workers")
+
+if EMBEDDED_SQLITE:
+    # SQLite runs one write transaction at a time: a single writer connection makes
+    # writers queue for the pool in arrival order instead of retrying on "database is locked"
+    engine = tune_sqlite(create_engine(
+        settings.database_url,
+        pool_size=1,
+        max_overflow=0,
+        echo=False,
+        poolclass=time_checkout(QueuePool, "sync"),
+    ))
+    read_engine = tune_sqlite(create_engine(
+        settings.database_url,
+        pool_size=settings.sqlite_read_connections,
+        max_overflow=0,
+        echo=False,
+        poolclass=time_checkout(QueuePool, "read"),
+    ), read_only=True)
+else:
+    # Create engine with connection pool settings to prevent "MySQL server has gone away"
+    engine = create_engine(
+        settings.database_url,
+        pool_pre_ping=True,  # Test connections before using them
+        pool_recycle=3600,   # Recycle connections after 1 hour
+        pool_size=5,         # Number of connections to maintain
+        max_overflow=10,     # Allow up to 10 additional connections
+        echo=False,
+        # Time checkouts for /metrics; in-memory SQLite keeps its single-connection pool
+        **({} if is_memory_sqlite(settings.database_url) else {"poolclass": time_checkout(QueuePool, "sync")})
+    )
+    read_engine = None
+
+class EmbeddedSession(Session):
+    """Session that reads through the read-only pool and writes through the single writer.
+
+    Once a transaction has written, its later statements stay on the writer until
+    it ends, so it reads its own uncommitted rows.
+    """
+    _writing = False
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if clause is None:
+            # Dialect lookups and explicit db.connection() calls
+            return engine
+        if self._writing or self._flushing or not getattr(clause, "is_select", False):
+            self._writing = True
+            return engine
+        return read_engine
+
+@event.listens_for(EmbeddedSession, "after_transaction_end")
+def _end_writing(session, transaction):
+    if transaction.parent is None:
+        session._writing = False
+
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, bind=engine,
+    **({"class_": EmbeddedSession} if EMBEDDED_SQLITE else {})
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async drivers used when DATABASE_ASYNC is enabled; the sync engine above stays for Alembic
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "mariadb": "mariadb+aiomysql",
+    "mariadb+pymysql": "mariadb+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    if scheme not in ASYNC_DRIVERS:
+        if scheme in ASYNC_DRIVERS.values():
+            return url
+        raise ValueError(f"No async driver configured for database scheme '{scheme}'")
+    return f"{ASYNC_DRIVERS[scheme]}{sep}{rest}"
+
+async_engine = None
+AsyncSessionLocal = None
+if settings.database_async:
+    async_url = to_async_url(settings.database_url)
+    # aiosqlite runs without a connection pool, so pool sizing only applies to server databases
+    pool_options = {} if async_url.startswith("sqlite") else {
+        "pool_size": 5, "max_overflow": 10, "poolclass": time_checkout(AsyncAdaptedQueuePool, "async"),
+    }
+    async_engine = create_async_engine(
+        async_url,
+        pool_pre_ping=True,
+        pool_recycle=3600,
+        echo=False,
+        **pool_options
+    )
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
-def get_db():
+# Either session flavour can be handed to run_db()
+DBSession = Union[Session, AsyncSession]
+
+async def get_db():
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        await run_in_threadpool(db.close)
+
+def get_session_factory() -> sessionmaker:
+    """Session factory for work that outlives the request, such as a streamed export."""
+    return SessionLocal
+
+async def run_db(db: DBSession, fn, *args, **kwargs):
+    """Run a sync crud function without blocking the event loop.
+
+    Async sessions drive it through the async driver via ``run_sync``; sync
+    sessions run it in the threadpool.
+    """
+    if isinstance(db, Session):
+        return await run_in_threadpool(fn, db, *args, **kwargs)
+    return await db.run_sync(fn, *args, **kwargs)
@@ -0,0 +1,89 @@
+"""Streaming alert export.
+
+Rows are read through a server-side cursor and encoded in chunks as they
+arrive, so an export of any size runs in constant memory.
+"""
+import csv
+import io
+import json
+import zlib
+from typing import Callable, Iterator
+
+from sqlalchemy.orm import Session
+
+from . import crud
+
+EXPORT_COLUMNS = ['id', 'alert_id', 'timestamp', 'severity', 'alert_type', 'device', 'summary', 'source']
+CSV_HEADER = ['ID', 'Alert ID', 'Timestamp', 'Severity', 'Type', 'Device', 'Summary', 'Source']
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+CHUNK_ROWS = 1000
+
+
+def _csv_chunks(rows) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    count = 0
+    for row in rows:
+        writer.writerow([
+            row.id,
+            row.alert_id,
+            row.timestamp.isoformat() if row.timestamp else '',
+            row.severity,
+            row.alert_type,
+            row.device,
+            row.summary,
+            row.source,
+        ])
+        count += 1
+        if count % CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _ndjson_chunks(rows) -> Iterator[str]:
+    lines = []
+    for row in rows:
+        record = dict(row._mapping)
+        if record['timestamp']:
+            record['timestamp'] = record['timestamp'].isoformat()
+        lines.append(json.dumps(record))
+        if len(lines) == CHUNK_ROWS:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def _gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=31)  # 31 selects the gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_alerts(
+    filters: dict, session_factory: Callable[[], Session], fmt: str = "csv", compress: bool = False
+) -> Iterator[bytes]:
+    """Yield encoded export bytes; owns a session from ``session_factory`` so it outlives the request handler."""
+    encode = _ndjson_chunks if fmt == "ndjson" else _csv_chunks
+
+    def chunks():
+        db = session_factory()
+        try:
+            rows = crud.iter_alert_rows(db, EXPORT_COLUMNS, filters=filters, chunk_size=CHUNK_ROWS)
+            for chunk in encode(rows):
+                yield chunk.encode()
+        finally:
+            db.close()
+
+    return _gzip(chunks()) if compress else chunks()
@@ -0,0 +1,173 @@
+"""Idempotency-key deduplication.
+
+The ``(webhook_source, idempotency_key)`` unique constraint is the source of
+truth: inserts that hit it are reported as duplicates. In front of it, each
+process keeps a TTL/LRU cache of recently stored keys so retries are rejected
+without touching the database, and optionally a Bloom filter of every key it
+knows about so lookups for never-seen keys can be skipped where a pre-insert
+lookup is still needed (queue mode, or partitioned tables that cannot carry
+the constraint). The filter only learns keys stored by its own process, so
+without the constraint behind it it is used only when WORKERS=1.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from . import models, partitioning
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+Key = Tuple[str, str]
+
+
+class RecentKeys:
+    """Bounded LRU of keys stored recently, each remembered for ``ttl`` seconds."""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 86400):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._keys: "OrderedDict[Key, float]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def seen(self, key: Key) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            expires = self._keys.get(key)
+            if expires is None or expires < now:
+                if expires is not None:
+                    del self._keys[key]
+                self.misses += 1
+                return False
+            self._keys.move_to_end(key)
+            self.hits += 1
+            return True
+
+    def add(self, key: Key) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._keys[key] = time.monotonic() + self.ttl
+            self._keys.move_to_end(key)
+            while len(self._keys) > self.maxsize:
+                self._keys.popitem(last=False)
+
+    def discard(self, key: Key) -> None:
+        with self._lock:
+            self._keys.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._keys.clear()
+
+
+class BloomFilter:
+    """Bloom filter sized for ``capacity`` keys at ``error_rate`` false positives."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def _positions(self, key: Key):
+        digest = hashlib.blake2b("\0".join(key).encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key: Key) -> None:
+        with self._lock:
+            for position in self._positions(key):
+                self._bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def __contains__(self, key: Key) -> bool:
+        return all(self._bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+
+recent_keys = RecentKeys(settings.idempotency_cache_size, settings.idempotency_cache_ttl)
+# Filled from the database by load_bloom(); until then every key may exist
+bloom: Optional[BloomFilter] = None
+_journal: Optional[list] = None  # Keys stored while load_bloom() runs
+
+
+def key_for(webhook_source: Optional[str], idempotency_key: str) -> Key:
+    return (webhook_source or "", idempotency_key)
+
+
+def might_exist(key: Key) -> bool:
+    """False only when the key has definitely never been stored."""
+    return bloom is None or key in bloom
+
+
+def remember(key: Key) -> None:
+    recent_keys.add(key)
+    if bloom is not None and key not in bloom:
+        bloom.add(key)
+    if _journal is not None:
+        _journal.append(key)
+
+
+def forget(keys) -> None:
+    """Drop keys of deleted alerts from the cache so they can be sent again.
+
+    The Bloom filter keeps them; that only costs a lookup.
+    """
+    for key in keys:
+        recent_keys.discard(key)
+
+
+def load_bloom(db: Session, chunk_size: int = 10000) -> Optional[BloomFilter]:
+    """Build the Bloom filter from every stored key when IDEMPOTENCY_BLOOM_CAPACITY is set."""
+    global bloom, _journal
+    if settings.idempotency_bloom_capacity <= 0:
+        return None
+    if partitioning.enabled(db.get_bind().dialect.name, warn=False) and settings.workers != 1:
+        # Nothing else stops a key another worker stored if the filter skips its lookup
+        logger.warning("IDEMPOTENCY_BLOOM_CAPACITY is ignored on partitioned tables with WORKERS other than 1")
+        return None
+    fresh = BloomFilter(settings.idempotency_bloom_capacity, settings.idempotency_bloom_error_rate)
+    _journal = []
+    try:
+        rows = (
+            db.query(models.Alert.webhook_source, models.Alert.idempotency_key)
+            .filter(models.Alert.idempotency_key.isnot(None))
+            .execution_options(yield_per=chunk_size)
+        )
+        for webhook_source, idempotency_key in rows:
+            fresh.add(key_for(webhook_source, idempotency_key))
+    except Exception:
+        _journal = None
+        raise
+    bloom = fresh
+    # Keys stored while the scan ran may have committed after it read past them
+    journal, _journal = _journal, None
+    for key in journal:
+        fresh.add(key)
+    if fresh.count > settings.idempotency_bloom_capacity:
+        logger.warning(
+            f"{fresh.count} idempotency keys exceed IDEMPOTENCY_BLOOM_CAPACITY; false positives will rise"
+        )
+    logger.info(f"Idempotency Bloom filter loaded with {fresh.count} keys")
+    return bloom
+
+
+def stats() -> dict:
+    return {
+        "cached_keys": len(recent_keys),
+        "cache_hits": recent_keys.hits,
+        "cache_misses": recent_keys.misses,
+        "bloom_keys": bloom.count if bloom is not None else None,
+    }
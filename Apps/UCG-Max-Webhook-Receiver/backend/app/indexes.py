@@ -0,0 +1,188 @@
+"""Index advisor for the alert list: which filters are used, and how they are planned.
+
+Every /api/alerts query that reaches the database is recorded under its filter
+combination (which filters were set, not their values) with its latency and one
+sample of values. GET /api/admin/indexes runs the database's EXPLAIN for each
+recorded combination and reports the indexes the plan uses, whether it scans
+the whole table or sorts, and an index to add when a filter has none. Like the
+other counters, recorded combinations are per worker process.
+"""
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from . import crud
+
+# Filter names in the order combinations are reported
+FILTERS = ('severity', 'alert_type', 'device', 'start', 'end', 'q', 'payload')
+
+# Equality filters, and the column each one compares
+EQUALITY_COLUMNS = {'severity': 'severity', 'alert_type': 'alert_type', 'device': 'device'}
+
+# Leading columns of indexes meant for list queries
+LIST_COLUMNS = set(EQUALITY_COLUMNS.values()) | {'timestamp'}
+
+# Rows the explained query is limited to, like a default page
+EXPLAIN_LIMIT = 50
+
+EXPLAIN_PREFIX = {'sqlite': 'EXPLAIN QUERY PLAN', 'postgresql': 'EXPLAIN'}
+
+SQLITE_INDEX = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+POSTGRES_INDEX = re.compile(r"(?:Index (?:Only )?Scan(?: Backward)? using|Bitmap Index Scan on) (\w+)")
+
+
+def shape_of(filters: dict) -> Tuple[str, ...]:
+    return tuple(name for name in FILTERS if filters.get(name))
+
+
+class QueryShapes:
+    """Counts and latency of list queries per filter combination."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # shape -> [count, total seconds, slowest seconds, sample filters]
+        self._shapes: Dict[Tuple[str, ...], list] = {}
+
+    def record(self, filters: dict, seconds: float) -> None:
+        shape = shape_of(filters)
+        sample = {name: filters[name] for name in shape}
+        with self._lock:
+            entry = self._shapes.get(shape)
+            if entry is None:
+                entry = self._shapes[shape] = [0, 0.0, 0.0, sample]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+            entry[3] = sample
+
+    def snapshot(self) -> List[dict]:
+        """Recorded combinations, most total time first."""
+        with self._lock:
+            entries = [(shape, list(entry)) for shape, entry in self._shapes.items()]
+        entries.sort(key=lambda item: item[1][1], reverse=True)
+        return [
+            {
+                "filters": list(shape),
+                "count": count,
+                "avg_ms": round(total * 1000 / count, 3),
+                "max_ms": round(slowest * 1000, 3),
+                "sample": sample,
+            }
+            for shape, (count, total, slowest, sample) in entries
+        ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._shapes.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "shapes": len(self._shapes),
+                "queries": sum(entry[0] for entry in self._shapes.values()),
+            }
+
+
+query_shapes = QueryShapes()
+
+
+@contextmanager
+def timed(filters: dict):
+    """Record one list query for ``filters`` unless it fails."""
+    started = time.perf_counter()
+    yield
+    query_shapes.record(filters, time.perf_counter() - started)
+
+
+def _prefix_explain(conn, cursor, statement, parameters, context, executemany):
+    # The statement is compiled and bound as usual; only its text gets the EXPLAIN prefix
+    prefix = context.execution_options.get("explain") if context is not None else None
+    return (f"{prefix} {statement}" if prefix else statement), parameters
+
+
+def explain(db: Session, query) -> dict:
+    """Plan of ``query`` as text lines, the indexes it uses and whether it scans or sorts."""
+    engine = db.get_bind()
+    if not event.contains(engine, "before_cursor_execute", _prefix_explain):
+        event.listen(engine, "before_cursor_execute", _prefix_explain, retval=True)
+    dialect = engine.dialect.name
+    result = db.connection().execution_options(explain=EXPLAIN_PREFIX.get(dialect, "EXPLAIN")).execute(query.statement)
+    rows = [dict(row) for row in result.mappings()]
+
+    if dialect == 'sqlite':
+        lines = [row["detail"] for row in rows]
+        used = [m.group(1) for line in lines for m in [SQLITE_INDEX.search(line)] if m]
+        # SCAN alerts USING INDEX walks an index in order; a bare SCAN reads the table
+        full_scan = any(line.strip() == "SCAN alerts" for line in lines)
+        sort = any("TEMP B-TREE FOR ORDER BY" in line for line in lines)
+    elif dialect == 'postgresql':
+        lines = [next(iter(row.values())) for row in rows]
+        used = [m.group(1) for line in lines for m in [POSTGRES_INDEX.search(line)] if m]
+        full_scan = any("Seq Scan on alerts" in line for line in lines)
+        sort = any(re.search(r"(?:^|->|\s)(?:Incremental )?Sort\b", line) for line in lines)
+    else:
+        # MySQL/MariaDB: one row per table access
+        lines = [
+            f"{row.get('table')} type={row.get('type')} key={row.get('key')} rows={row.get('rows')} {row.get('Extra') or ''}".strip()
+            for row in rows
+        ]
+        used = [row["key"] for row in rows if row.get("key")]
+        full_scan = any(row.get("table") == "alerts" and row.get("type") == "ALL" for row in rows)
+        sort = any("filesort" in (row.get("Extra") or "") for row in rows)
+    return {"plan": lines, "indexes": list(dict.fromkeys(used)), "full_scan": full_scan, "sort": sort}
+
+
+def table_indexes(db: Session) -> Dict[str, List[str]]:
+    """Index name -> columns for the alerts table."""
+    indexes = {i["name"]: list(i["column_names"]) for i in inspect(db.connection()).get_indexes("alerts")}
+    for constraint in inspect(db.connection()).get_unique_constraints("alerts"):
+        indexes.setdefault(constraint["name"], list(constraint["column_names"]))
+    return indexes
+
+
+def suggestion(shape: Tuple[str, ...], analysis: dict, indexes: Dict[str, List[str]]) -> Optional[str]:
+    """An index for the equality filters of ``shape`` when the plan has none leading with them."""
+    if 'q' in shape:
+        # Ranked search sorts by relevance whatever the index
+        return None
+    columns = [EQUALITY_COLUMNS[name] for name in shape if name in EQUALITY_COLUMNS]
+    if not columns:
+        return None
+    leading = {indexes[name][0] for name in analysis["indexes"] if indexes.get(name)}
+    if leading & set(columns) and not analysis["full_scan"] and not analysis["sort"]:
+        return None
+    name = "idx_alerts_" + "_".join(columns) + "_timestamp"
+    return f"CREATE INDEX {name} ON alerts ({', '.join(columns)}, timestamp, id)"
+
+
+def report(db: Session) -> dict:
+    """EXPLAIN every recorded filter combination against the current indexes."""
+    indexes = table_indexes(db)
+    queries, used = [], set()
+    for entry in query_shapes.snapshot():
+        query = crud.list_query(db, entry["sample"]).limit(EXPLAIN_LIMIT)
+        try:
+            analysis = explain(db, query)
+        except Exception as e:
+            db.rollback()
+            entry["error"] = str(e)
+            queries.append(entry)
+            continue
+        used.update(analysis["indexes"])
+        entry.update(analysis)
+        entry["suggestion"] = suggestion(tuple(entry["filters"]), analysis, indexes)
+        queries.append(entry)
+    return {
+        "indexes": indexes,
+        "queries": queries,
+        # List indexes no recorded query was planned with; writes still maintain them
+        "unused": sorted(
+            name for name, columns in indexes.items()
+            if columns and columns[0] in LIST_COLUMNS and name not in used
+        ) if queries else [],
+    }
@@ -0,0 +1,160 @@
+"""Write-behind ingestion queue.
+
+Webhook handlers validate a payload and enqueue it; a background flusher drains
+the queue in batches and writes each batch with one multi-row INSERT.
+"""
+import asyncio
+import logging
+import time
+from typing import Callable, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from . import crud
+from .config import settings
+from .database import SessionLocal
+from .cache import alert_cache
+from .stats import alert_stats
+from .stream import alert_hub
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """Raised when the ingest queue cannot accept more alerts."""
+
+
+def alerts_written(alerts: list) -> None:
+    """Update the in-memory views of the alerts table after alerts were stored."""
+    alert_stats.record(alerts)
+    alert_hub.publish(alerts)
+    alert_cache.invalidate(alerts)
+
+
+def write_batch(alerts: List[dict]) -> int:
+    """Persist a batch, falling back to row-by-row inserts if the batch fails."""
+    db = SessionLocal()
+    try:
+        try:
+            stored = crud.create_alerts(db, alerts)
+            alerts_written(stored)
+            return len(stored)
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Batch insert of {len(alerts)} alerts failed, retrying individually: {e}")
+        written = 0
+        for alert in alerts:
+            try:
+                stored = crud.create_alerts(db, [alert])
+                alerts_written(stored)
+                written += len(stored)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Dropping alert {alert.get('alert_id')}: {e}")
+        return written
+    finally:
+        db.close()
+
+
+class IngestQueue:
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        batch_size: int = 500,
+        linger_ms: int = 50,
+        flush: Callable[[List[dict]], int] = write_batch,
+    ):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.linger = linger_ms / 1000
+        self.flush = flush
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: Optional[asyncio.Future] = None
+        self._batch: List[dict] = []
+        self.enqueued = 0
+        self.written = 0
+        self.rejected = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def put(self, alert: dict) -> None:
+        if not self.running:
+            raise QueueFull("Ingest queue is not running")
+        try:
+            self._queue.put_nowait(alert)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFull("Ingest queue is full")
+        self.enqueued += 1
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"Ingest queue started (size={self.maxsize}, batch={self.batch_size}, linger={self.linger * 1000:.0f}ms)"
+        )
+
+    async def stop(self) -> None:
+        """Stop accepting work and flush everything still queued."""
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        # Finish the batch being written or collected when the flusher stopped
+        if self._inflight:
+            await self._inflight
+            self._inflight = None
+        batch, self._batch = self._batch, []
+        await self._write(batch)
+        while not self._queue.empty():
+            await self._write(self._take(self.batch_size))
+        logger.info(f"Ingest queue drained ({self.written} alerts written)")
+
+    def _take(self, limit: int) -> List[dict]:
+        batch = []
+        while len(batch) < limit and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _write(self, batch: List[dict]) -> None:
+        if not batch:
+            return
+        try:
+            self.written += await run_in_threadpool(self.flush, batch)
+        except Exception as e:
+            logger.error(f"Failed to flush {len(batch)} alerts: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            self._batch.append(await self._queue.get())
+            deadline = time.monotonic() + self.linger
+            while len(self._batch) < self.batch_size:
+                self._batch.extend(self._take(self.batch_size - len(self._batch)))
+                remaining = deadline - time.monotonic()
+                if len(self._batch) >= self.batch_size or remaining <= 0:
+                    break
+                await asyncio.sleep(min(remaining, 0.005))
+            batch, self._batch = self._batch, []
+            # Shield the write so a shutdown mid-flush does not lose the batch
+            self._inflight = asyncio.ensure_future(self._write(batch))
+            await asyncio.shield(self._inflight)
+            self._inflight = None
+
+
+ingest_queue = IngestQueue(
+    maxsize=settings.ingest_queue_size,
+    batch_size=settings.ingest_batch_size,
+    linger_ms=settings.ingest_linger_ms,
+)
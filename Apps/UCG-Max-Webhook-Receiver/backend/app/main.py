@@ -1,44 +1,101 @@
-from typing import Optional
-from fastapi import FastAPI, Request, HTTPException, Depends, status
-from fastapi.responses import JSONResponse
+from typing import List, Optional
+from fastapi import FastAPI, Request, HTTPException, Depends, Query, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
-from sqlalchemy.orm import Session
-from . import crud, models, schemas, auth
-from .database import SessionLocal, engine
+from . import crud, schemas, auth, export, idempotency, indexes, mappings, partitioning, payloads, ratelimit, retention, rollups, scheduler, telemetry
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
+from .database import SessionLocal, engine, read_engine, get_db, get_session_factory, run_db, DBSession
 from .config import settings
+from .cache import alert_cache, etag_matches
+from .ingest import alerts_written, ingest_queue, QueueFull
+from .stats import alert_stats, GRANULARITIES
+from .spool import spool, SpoolFull
+from .stream import alert_hub
+from datetime import datetime, timedelta, timezone
+from contextlib import asynccontextmanager
+import asyncio
 import logging
+import math
 
 logging.basicConfig(level=getattr(logging, settings.log_level.upper()))
 logger = logging.getLogger(__name__)
 
-models.Base.metadata.create_all(bind=engine)
+def reconcile_stats():
+    db = SessionLocal()
+    try:
+        alert_stats.reconcile(db)
+    finally:
+        db.close()
+
+async def reconcile_stats_periodically():
+    while True:
+        try:
+            await run_in_threadpool(reconcile_stats)
+        except Exception as e:
+            logger.error(f"Error reconciling metrics: {str(e)}")
+        await asyncio.sleep(settings.metrics_reconcile_interval)
+
+def load_idempotency_filter():
+    db = SessionLocal()
+    try:
+        idempotency.load_bloom(db)
+    except Exception as e:
+        logger.error(f"Error loading idempotency keys: {str(e)}")
+    finally:
+        db.close()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the background work in order; on shutdown stop it in reverse."""
+    if settings.ingest_mode == "queue":
+        await ingest_queue.start()
+    if settings.ingest_mode == "spool":
+        await spool.start()
+    stats_task = asyncio.create_task(reconcile_stats_periodically()) if settings.metrics_cache else None
+    # Pay the bcrypt cost once here instead of on the first login
+    await run_in_threadpool(auth.admin_password_hash)
+    if settings.idempotency_bloom_capacity > 0:
+        await run_in_threadpool(load_idempotency_filter)
+    scheduler.start()
+    try:
+        yield
+    finally:
+        scheduler.shutdown()
+        if stats_task:
+            stats_task.cancel()
+        # Draining the queue and the spool may still write alerts
+        await spool.stop()
+        await ingest_queue.stop()
+        engine.dispose()
+        if read_engine is not None:
+            read_engine.dispose()
+
+async def limit_client(request: Request):
+    """Per-client quota for every route; the webhook routes apply all their quotas in rate_limited()."""
+    if not request.url.path.startswith("/webhook"):
+        await ratelimit.limiter.admit(request)
 
-app = FastAPI(title="UCG Max Webhook Receiver", version="1.0.0")
+app = FastAPI(
+    title="UCG Max Webhook Receiver", version="1.0.0", lifespan=lifespan, dependencies=[Depends(limit_client)]
+)
 
-# Custom rate limit exception handler that handles both RateLimitExceeded and ValueError
-def rate_limit_handler(request: Request, exc: Exception) -> JSONResponse:
-    if hasattr(exc, 'detail'):
-        message = f"Rate limit exceeded: {exc.detail}"
-    else:
-        message = f"Rate limit exceeded: {str(exc)}"
+def rate_limit_handler(request: Request, exc: ratelimit.RateLimited) -> JSONResponse:
     return JSONResponse(
         status_code=429,
-        content={"error": message}
+        content={"error": f"Rate limit exceeded: {exc}"},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
     )
 
-# Initialize limiter with a valid rate limit string
-limiter = Limiter(
-    key_func=get_remote_address, 
-    default_limits=[f"{settings.rate_limit_requests}/{settings.rate_limit_window}second"]
-)
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, rate_limit_handler)
-app.add_exception_handler(ValueError, rate_limit_handler)  # Handle ValueError from rate limiting
-app.add_middleware(SlowAPIMiddleware)
+app.add_exception_handler(ratelimit.RateLimited, rate_limit_handler)
+
+def rate_limited(webhook_source: Optional[str] = None):
+    """Dependency applying the webhook quotas; the source is fixed by the route or taken from ?webhook_source=."""
+    async def check(request: Request):
+        await ratelimit.limiter.admit(request, webhook_source or request.query_params.get("webhook_source", "generic"))
+    return Depends(check)
 
 app.add_middleware(
     CORSMiddleware,
@@ -48,43 +105,94 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def get_db():
-    db = SessionLocal()
+if settings.metrics_enabled:
+    app.add_middleware(telemetry.MetricsMiddleware)
+
+# Queue mode acknowledges before inserting and partitioned tables have no unique
+# constraint, so only then must idempotency keys be looked up before storing.
+# Spool replay skips stored keys by the unique constraint without a lookup.
+IDEMPOTENCY_LOOKUP = settings.ingest_mode == "queue" or partitioning.enabled(engine.dialect.name)
+
+async def reject_duplicate(db: DBSession, webhook_source: str, idempotency_key: Optional[str]):
+    """Raise 409 for an idempotency key that is already stored."""
+    if not idempotency_key:
+        return
+    key = idempotency.key_for(webhook_source, idempotency_key)
+    with telemetry.stage("idempotency"):
+        duplicate = idempotency.recent_keys.seen(key)
+        if not duplicate and IDEMPOTENCY_LOOKUP and idempotency.might_exist(key):
+            try:
+                duplicate = await run_db(db, crud.get_alert_by_idempotency_key, idempotency_key, webhook_source) is not None
+            except SQLAlchemyError as e:
+                if settings.ingest_mode != "spool":
+                    raise
+                # Spooling must not depend on the database; a duplicate is then stored at replay
+                logger.warning(f"Idempotency lookup skipped, database unavailable: {e}")
+    if duplicate:
+        idempotency.remember(key)
+        raise HTTPException(status_code=409, detail="Duplicate alert")
+
+async def store_alert(db: DBSession, alert: dict) -> dict:
+    """Persist an alert row inline, or hand it to the write-behind queue or the spool."""
+    if alert.get("timestamp") is None:
+        # Keyset pagination orders by timestamp, so never store it as NULL
+        alert["timestamp"] = datetime.now(timezone.utc)
+    key = idempotency.key_for(alert["webhook_source"], alert["idempotency_key"]) if alert.get("idempotency_key") else None
+    if settings.ingest_mode == "spool":
+        try:
+            await spool.append([alert])
+        except SpoolFull as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+        if key:
+            idempotency.remember(key)
+        return {"status": "spooled", "alert_id": alert.get("alert_id") or ""}
+    if settings.ingest_mode == "queue":
+        try:
+            ingest_queue.put(alert)
+        except QueueFull as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+        if key:
+            idempotency.remember(key)
+        return {"status": "queued", "alert_id": alert.get("alert_id") or ""}
     try:
-        yield db
-    finally:
-        db.close()
+        stored = await run_db(db, crud.create_alert, alert)
+    except IntegrityError as e:
+        if not key or not crud.is_duplicate_key(e):
+            raise
+        # A concurrent request stored the same key first
+        idempotency.remember(key)
+        raise HTTPException(status_code=409, detail="Duplicate alert")
+    if key:
+        idempotency.remember(key)
+    alerts_written([stored])
+    return {"status": "accepted", "alert_id": stored.alert_id or str(stored.id)}
 
-@app.post("/webhook/ucgmax", response_model=schemas.WebhookResponse)
-@limiter.limit(f"{settings.rate_limit_requests} per {settings.rate_limit_window} second")
-async def receive_alert(request: Request, db: Session = Depends(get_db)):
+@app.post("/webhook/ucgmax", response_model=schemas.WebhookResponse, dependencies=[rate_limited("ucgmax")])
+async def receive_alert(request: Request, db: DBSession = Depends(get_db)):
+    # The body is read once: signed as raw bytes, then parsed and validated in one pass
     body = await request.body()
-    headers = dict(request.headers)
-    if not auth.verify_hmac_or_bearer(body, headers):
+    headers = request.headers
+    with telemetry.stage("auth"):
+        authorized = auth.verify_hmac_or_bearer(body, headers)
+    if not authorized:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
     try:
-        data = await request.json()
-        alert_data = schemas.AlertCreate(**data)
-        alert_data.webhook_source = "ucgmax"
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Invalid JSON or missing fields: {str(e)}")
+        alert = payloads.ucgmax_alert(body)
+    except payloads.InvalidPayload as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     # Check idempotency
     idempotency_key = headers.get('idempotency-key')
-    if idempotency_key:
-        existing = db.query(models.Alert).filter(models.Alert.idempotency_key == idempotency_key).first()
-        if existing:
-            raise HTTPException(status_code=409, detail="Duplicate alert")
-
-    alert_data.idempotency_key = idempotency_key
-    alert = crud.create_alert(db, alert_data)
-    logger.info(f"Alert received from UCG Max: {alert.alert_id}")
-    return {"status": "accepted", "alert_id": alert.alert_id or str(alert.id)}
-
-@app.post("/webhook", response_model=schemas.WebhookResponse)
-@limiter.limit(f"{settings.rate_limit_requests} per {settings.rate_limit_window} second")
-async def receive_generic_webhook(request: Request, webhook_source: str = "generic", db: Session = Depends(get_db)):
+    await reject_duplicate(db, alert["webhook_source"], idempotency_key)
+
+    alert["idempotency_key"] = idempotency_key
+    result = await store_alert(db, alert)
+    logger.info(f"Alert received from UCG Max: {result['alert_id']}")
+    return result
+
+@app.post("/webhook", response_model=schemas.WebhookResponse, dependencies=[rate_limited()])
+async def receive_generic_webhook(request: Request, webhook_source: str = "generic", db: DBSession = Depends(get_db)):
     """
     Generic webhook endpoint that accepts any JSON payload.
     
@@ -105,76 +213,265 @@ async def receive_generic_webhook(request: Request, webhook_source: str = "gener
     }
     """
     body = await request.body()
-    headers = dict(request.headers)
+    headers = request.headers
     
     # Optional authentication - only enforce if credentials are configured
     if settings.bearer_token or settings.hmac_secret:
-        if not auth.verify_hmac_or_bearer(body, headers):
+        with telemetry.stage("auth"):
+            authorized = auth.verify_hmac_or_bearer(body, headers)
+        if not authorized:
             raise HTTPException(status_code=401, detail="Unauthorized")
 
+    # Parse once and map common field names to our structure; alert_id falls back to a hash of the body
     try:
-        data = await request.json()
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Invalid JSON: {str(e)}")
+        alert = payloads.generic_alert(body, webhook_source, headers.get('idempotency-key'))
+    except payloads.InvalidPayload as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    # Extract common fields with fallbacks
-    from datetime import datetime, timezone
-    import hashlib
-    import json
-    
-    # Generate alert_id from hash of content if not provided
-    alert_id = data.get('id') or data.get('alert_id') or data.get('event_id') or hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()[:32]
-    
-    # Map common field names to our structure
-    alert_data = schemas.AlertCreate(
-        alert_id=str(alert_id),
-        webhook_source=webhook_source,
-        source=data.get('source') or data.get('origin') or data.get('application') or webhook_source,
-        device=data.get('device') or data.get('host') or data.get('hostname') or data.get('node'),
-        severity=data.get('severity') or data.get('level') or data.get('priority') or "info",
-        alert_type=data.get('type') or data.get('alert_type') or data.get('event_type') or data.get('category') or "notification",
-        timestamp=datetime.fromisoformat(data['timestamp']) if 'timestamp' in data else datetime.now(timezone.utc),
-        summary=data.get('message') or data.get('summary') or data.get('title') or data.get('description') or f"Webhook from {webhook_source}",
-        details=data.get('details') or {},
-        raw_payload=data,
-        idempotency_key=headers.get('idempotency-key') or data.get('idempotency_key')
+    # Check idempotency
+    await reject_duplicate(db, alert["webhook_source"], alert["idempotency_key"])
+
+    result = await store_alert(db, alert)
+    logger.info(f"Generic webhook received from {webhook_source}: {result['alert_id']}")
+    return result
+
+async def store_batch(db: DBSession, rows: List[tuple], results: List[dict]):
+    """Bulk-insert valid batch items, marking each result accepted or duplicate.
+
+    Batches are written inline even in queue mode: they are already batched and
+    would overflow the ingest queue. In spool mode they are spooled with one fsync.
+    """
+    fresh, seen = [], set()
+    for index, alert in rows:
+        if alert.get("timestamp") is None:
+            alert["timestamp"] = datetime.now(timezone.utc)
+        key = idempotency.key_for(alert["webhook_source"], alert["idempotency_key"]) if alert.get("idempotency_key") else None
+        if key and (key in seen or idempotency.recent_keys.seen(key)):
+            results[index]["status"] = "duplicate"
+            continue
+        if key:
+            seen.add(key)
+        fresh.append((index, alert, key))
+
+    if settings.ingest_mode == "spool":
+        try:
+            if fresh:
+                await spool.append([alert for _, alert, _ in fresh])
+        except SpoolFull as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+        for index, alert, key in fresh:
+            results[index]["status"] = "accepted"
+            if key:
+                idempotency.remember(key)
+        return
+
+    for start in range(0, len(fresh), settings.ingest_batch_size):
+        chunk = fresh[start:start + settings.ingest_batch_size]
+        # One lookup per chunk, skipping keys the Bloom filter has never seen
+        lookup = [key for _, _, key in chunk if key and idempotency.might_exist(key)]
+        with telemetry.stage("idempotency"):
+            stored = await run_db(db, crud.existing_idempotency_keys, lookup) if lookup else set()
+        new = []
+        for index, alert, key in chunk:
+            if key in stored:
+                results[index]["status"] = "duplicate"
+                idempotency.remember(key)
+            else:
+                new.append((index, alert, key))
+        # A key stored concurrently since the lookup is skipped by the INSERT itself
+        stored = await run_db(db, crud.create_alerts, [alert for _, alert, _ in new])
+        written = {id(alert) for alert in stored}
+        for index, alert, key in new:
+            results[index]["status"] = "accepted" if id(alert) in written else "duplicate"
+            if key:
+                idempotency.remember(key)
+        alerts_written(stored)
+
+async def receive_batch(request: Request, db: DBSession, webhook_source: str, to_alert, require_auth: bool) -> dict:
+    """Read a JSON array or NDJSON batch under one signature and store its items in bulk."""
+    headers = request.headers
+    # A bearer token is checked up front and the body parsed as it streams in; with an HMAC
+    # signature the body is only buffered until the signature has been verified
+    mac = signature = None
+    if require_auth and not auth.verify_bearer(headers):
+        signature = auth.provided_signature(headers)
+        if signature is None:
+            raise HTTPException(status_code=401, detail="Unauthorized")
+        mac = auth.body_hmac()
+
+    # Items without their own key inherit "<Idempotency-Key>:<index>" so a replayed batch is deduplicated
+    batch_key = headers.get('idempotency-key')
+    reader = payloads.BatchReader()
+    results, rows = [], []
+
+    def collect(items):
+        for raw, data in items:
+            index = len(results)
+            if index >= settings.webhook_batch_max_items:
+                raise HTTPException(status_code=413, detail=f"Batches are limited to {settings.webhook_batch_max_items} items")
+            try:
+                if isinstance(data, payloads.InvalidPayload):
+                    raise data
+                alert = to_alert(raw, data)
+            except payloads.InvalidPayload as e:
+                results.append({"index": index, "status": "invalid", "error": str(e)})
+                continue
+            if not alert.get("idempotency_key") and batch_key:
+                alert["idempotency_key"] = f"{batch_key}:{index}"
+            results.append({"index": index, "status": "pending", "alert_id": alert.get("alert_id")})
+            rows.append((index, alert))
+
+    if int(headers.get('content-length') or 0) > settings.webhook_batch_max_bytes:
+        raise HTTPException(status_code=413, detail=f"Batches are limited to {settings.webhook_batch_max_bytes} bytes")
+    size, unverified = 0, []
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > settings.webhook_batch_max_bytes:
+            raise HTTPException(status_code=413, detail=f"Batches are limited to {settings.webhook_batch_max_bytes} bytes")
+        if mac is not None:
+            # Nothing is parsed or validated before the signature over the whole body is checked
+            mac.update(chunk)
+            unverified.append(chunk)
+        else:
+            collect(reader.feed(chunk))
+    if mac is not None:
+        if not auth.signature_matches(mac, signature):
+            raise HTTPException(status_code=401, detail="Unauthorized")
+        collect(reader.feed(b"".join(unverified)))
+        unverified.clear()
+    try:
+        collect(reader.close())
+    except payloads.InvalidPayload as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    await store_batch(db, rows, results)
+    counts = {status: sum(1 for r in results if r["status"] == status) for status in ("accepted", "duplicate", "invalid")}
+    logger.info(
+        f"Batch received from {webhook_source}: {counts['accepted']} accepted, "
+        f"{counts['duplicate']} duplicates, {counts['invalid']} invalid"
     )
+    return {"accepted": counts["accepted"], "duplicates": counts["duplicate"], "invalid": counts["invalid"], "results": results}
 
-    # Check idempotency
-    if alert_data.idempotency_key:
-        existing = db.query(models.Alert).filter(models.Alert.idempotency_key == alert_data.idempotency_key).first()
-        if existing:
-            raise HTTPException(status_code=409, detail="Duplicate alert")
+@app.post("/webhook/batch", response_model=schemas.BatchWebhookResponse, response_model_exclude_none=True,
+          dependencies=[rate_limited()])
+async def receive_generic_batch(request: Request, webhook_source: str = "generic", db: DBSession = Depends(get_db)):
+    """
+    Many generic webhook payloads in one request, as a JSON array or NDJSON (one object per line).
+
+    Items are mapped with the webhook_source's profile and inserted in bulk. The response
+    reports each item as accepted, duplicate (idempotency key already stored) or invalid.
+    """
+    return await receive_batch(
+        request, db, webhook_source,
+        lambda raw, data: payloads.generic_item(data, webhook_source),
+        bool(settings.bearer_token or settings.hmac_secret),
+    )
+
+@app.post("/webhook/ucgmax/batch", response_model=schemas.BatchWebhookResponse, response_model_exclude_none=True,
+          dependencies=[rate_limited("ucgmax")])
+async def receive_alert_batch(request: Request, db: DBSession = Depends(get_db)):
+    """UCG Max alerts in bulk, as a JSON array or NDJSON; see /webhook/batch."""
+    return await receive_batch(request, db, "ucgmax", lambda raw, data: payloads.ucgmax_item(data), True)
 
-    alert = crud.create_alert(db, alert_data)
-    logger.info(f"Generic webhook received from {webhook_source}: {alert.alert_id}")
-    return {"status": "accepted", "alert_id": alert.alert_id or str(alert.id)}
+def cached_json(request: Request, entry) -> Response:
+    """Serve a cache entry, or 304 when the client already holds this version."""
+    # no-cache lets browsers keep the body but revalidate it with If-None-Match every time
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
+
+def parse_payload_filters(payload: Optional[List[str]]) -> tuple:
+    """Parsed ``payload=`` terms for apply_filters, or 400."""
+    try:
+        payload_filters = crud.parse_payload_filters(payload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if payload_filters and settings.payload_storage == "compact":
+        raise HTTPException(status_code=400, detail="payload filters need PAYLOAD_STORAGE=inline")
+    return payload_filters
 
 # API routes
 @app.get("/api/alerts")
 async def get_alerts(
+    request: Request,
     severity: Optional[str] = None,
     alert_type: Optional[str] = None,
     device: Optional[str] = None,
     start: Optional[str] = None,
     end: Optional[str] = None,
     q: Optional[str] = None,
+    payload: Optional[List[str]] = Query(None),
     page: int = 1,
     page_size: int = 50,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    view: str = "full",
+    fields: Optional[str] = None,
+    db: DBSession = Depends(get_db)
 ):
+    """
+    List alerts newest first.
+
+    Without ``cursor`` this returns a plain list paged by ``page``/``page_size``.
+    Pass ``cursor`` (empty for the first page) to use keyset pagination instead;
+    the response is then ``{"items": [...], "next_cursor": ...}`` and every page
+    costs the same regardless of depth. Repeated queries are answered from the
+    result cache until a matching alert is written or deleted.
+
+    ``view=summary`` leaves out details and raw_payload; ``fields=a,b`` selects
+    columns explicitly (id and timestamp are always included). Both read plain
+    rows instead of ORM objects; full payloads stay on /api/alerts/{id}.
+
+    ``payload=key:value`` (repeatable, ``a.b:value`` for nested keys) matches a
+    value inside raw_payload, compared as text.
+    """
+    payload_filters = parse_payload_filters(payload)
+    if cursor:
+        try:
+            crud.decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if view not in ("full", "summary"):
+        raise HTTPException(status_code=400, detail=f"Unsupported view: {view}")
+    columns = None
+    if fields:
+        requested = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in requested if f not in crud.LIST_COLUMNS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        columns = [c for c in ("id", "timestamp") if c not in requested] + list(dict.fromkeys(requested))
+    elif view == "summary":
+        columns = list(crud.SUMMARY_COLUMNS)
+    filters = {
+        'severity': severity,
+        'alert_type': alert_type,
+        'device': device,
+        'start': start,
+        'end': end,
+        'q': q,
+        'payload': payload_filters
+    }
+    cache_key = ("alerts", tuple(sorted((k, v) for k, v in filters.items() if v)),
+                 cursor, page if cursor is None else None, page_size, tuple(columns or ()))
+    generations = alert_cache.generations(filters)
+    entry = alert_cache.get(cache_key, generations)
+    if entry is not None:
+        return cached_json(request, entry)
     try:
-        filters = {
-            'severity': severity,
-            'alert_type': alert_type,
-            'device': device,
-            'start': start,
-            'end': end,
-            'q': q
-        }
-        skip = (page - 1) * page_size
-        alerts = crud.get_alerts(db, skip=skip, limit=page_size, filters=filters)
-        return alerts
+        with indexes.timed(filters):
+            if cursor is not None:
+                result = await run_db(db, crud.get_alerts_page, cursor=cursor, limit=page_size, filters=filters, columns=columns)
+            else:
+                skip = (page - 1) * page_size
+                result = await run_db(db, crud.get_alerts, skip=skip, limit=page_size, filters=filters, columns=columns)
+        if columns is None:
+            body = payloads.dumps(jsonable_encoder(result))
+        else:
+            # Plain rows go straight to the encoder, without jsonable_encoder's per-value walk
+            items = result["items"] if cursor is not None else result
+            items = [dict(zip(columns, row)) for row in items]
+            body = payloads.dumps({"items": items, "next_cursor": result["next_cursor"]} if cursor is not None else items)
+        return cached_json(request, alert_cache.put(cache_key, generations, body))
     except Exception as e:
         logger.error(f"Error fetching alerts: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error fetching alerts: {str(e)}")
@@ -186,77 +483,239 @@ async def export_alerts(
     device: Optional[str] = None,
     start: Optional[str] = None,
     end: Optional[str] = None,
-    db: Session = Depends(get_db)
+    q: Optional[str] = None,
+    payload: Optional[List[str]] = Query(None),
+    format: str = "csv",
+    gzip: bool = False,
+    session_factory: sessionmaker = Depends(get_session_factory),
 ):
+    """
+    Stream every matching alert as CSV or NDJSON, optionally gzip-compressed.
+
+    Rows are read through a server-side cursor and encoded as they arrive, so
+    there is no row cap and memory use does not grow with the export size.
+    """
     from fastapi.responses import StreamingResponse
-    import csv
-    import io
-    
+
+    if format not in export.FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {format}")
+
     filters = {
         'severity': severity,
         'alert_type': alert_type,
         'device': device,
         'start': start,
-        'end': end
+        'end': end,
+        'q': q,
+        'payload': parse_payload_filters(payload)
     }
-    alerts = crud.get_alerts(db, skip=0, limit=10000, filters=filters)
-    
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['ID', 'Alert ID', 'Timestamp', 'Severity', 'Type', 'Device', 'Summary', 'Source'])
-    
-    for alert in alerts:
-        writer.writerow([
-            alert.id,
-            alert.alert_id,
-            alert.timestamp.isoformat(),
-            alert.severity,
-            alert.alert_type,
-            alert.device,
-            alert.summary,
-            alert.source
-        ])
-    
-    output.seek(0)
+    media_type, extension = export.FORMATS[format]
+    filename = f"ucgmax-alerts.{extension}"
+    if gzip:
+        media_type, filename = "application/gzip", filename + ".gz"
     return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename=ucgmax-alerts.csv"}
+        export.stream_alerts(filters, session_factory, fmt=format, compress=gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+@app.get("/api/alerts/stream")
+async def stream_alerts(
+    severity: Optional[str] = None,
+    device: Optional[str] = None,
+    webhook_source: Optional[str] = None,
+):
+    """
+    Server-Sent Events feed of alerts as they are written, for live dashboards.
+
+    Events: ``snapshot`` (current /api/metrics counters, on connect), ``alert``
+    (a new alert matching the filters), ``metrics`` (counter increments for all
+    new alerts, unfiltered) and ``lagged`` (events dropped because the client
+    fell behind; refetch /api/alerts). Nothing here queries the database.
+    """
+    from fastapi.responses import StreamingResponse
+
+    if alert_hub.full():
+        raise HTTPException(status_code=503, detail="Too many open alert streams", headers={"Retry-After": "30"})
+    snapshot = alert_stats.snapshot() if settings.metrics_cache and alert_stats.ready else None
+    return StreamingResponse(
+        alert_hub.events({'severity': severity, 'device': device, 'webhook_source': webhook_source}, snapshot),
+        media_type="text/event-stream",
+        # Tell nginx-style proxies not to buffer the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 @app.get("/api/alerts/{alert_id}", response_model=schemas.Alert)
-def get_alert(alert_id: int, db: Session = Depends(get_db)):
-    alert = crud.get_alert(db, alert_id)
-    if not alert:
-        raise HTTPException(status_code=404, detail="Alert not found")
-    return alert
+async def get_alert(alert_id: int, request: Request, db: DBSession = Depends(get_db)):
+    # Stored alerts never change, so an entry lives until the alert is deleted or it expires
+    cache_key = ("alert", alert_id)
+    generations = alert_cache.generations(None)
+    entry = alert_cache.get(cache_key, generations)
+    if entry is None:
+        alert = await run_db(db, crud.get_alert_detail, alert_id)
+        if not alert:
+            raise HTTPException(status_code=404, detail="Alert not found")
+        body = payloads.dumps(alert.model_dump(mode="json"))
+        entry = alert_cache.put(cache_key, generations, body)
+    return cached_json(request, entry)
 
 @app.delete("/api/alerts/{alert_id}")
-def delete_alert(alert_id: int, current_user: str = Depends(auth.get_current_user), db: Session = Depends(get_db)):
-    crud.delete_alert(db, alert_id)
+async def delete_alert(alert_id: int, current_user: str = Depends(auth.get_current_user), db: DBSession = Depends(get_db)):
+    deleted = await run_db(db, crud.delete_alert, alert_id)
+    if deleted:
+        alert_stats.discard([deleted])
+        alert_cache.invalidate([deleted])
+        alert_cache.discard(("alert", alert_id))
     return {"status": "deleted"}
 
+@app.delete("/api/alerts")
+async def bulk_delete_alerts(
+    severity: Optional[str] = None,
+    alert_type: Optional[str] = None,
+    device: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    q: Optional[str] = None,
+    payload: Optional[List[str]] = Query(None),
+    current_user: str = Depends(auth.get_current_user),
+    db: DBSession = Depends(get_db)
+):
+    """Delete every alert matching the same filters as GET /api/alerts, in bounded chunks."""
+    filters = {
+        'severity': severity,
+        'alert_type': alert_type,
+        'device': device,
+        'start': start,
+        'end': end,
+        'q': q,
+        'payload': parse_payload_filters(payload)
+    }
+    if not any(filters.values()):
+        raise HTTPException(status_code=400, detail="At least one filter is required for bulk delete")
+    deleted = await run_db(db, crud.bulk_delete_alerts, filters, chunk_size=settings.retention_chunk_size)
+    if deleted:
+        alert_cache.clear()
+    if deleted and settings.metrics_cache:
+        await run_db(db, alert_stats.reconcile)
+    return {"status": "deleted", "count": deleted}
+
 @app.get("/api/metrics", response_model=schemas.MetricsResponse)
-def get_metrics(db: Session = Depends(get_db)):
+async def get_metrics(db: DBSession = Depends(get_db)):
+    if settings.metrics_cache and alert_stats.ready:
+        return alert_stats.snapshot()
     try:
-        return crud.get_metrics(db)
+        return await run_db(db, crud.get_metrics)
     except Exception as e:
         logger.error(f"Error fetching metrics: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error fetching metrics: {str(e)}")
 
+@app.get("/api/metrics/histogram", response_model=List[schemas.HistogramBucket])
+def get_metrics_histogram(granularity: str = "minute", buckets: int = 60):
+    """Recent alert counts per minute, hour or day, served from memory."""
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"Unsupported granularity: {granularity}")
+    if not alert_stats.ready:
+        raise HTTPException(status_code=503, detail="Metrics are still being loaded")
+    return alert_stats.histogram(granularity, buckets)
+
+@app.get("/api/metrics/timeseries", response_model=List[schemas.TimeseriesPoint], response_model_exclude_none=True)
+async def get_metrics_timeseries(
+    granularity: str = "hour",
+    days: int = 7,
+    group_by: Optional[str] = None,
+    webhook_source: Optional[str] = None,
+    severity: Optional[str] = None,
+    alert_type: Optional[str] = None,
+    device: Optional[str] = None,
+    db: DBSession = Depends(get_db)
+):
+    """
+    Historical alert counts per hour or day from the rollup tables.
+
+    ``group_by`` splits each bucket by webhook_source, severity, alert_type or
+    device. Rollups are kept for ROLLUP_RETENTION_DAYS, independent of raw
+    alert retention.
+    """
+    if granularity not in ("hour", "day"):
+        raise HTTPException(status_code=400, detail=f"Unsupported granularity: {granularity}")
+    if group_by is not None and group_by not in rollups.DIMENSIONS:
+        raise HTTPException(status_code=400, detail=f"Unsupported group_by: {group_by}")
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    filters = {
+        'webhook_source': webhook_source,
+        'severity': severity,
+        'alert_type': alert_type,
+        'device': device
+    }
+    return await run_db(db, rollups.timeseries, granularity=granularity, since=since,
+                        group_by=group_by, filters=filters)
+
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "service": "ucg-max-webhook-receiver"}
+    health = {"status": "healthy", "service": "ucg-max-webhook-receiver"}
+    if settings.ingest_mode == "queue":
+        health["ingest_queue"] = {
+            "depth": ingest_queue.depth(),
+            "enqueued": ingest_queue.enqueued,
+            "written": ingest_queue.written,
+            "rejected": ingest_queue.rejected,
+        }
+    if settings.ingest_mode == "spool":
+        health["spool"] = spool.stats()
+    health["idempotency"] = idempotency.stats()
+    health["token_cache"] = auth.token_cache.stats()
+    health["rate_limit"] = ratelimit.limiter.stats()
+    health["stream"] = alert_hub.stats()
+    health["alert_cache"] = alert_cache.stats()
+    health["query_shapes"] = indexes.query_shapes.stats()
+    return health
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Operational metrics of this worker process in the Prometheus text format."""
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return PlainTextResponse(telemetry.registry.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/ready")
-def readiness_check(db: Session = Depends(get_db)):
+async def readiness_check(db: DBSession = Depends(get_db)):
     try:
         # Test database connection
-        db.execute("SELECT 1")
+        await run_db(db, crud.ping)
         return {"status": "ready", "database": "connected"}
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"Database not ready: {str(e)}")
 
+@app.get("/api/admin/retention")
+def get_retention_report(current_user: str = Depends(auth.get_current_user)):
+    return {"last_run": retention.last_run}
+
+@app.post("/api/admin/retention")
+async def run_retention(current_user: str = Depends(auth.get_current_user)):
+    """Run the retention purge now instead of waiting for the schedule."""
+    report = await run_in_threadpool(scheduler.purge_expired_alerts)
+    if report is None:
+        raise HTTPException(status_code=500, detail="Retention run failed, see logs")
+    return report
+
+@app.get("/api/admin/indexes")
+async def get_index_report(current_user: str = Depends(auth.get_current_user), db: DBSession = Depends(get_db)):
+    """Filter combinations /api/alerts has served, checked against EXPLAIN on the current indexes."""
+    return await run_db(db, indexes.report)
+
+@app.get("/api/admin/profiles")
+def get_webhook_profiles(current_user: str = Depends(auth.get_current_user)):
+    """Field mapping profiles in effect for /webhook, keyed by webhook_source."""
+    return mappings.registry.describe()
+
+@app.post("/api/admin/profiles/reload")
+def reload_webhook_profiles(current_user: str = Depends(auth.get_current_user)):
+    if not settings.webhook_profiles_path:
+        raise HTTPException(status_code=400, detail="WEBHOOK_PROFILES_PATH is not configured")
+    if not mappings.registry.reload_if_changed(force=True):
+        raise HTTPException(status_code=422, detail=f"Profiles not reloaded: {mappings.registry.error}")
+    return mappings.registry.describe()
+
 # Auth
 @app.post("/auth/login", response_model=schemas.TokenResponse)
 def login(request: schemas.LoginRequest):
@@ -0,0 +1,295 @@
+"""Per-source field mapping profiles for the generic webhook endpoint.
+
+A profile says where each alert column comes from in a source's payload.
+Fields are given as a path, a list of paths tried in order, or an object::
+
+    {
+      "severity": {
+        "paths": ["$.commonLabels.severity", "$.status"],
+        "map": {"firing": "critical", "resolved": "info"},
+        "default": "info"
+      },
+      "timestamp": {"paths": ["$.alerts[0].startsAt"], "format": "iso"}
+    }
+
+Paths use ``$.key.nested[0].key`` syntax. A text ``default`` may reference
+``{webhook_source}``; other braces are written ``{{`` and ``}}``. ``map`` normalizes values (matched case-insensitively).
+``format`` is ``auto`` (ISO 8601 or epoch seconds/milliseconds), ``iso``,
+``epoch``, ``epoch_ms`` or a ``strptime`` pattern.
+
+Built-in profiles cover generic payloads, Grafana, Uptime Kuma and UniFi;
+WEBHOOK_PROFILES_PATH points at a JSON file of ``{name: profile}`` that adds to
+or overrides them. Unset fields fall back to the ``generic`` profile. Profiles
+are compiled into extractor functions once per load, and the file is reloaded
+when it changes.
+"""
+import copy
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("alert_id", "source", "device", "severity", "alert_type", "summary", "timestamp", "details", "idempotency_key")
+TEXT_FIELDS = ("alert_id", "source", "device", "severity", "alert_type", "summary", "idempotency_key")
+SPEC_KEYS = {"paths", "default", "map", "format"}
+PATH_STEP = re.compile(r"\.?([^.\[\]]+)|\[(\d+)\]")
+
+BUILTIN_PROFILES: Dict[str, dict] = {
+    # Common field names used by most JSON webhooks
+    "generic": {
+        "alert_id": ["$.id", "$.alert_id", "$.event_id"],
+        "source": {"paths": ["$.source", "$.origin", "$.application"], "default": "{webhook_source}"},
+        "device": ["$.device", "$.host", "$.hostname", "$.node"],
+        "severity": {"paths": ["$.severity", "$.level", "$.priority"], "default": "info"},
+        "alert_type": {"paths": ["$.type", "$.alert_type", "$.event_type", "$.category"], "default": "notification"},
+        "summary": {
+            "paths": ["$.message", "$.summary", "$.title", "$.description"],
+            "default": "Webhook from {webhook_source}",
+        },
+        "timestamp": {"paths": ["$.timestamp"], "format": "auto"},
+        "details": {"paths": ["$.details"], "default": {}},
+        "idempotency_key": ["$.idempotency_key"],
+    },
+    # Grafana unified alerting webhook contact point
+    "grafana": {
+        "alert_id": ["$.alerts[0].fingerprint", "$.groupKey"],
+        "source": {"paths": ["$.receiver"], "default": "grafana"},
+        "device": ["$.commonLabels.instance", "$.alerts[0].labels.instance", "$.commonLabels.host"],
+        "severity": {
+            "paths": ["$.commonLabels.severity", "$.alerts[0].labels.severity", "$.status"],
+            "map": {"firing": "critical", "resolved": "info", "crit": "critical", "warn": "warning", "page": "critical"},
+            "default": "warning",
+        },
+        "alert_type": {"paths": ["$.commonLabels.alertname", "$.alerts[0].labels.alertname"], "default": "grafana_alert"},
+        "summary": ["$.commonAnnotations.summary", "$.title", "$.message"],
+        "timestamp": {"paths": ["$.alerts[0].startsAt"], "format": "iso"},
+        "details": {"paths": ["$.commonLabels"], "default": {}},
+    },
+    # Uptime Kuma webhook notification; heartbeat status 0=down 1=up 2=pending 3=maintenance
+    "uptime-kuma": {
+        "alert_id": ["$.heartbeat.id"],
+        "source": {"paths": ["$.monitor.name"], "default": "uptime-kuma"},
+        "device": ["$.monitor.hostname", "$.monitor.url", "$.monitor.name"],
+        "severity": {
+            "paths": ["$.heartbeat.status"],
+            "map": {"0": "critical", "1": "info", "2": "warning", "3": "info"},
+            "default": "info",
+        },
+        "alert_type": {"paths": ["$.monitor.type"], "default": "monitor"},
+        "summary": ["$.msg", "$.heartbeat.msg"],
+        "timestamp": {"paths": ["$.heartbeat.time"], "format": "auto"},
+        "details": {"paths": ["$.monitor"], "default": {}},
+    },
+    # UniFi Network alarm manager webhooks
+    "unifi": {
+        "alert_id": ["$.id", "$.alarm_id", "$.event_id"],
+        "source": {"paths": ["$.app", "$.source"], "default": "unifi"},
+        "device": ["$.device_name", "$.device.name", "$.triggers[0].device", "$.hostname", "$.mac"],
+        "severity": {
+            "paths": ["$.severity", "$.level"],
+            "map": {"high": "critical", "medium": "warning", "low": "info", "alert": "critical", "warn": "warning"},
+            "default": "info",
+        },
+        "alert_type": {"paths": ["$.key", "$.event", "$.triggers[0].key", "$.type"], "default": "unifi_event"},
+        "summary": ["$.message", "$.msg", "$.text", "$.name"],
+        "timestamp": {"paths": ["$.timestamp", "$.time", "$.datetime"], "format": "auto"},
+        "details": {"paths": ["$.parameters", "$.details"], "default": {}},
+    },
+}
+
+
+class ProfileError(ValueError):
+    """A mapping profile is malformed."""
+
+
+def compile_path(path: str) -> Callable[[Any], Any]:
+    """Compile ``$.a.b[0].c`` into a getter returning None when any step is missing."""
+    expression = path[1:] if path.startswith("$") else path
+    steps, position = [], 0
+    for match in PATH_STEP.finditer(expression):
+        if match.start() != position:
+            break
+        steps.append(int(match.group(2)) if match.group(2) is not None else match.group(1))
+        position = match.end()
+    if position != len(expression) or not steps:
+        raise ProfileError(f"Invalid path: {path!r}")
+    steps = tuple(steps)
+
+    def get(data):
+        for step in steps:
+            if isinstance(step, int):
+                if not isinstance(data, list) or step >= len(data):
+                    return None
+                data = data[step]
+            elif isinstance(data, dict):
+                data = data.get(step)
+            else:
+                return None
+            if data is None:
+                return None
+        return data
+    return get
+
+
+def parse_timestamp(value, fmt: str = "auto") -> datetime:
+    """Parse a payload timestamp; naive results are taken as UTC."""
+    try:
+        if isinstance(value, bool):
+            raise TypeError
+        numeric = isinstance(value, (int, float)) or (isinstance(value, str) and value.isdigit())
+        if fmt in ("epoch", "epoch_ms") or (fmt == "auto" and numeric):
+            seconds = float(value)
+            if fmt == "epoch_ms" or (fmt == "auto" and seconds > 1e11):
+                seconds /= 1000
+            parsed = datetime.fromtimestamp(seconds, timezone.utc)
+        elif fmt in ("auto", "iso"):
+            parsed = datetime.fromisoformat(value)
+        else:
+            parsed = datetime.strptime(value, fmt)
+    except (TypeError, ValueError, OverflowError) as e:
+        raise ValueError(f"Invalid timestamp: {value!r}") from e
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _present(value) -> bool:
+    return value is not None and value != "" and value != [] and value != {}
+
+
+def _compile_field(name: str, spec) -> Callable[[dict, str], Any]:
+    if isinstance(spec, (str, list)):
+        spec = {"paths": spec}
+    if not isinstance(spec, dict) or not SPEC_KEYS.issuperset(spec):
+        raise ProfileError(f"Invalid mapping for {name}: {spec!r}")
+    paths = spec.get("paths", [])
+    getters = [compile_path(p) for p in ([paths] if isinstance(paths, str) else paths)]
+    default = spec.get("default")
+    if isinstance(default, str):
+        try:
+            default.format(webhook_source="source")
+        except (KeyError, IndexError, ValueError, AttributeError) as e:
+            raise ProfileError(
+                f"Invalid default for {name}: {default!r} may only reference {{webhook_source}} "
+                f"(write literal braces as {{{{ and }}}}): {e!r}"
+            ) from e
+    table = {str(k).lower(): v for k, v in spec.get("map", {}).items()}
+    fmt = spec.get("format", "auto")
+    is_text = name in TEXT_FIELDS
+
+    def extract(data: dict, webhook_source: str):
+        value = None
+        for get in getters:
+            value = get(data)
+            if _present(value):
+                break
+        else:
+            value = None
+        if value is None:
+            if isinstance(default, str):
+                return default.format(webhook_source=webhook_source)
+            return copy.deepcopy(default) if isinstance(default, (dict, list)) else default
+        if table:
+            value = table.get(str(value).lower(), value)
+        if name == "timestamp":
+            return parse_timestamp(value, fmt)
+        if name == "details" and not isinstance(value, dict):
+            return {"value": value}
+        if is_text and not isinstance(value, str):
+            return json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+        return value
+    return extract
+
+
+class Profile:
+    def __init__(self, name: str, spec: dict, base: Optional[dict] = None):
+        if not isinstance(spec, dict):
+            raise ProfileError(f"Profile {name} must be an object")
+        unknown = set(spec) - set(FIELDS)
+        if unknown:
+            raise ProfileError(f"Profile {name} has unknown fields: {', '.join(sorted(unknown))}")
+        self.name = name
+        self.spec = {**(base or {}), **spec}
+        self._extractors = [(field, _compile_field(field, self.spec[field])) for field in FIELDS if field in self.spec]
+
+    def extract(self, data: dict, webhook_source: str) -> dict:
+        """Alert columns for ``data``; raises ValueError for unparseable timestamps."""
+        return {field: extract(data, webhook_source) for field, extract in self._extractors}
+
+
+def compile_profiles(overrides: Optional[dict] = None) -> Dict[str, Profile]:
+    """Built-in profiles with ``overrides`` merged in field by field."""
+    specs = {name: dict(spec) for name, spec in BUILTIN_PROFILES.items()}
+    for name, spec in (overrides or {}).items():
+        if not isinstance(spec, dict):
+            raise ProfileError(f"Profile {name} must be an object")
+        specs[name] = {**specs.get(name, {}), **spec}
+    generic = specs["generic"]
+    profiles = {"generic": Profile("generic", generic)}
+    for name, spec in specs.items():
+        if name != "generic":
+            profiles[name] = Profile(name, spec, base=generic)
+    return profiles
+
+
+class ProfileRegistry:
+    """Compiled profiles, reloaded from ``path`` when the file changes."""
+
+    def __init__(self, path: str = ""):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self.loaded_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.profiles = compile_profiles()
+        self.reload_if_changed()
+
+    def get(self, webhook_source: str) -> Profile:
+        profiles = self.profiles
+        return profiles.get(webhook_source) or profiles["generic"]
+
+    def reload_if_changed(self, force: bool = False) -> bool:
+        """Recompile from the file if it changed; a broken file keeps the previous profiles."""
+        if not self.path:
+            return False
+        with self._lock:
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError as e:
+                self.error = str(e)
+                return False
+            if not force and mtime == self._mtime:
+                return False
+            # Remember the version even if it is broken so it is not retried until edited again
+            self._mtime = mtime
+            try:
+                with open(self.path) as f:
+                    overrides = json.load(f)
+                if not isinstance(overrides, dict):
+                    raise ProfileError("Profile file must contain an object of {name: profile}")
+                self.profiles = compile_profiles(overrides)
+            except (OSError, ValueError) as e:
+                self.error = str(e)
+                logger.error(f"Keeping previous webhook profiles, could not load {self.path}: {e}")
+                return False
+            self.loaded_at = time.time()
+            self.error = None
+        logger.info(f"Loaded webhook profiles from {self.path}: {', '.join(sorted(overrides))}")
+        return True
+
+    def describe(self) -> dict:
+        return {
+            "path": self.path or None,
+            "loaded_at": datetime.fromtimestamp(self.loaded_at, timezone.utc).isoformat() if self.loaded_at else None,
+            "error": self.error,
+            "profiles": {name: profile.spec for name, profile in sorted(self.profiles.items())},
+        }
+
+
+registry = ProfileRegistry(settings.webhook_profiles_path)
@@ -1,30 +1,102 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Index, JSON
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Text, Index, JSON, LargeBinary, UniqueConstraint, DDL, event, literal
+from sqlalchemy.dialects import mysql
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
+import sqlalchemy.dialects.postgresql  # noqa: F401 - registers the to_tsvector() full-text functions
 
 Base = declarative_base()
 
 class Alert(Base):
     __tablename__ = "alerts"
 
-    id = Column(Integer, primary_key=True, index=True)
-    alert_id = Column(String(255), index=True)  # Removed unique constraint for generic webhooks
-    webhook_source = Column(String(100), index=True, default="ucgmax")  # Track webhook origin
-    source = Column(String(255), index=True, nullable=True)
-    device = Column(String(255), index=True, nullable=True)
-    severity = Column(String(50), index=True, nullable=True)
-    alert_type = Column(String(100), index=True, nullable=True)  # renamed from 'type' to avoid keyword
-    timestamp = Column(DateTime(timezone=True), index=True)
+    id = Column(Integer, primary_key=True)
+    alert_id = Column(String(255))  # Removed unique constraint for generic webhooks
+    webhook_source = Column(String(100), default="ucgmax")  # Track webhook origin
+    source = Column(String(255), nullable=True)
+    device = Column(String(255), nullable=True)
+    severity = Column(String(50), nullable=True)
+    alert_type = Column(String(100), nullable=True)  # renamed from 'type' to avoid keyword
+    timestamp = Column(DateTime(timezone=True))
     summary = Column(Text, nullable=True)
     details = Column(JSON, nullable=True)
     raw_payload = Column(JSON)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     received_at = Column(DateTime(timezone=True), server_default=func.now())
-    idempotency_key = Column(String(255), index=True, nullable=True)
-
-# Indexes (without PostgreSQL-specific GIN indexes for cross-database compatibility)
-Index('idx_alerts_timestamp', Alert.timestamp)
-Index('idx_alerts_severity', Alert.severity)
-Index('idx_alerts_type', Alert.alert_type)
-Index('idx_alerts_device', Alert.device)
-Index('idx_alerts_webhook_source', Alert.webhook_source)
\ No newline at end of file
+    idempotency_key = Column(String(255), nullable=True)  # Looked up through uq_alerts_source_idempotency_key
+    search_text = deferred(Column(Text, nullable=True))  # Normalised words indexed for full-text search (see search.py)
+    payload_digest = Column(String(64), index=True, nullable=True)  # details/raw_payload in alert_payloads (PAYLOAD_STORAGE=compact)
+
+    __table_args__ = (
+        # Source of truth for deduplication; rows without a key are never considered duplicates
+        UniqueConstraint('webhook_source', 'idempotency_key', name='uq_alerts_source_idempotency_key'),
+    )
+
+# Indexes (without PostgreSQL-specific GIN indexes for cross-database compatibility).
+# Every list is ordered by (timestamp, id) DESC, so each filter column leads an index
+# that continues in that order: an equality filter becomes one range scan that stops
+# at the page size, with no sort. See GET /api/admin/indexes for the plans in use.
+Index('idx_alerts_timestamp_id', Alert.timestamp, Alert.id)  # Unfiltered lists and keyset pagination
+Index('idx_alerts_severity_timestamp', Alert.severity, Alert.timestamp, Alert.id)
+Index('idx_alerts_type_timestamp', Alert.alert_type, Alert.timestamp, Alert.id)
+Index('idx_alerts_device_timestamp', Alert.device, Alert.timestamp, Alert.id)
+Index('idx_alerts_source_timestamp', Alert.webhook_source, Alert.timestamp, Alert.id)
+
+# Full-text search indexes, one per database
+Index('idx_alerts_search', func.to_tsvector(literal('simple'), Alert.search_text), postgresql_using='gin').ddl_if(dialect='postgresql')
+Index('idx_alerts_search_fulltext', Alert.search_text, mysql_prefix='FULLTEXT', mariadb_prefix='FULLTEXT').ddl_if(dialect=('mysql', 'mariadb'))
+
+# SQLite: external-content FTS5 table kept in sync with alerts by triggers
+SQLITE_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS alerts_fts USING fts5(search_text, content='alerts', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS alerts_fts_ai AFTER INSERT ON alerts BEGIN "
+    "INSERT INTO alerts_fts(rowid, search_text) VALUES (new.id, new.search_text); END",
+    "CREATE TRIGGER IF NOT EXISTS alerts_fts_ad AFTER DELETE ON alerts BEGIN "
+    "INSERT INTO alerts_fts(alerts_fts, rowid, search_text) VALUES ('delete', old.id, old.search_text); END",
+    "CREATE TRIGGER IF NOT EXISTS alerts_fts_au AFTER UPDATE OF search_text ON alerts BEGIN "
+    "INSERT INTO alerts_fts(alerts_fts, rowid, search_text) VALUES ('delete', old.id, old.search_text); "
+    "INSERT INTO alerts_fts(rowid, search_text) VALUES (new.id, new.search_text); END",
+)
+for statement in SQLITE_FTS_DDL:
+    event.listen(Alert.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+
+class AlertRollup(Base):
+    """Hourly alert counts per dimension combination, maintained incrementally from alerts."""
+    __tablename__ = "alert_rollups"
+
+    id = Column(Integer, primary_key=True)
+    bucket = Column(DateTime(timezone=True), nullable=False)  # Start of the received_at hour
+    webhook_source = Column(String(100), nullable=False, default="")
+    severity = Column(String(50), nullable=False, default="")
+    alert_type = Column(String(100), nullable=False, default="")
+    device = Column(String(255), nullable=False, default="")
+    count = Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint('bucket', 'webhook_source', 'severity', 'alert_type', 'device', name='uq_alert_rollups_dims'),
+    )
+
+class RollupState(Base):
+    """Materialization watermark: alerts with id <= last_alert_id are already rolled up."""
+    __tablename__ = "alert_rollup_state"
+
+    name = Column(String(50), primary_key=True)
+    last_alert_id = Column(BigInteger, nullable=False, default=0)
+    pending_alert_id = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+
+class RateLimit(Base):
+    """GCRA state for RATE_LIMIT_STORAGE=database: theoretical arrival time per limiter key."""
+    __tablename__ = "rate_limits"
+
+    key = Column(String(255), primary_key=True)  # "<scope>:<client|source|token>"
+    tat = Column(BigInteger, nullable=False)  # Epoch milliseconds
+
+class AlertPayload(Base):
+    """Compressed details/raw_payload document shared by every alert with the same content."""
+    __tablename__ = "alert_payloads"
+
+    digest = Column(String(64), primary_key=True)  # SHA-256 of the canonical JSON document
+    encoding = Column(String(10), nullable=False)  # zlib or zstd
+    size = Column(Integer, nullable=False)  # Uncompressed bytes
+    data = Column(LargeBinary().with_variant(mysql.MEDIUMBLOB(), 'mysql', 'mariadb'), nullable=False)
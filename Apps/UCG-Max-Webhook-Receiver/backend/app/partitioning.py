@@ -0,0 +1,282 @@
+"""Native range partitioning of the alerts table on received_at.
+
+Enabled with ALERTS_PARTITIONING=day|month on PostgreSQL or MariaDB/MySQL.
+Partitions are created ahead of time by the scheduler, and retention drops
+whole expired partitions instead of deleting rows. SQLite is not supported and
+keeps the plain table.
+"""
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Index, MetaData, PrimaryKeyConstraint, UniqueConstraint, inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from . import models
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ("day", "month")
+SUPPORTED_DIALECTS = ("postgresql", "mysql", "mariadb")
+PARTITION_NAME = re.compile(r"^(?:alerts_)?p(\d{6}|\d{8})$")
+
+# Non-unique stand-in for uq_alerts_source_idempotency_key, backing the duplicate lookup
+IDEMPOTENCY_INDEX = "idx_alerts_source_idempotency_key"
+
+
+def enabled(dialect_name: str, warn: bool = True) -> bool:
+    if settings.alerts_partitioning not in GRANULARITIES:
+        return False
+    if dialect_name not in SUPPORTED_DIALECTS:
+        if warn:
+            logger.warning(f"ALERTS_PARTITIONING is not supported on {dialect_name}; using a plain table")
+        return False
+    return True
+
+
+def period_start(value: datetime, granularity: str) -> datetime:
+    value = value.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+    return value.replace(day=1) if granularity == "month" else value
+
+
+def next_period(value: datetime, granularity: str) -> datetime:
+    if granularity == "day":
+        return value + timedelta(days=1)
+    return (value.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def partition_suffix(start: datetime, granularity: str) -> str:
+    return start.strftime("%Y%m" if granularity == "month" else "%Y%m%d")
+
+
+def periods(first: datetime, last: datetime, granularity: str) -> List[Tuple[datetime, datetime]]:
+    """(start, end) ranges covering ``first`` through ``last`` inclusive."""
+    result = []
+    start = period_start(first, granularity)
+    while start <= last.replace(tzinfo=None):
+        end = next_period(start, granularity)
+        result.append((start, end))
+        start = end
+    return result
+
+
+def parse_suffix(name: str) -> Optional[datetime]:
+    match = PARTITION_NAME.match(name)
+    if not match:
+        return None
+    digits = match.group(1)
+    return datetime.strptime(digits, "%Y%m" if len(digits) == 6 else "%Y%m%d")
+
+
+# Introspection
+
+def is_partitioned(conn: Connection) -> bool:
+    if conn.dialect.name == "postgresql":
+        return bool(conn.execute(text(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = 'alerts' AND pg_table_is_visible(c.oid)"
+        )).scalar())
+    return bool(conn.execute(text(
+        "SELECT COUNT(*) FROM information_schema.partitions "
+        "WHERE table_schema = DATABASE() AND table_name = 'alerts' AND partition_name IS NOT NULL"
+    )).scalar())
+
+
+def list_partitions(conn: Connection) -> List[str]:
+    if conn.dialect.name == "postgresql":
+        rows = conn.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = 'alerts' AND pg_table_is_visible(p.oid)"
+        ))
+    else:
+        rows = conn.execute(text(
+            "SELECT partition_name FROM information_schema.partitions "
+            "WHERE table_schema = DATABASE() AND table_name = 'alerts' AND partition_name IS NOT NULL"
+        ))
+    return sorted(row[0] for row in rows)
+
+
+# Partition maintenance
+
+def _create_partition(conn: Connection, start: datetime, end: datetime, granularity: str):
+    suffix = partition_suffix(start, granularity)
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS alerts_p{suffix} PARTITION OF alerts "
+            f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+        ))
+    else:
+        # New ranges are split off the catch-all pmax partition
+        conn.execute(text(
+            f"ALTER TABLE alerts REORGANIZE PARTITION pmax INTO ("
+            f"PARTITION p{suffix} VALUES LESS THAN (TO_DAYS('{end:%Y-%m-%d}')), "
+            f"PARTITION pmax VALUES LESS THAN MAXVALUE)"
+        ))
+
+
+def ensure_partitions(conn: Connection, granularity: Optional[str] = None, ahead: Optional[int] = None) -> List[str]:
+    """Create partitions from now through ``ahead`` periods in the future."""
+    granularity = granularity or settings.alerts_partitioning
+    ahead = settings.partitions_ahead if ahead is None else ahead
+    existing = set(list_partitions(conn))
+    last = datetime.now(timezone.utc).replace(tzinfo=None)
+    for _ in range(ahead):
+        last = next_period(period_start(last, granularity), granularity)
+    created = []
+    for start, end in periods(datetime.now(timezone.utc), last, granularity):
+        suffix = partition_suffix(start, granularity)
+        if f"alerts_p{suffix}" in existing or f"p{suffix}" in existing:
+            continue
+        # MariaDB ranges must be added in ascending order, after the newest existing one
+        newest = max(filter(None, map(parse_suffix, existing)), default=None)
+        if conn.dialect.name != "postgresql" and newest and start <= newest:
+            continue
+        _create_partition(conn, start, end, granularity)
+        existing.add(f"p{suffix}")
+        created.append(suffix)
+    if created:
+        logger.info(f"Created alert partitions: {', '.join(created)}")
+    return created
+
+
+def _partition_max_id(conn: Connection, name: str) -> Optional[int]:
+    if conn.dialect.name == "postgresql":
+        return conn.execute(text(f"SELECT MAX(id) FROM {name}")).scalar()
+    return conn.execute(text(f"SELECT MAX(id) FROM alerts PARTITION ({name})")).scalar()
+
+
+def drop_expired_partitions(conn: Connection, cutoff: datetime, max_id: Optional[int] = None) -> dict:
+    """Drop partitions whose whole range is older than ``cutoff``.
+
+    Partitions still holding ids above ``max_id`` (not yet rolled up) are kept.
+    """
+    granularity = settings.alerts_partitioning
+    dropped, rows = [], 0
+    for name in list_partitions(conn):
+        start = parse_suffix(name)
+        if start is None or next_period(start, granularity) > cutoff.replace(tzinfo=None):
+            continue
+        highest = _partition_max_id(conn, name)
+        if max_id is not None and highest is not None and highest > max_id:
+            continue
+        if conn.dialect.name == "postgresql":
+            rows += conn.execute(text(f"SELECT COUNT(*) FROM {name}")).scalar()
+            conn.execute(text(f"DROP TABLE {name}"))
+        else:
+            rows += conn.execute(text(f"SELECT COUNT(*) FROM alerts PARTITION ({name})")).scalar()
+            conn.execute(text(f"ALTER TABLE alerts DROP PARTITION {name}"))
+        dropped.append(name)
+    if dropped:
+        logger.info(f"Dropped expired alert partitions: {', '.join(dropped)}")
+    return {"partitions": dropped, "rows": rows}
+
+
+# Converting an existing table
+
+def _partitioned_table(dialect_name: str):
+    """Copy of the alerts table whose primary key includes the partition key."""
+    table = models.Alert.__table__.to_metadata(MetaData())
+    table.c.received_at.nullable = False
+    table.c.received_at.primary_key = True
+    # Postgres reuses the existing alerts_id_seq instead of creating a new serial
+    table.c.id.autoincrement = dialect_name != "postgresql"
+    table.append_constraint(PrimaryKeyConstraint(table.c.id, table.c.received_at))
+    # Unique constraints on a partitioned table would have to include received_at,
+    # which defeats idempotency keys; duplicates are caught by a lookup instead
+    for constraint in [c for c in table.constraints if isinstance(c, UniqueConstraint)]:
+        table.constraints.remove(constraint)
+    Index(IDEMPOTENCY_INDEX, table.c.webhook_source, table.c.idempotency_key)
+    return table
+
+
+def convert_table(conn: Connection, granularity: Optional[str] = None, batch_size: int = 10000) -> int:
+    """Rebuild the existing alerts table as a partitioned table; returns rows copied."""
+    granularity = granularity or settings.alerts_partitioning
+    dialect = conn.dialect.name
+    if is_partitioned(conn):
+        logger.info("alerts table is already partitioned")
+        return 0
+
+    first = conn.execute(text("SELECT MIN(received_at) FROM alerts")).scalar() or datetime.now(timezone.utc)
+    if isinstance(first, str):
+        first = datetime.fromisoformat(first)
+
+    if dialect != "postgresql":
+        # MariaDB rebuilds the table in place; the partition key must be part of the primary key,
+        # and partitioned tables cannot have FULLTEXT indexes (search falls back to LIKE) or
+        # unique keys without received_at (idempotency falls back to a lookup)
+        for (name,) in conn.execute(text(
+            "SELECT DISTINCT index_name FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = 'alerts' AND index_name <> 'PRIMARY' "
+            "AND (index_type = 'FULLTEXT' OR non_unique = 0)"
+        )):
+            conn.execute(text(f"ALTER TABLE alerts DROP INDEX {name}"))
+        conn.execute(text(f"ALTER TABLE alerts ADD INDEX {IDEMPOTENCY_INDEX} (webhook_source, idempotency_key)"))
+        conn.execute(text("UPDATE alerts SET received_at = COALESCE(created_at, NOW()) WHERE received_at IS NULL"))
+        conn.execute(text(
+            "ALTER TABLE alerts MODIFY received_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP, "
+            "DROP PRIMARY KEY, ADD PRIMARY KEY (id, received_at)"
+        ))
+        ranges = periods(first, datetime.now(timezone.utc), granularity)
+        definitions = ", ".join(
+            f"PARTITION p{partition_suffix(start, granularity)} VALUES LESS THAN (TO_DAYS('{end:%Y-%m-%d}'))"
+            for start, end in ranges
+        )
+        conn.execute(text(
+            f"ALTER TABLE alerts PARTITION BY RANGE (TO_DAYS(received_at)) "
+            f"({definitions}, PARTITION pmax VALUES LESS THAN MAXVALUE)"
+        ))
+        ensure_partitions(conn, granularity)
+        return conn.execute(text("SELECT COUNT(*) FROM alerts")).scalar()
+
+    # PostgreSQL cannot partition a table in place: copy into a new partitioned table
+    conn.execute(text("ALTER TABLE alerts RENAME TO alerts_legacy"))
+    conn.execute(text("ALTER TABLE alerts_legacy RENAME CONSTRAINT alerts_pkey TO alerts_legacy_pkey"))
+    for index in models.Alert.__table__.indexes:
+        conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+
+    table = _partitioned_table(dialect)
+    table.dialect_kwargs["postgresql_partition_by"] = "RANGE (received_at)"
+    conn.execute(CreateTable(table))
+    conn.execute(text("ALTER TABLE alerts ALTER COLUMN id SET DEFAULT nextval('alerts_id_seq')"))
+    conn.execute(text("ALTER SEQUENCE alerts_id_seq OWNED BY alerts.id"))
+    for index in table.indexes:
+        if index.kwargs.get("mysql_prefix") == "FULLTEXT":
+            continue
+        conn.execute(CreateIndex(index))
+    conn.execute(text("CREATE TABLE IF NOT EXISTS alerts_pdefault PARTITION OF alerts DEFAULT"))
+    for start, end in periods(first, datetime.now(timezone.utc), granularity):
+        _create_partition(conn, start, end, granularity)
+    ensure_partitions(conn, granularity)
+
+    # Columns added by later migrations may not exist on the legacy table yet
+    legacy_columns = {c["name"] for c in inspect(conn).get_columns("alerts_legacy")}
+    columns = [c.name for c in table.columns if c.name in legacy_columns]
+    select_columns = ", ".join(
+        "COALESCE(received_at, created_at, now())" if c == "received_at" else c for c in columns
+    )
+    max_id = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM alerts_legacy")).scalar()
+    copied, low = 0, 0
+    while low < max_id:
+        high = low + batch_size
+        copied += conn.execute(text(
+            f"INSERT INTO alerts ({', '.join(columns)}) "
+            f"SELECT {select_columns} FROM alerts_legacy WHERE id > :low AND id <= :high"
+        ), {"low": low, "high": high}).rowcount
+        low = high
+        logger.info(f"Copied alerts up to id {min(high, max_id)} of {max_id}")
+    conn.execute(text("DROP TABLE alerts_legacy"))
+    return copied
+
+
+def received_lower_bound(start: datetime) -> datetime:
+    """received_at bound implied by ``timestamp >= start``, used only for partition pruning.
+
+    Alerts are received after they happen, so received_at can only be earlier
+    than timestamp by clock skew between the sender and this server.
+    """
+    return start - timedelta(hours=settings.partition_skew_hours)
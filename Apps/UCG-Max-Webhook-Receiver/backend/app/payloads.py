@@ -0,0 +1,153 @@
+"""Webhook body decoding: each request body is parsed exactly once.
+
+Handlers read the raw bytes, verify the signature over them, and turn them
+into an alert row dict here; batch bodies are split into items as they stream
+in. orjson is used when installed, falling back to the standard library, and
+also encodes cached list responses.
+"""
+import hashlib
+import json
+from datetime import date, datetime, timezone
+from typing import Any, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from . import mappings, schemas, telemetry
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+
+class InvalidPayload(ValueError):
+    """The body is not JSON, or not a JSON object the receiver can map."""
+
+
+def loads(body: bytes) -> Any:
+    try:
+        return orjson.loads(body) if orjson is not None else json.loads(body)
+    except ValueError as e:  # orjson.JSONDecodeError subclasses ValueError too
+        raise InvalidPayload(f"Invalid JSON: {str(e)}") from e
+
+
+def _iso(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode a response body, with datetimes in ISO 8601 as FastAPI's encoder writes them."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_iso).encode()
+
+
+def content_hash(data: Any) -> str:
+    """Stable id for a payload without an explicit one.
+
+    Taken over the decoded object with sorted keys, so whitespace, key order and
+    array vs NDJSON batches do not change it. This is the stdlib's default
+    encoding, which orjson cannot reproduce, so ids match alerts stored before
+    bodies were parsed with orjson.
+    """
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()[:32]
+
+
+def ucgmax_alert(body: bytes) -> dict:
+    """UCG Max bodies follow the alert schema; validate straight from the bytes."""
+    try:
+        with telemetry.stage("parse"):
+            alert = schemas.AlertCreate.model_validate_json(body)
+    except ValueError as e:
+        raise InvalidPayload(f"Invalid JSON or missing fields: {str(e)}") from e
+    row = alert.model_dump()
+    row["webhook_source"] = "ucgmax"
+    return row
+
+
+def ucgmax_item(data: Any) -> dict:
+    """A UCG Max alert already decoded from a batch."""
+    try:
+        row = schemas.AlertCreate.model_validate(data).model_dump()
+    except ValidationError as e:
+        # One line per item; the full pydantic report is too verbose for a batch response
+        problems = "; ".join(f"{'.'.join(map(str, err['loc'])) or 'alert'}: {err['msg']}" for err in e.errors())
+        raise InvalidPayload(f"Invalid alert: {problems}") from e
+    row["webhook_source"] = "ucgmax"
+    return row
+
+
+def generic_alert(body: bytes, webhook_source: str, idempotency_key: Optional[str] = None) -> dict:
+    """Map an arbitrary JSON object onto an alert row with the source's mapping profile."""
+    with telemetry.stage("parse"):
+        data = loads(body)
+    return generic_item(data, webhook_source, idempotency_key)
+
+
+def generic_item(data: Any, webhook_source: str, idempotency_key: Optional[str] = None) -> dict:
+    """Map a decoded object; its content hash stands in for a missing alert_id."""
+    if not isinstance(data, dict):
+        raise InvalidPayload("Webhook body must be a JSON object")
+    try:
+        with telemetry.stage("mapping"):
+            alert = mappings.registry.get(webhook_source).extract(data, webhook_source)
+    except ValueError as e:
+        raise InvalidPayload(str(e)) from e
+    if not alert.get("alert_id"):
+        alert["alert_id"] = content_hash(data)
+    alert["webhook_source"] = webhook_source
+    alert["raw_payload"] = data
+    alert["idempotency_key"] = idempotency_key or alert.get("idempotency_key")
+    if alert.get("timestamp") is None:
+        alert["timestamp"] = datetime.now(timezone.utc)
+    return alert
+
+
+class BatchReader:
+    """Split a batch body into items while it is still being received.
+
+    A body starting with ``[`` is a JSON array and is decoded in one call once
+    complete; anything else is NDJSON and each line is decoded as soon as it has
+    arrived. Items are ``(raw, data)``: the line's bytes (None for array
+    elements) and the decoded value, or an InvalidPayload for a bad line.
+    An array is held in memory until it ends, so callers cap the body size
+    (WEBHOOK_BATCH_MAX_BYTES).
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self.is_array: Optional[bool] = None
+
+    def feed(self, chunk: bytes) -> List[Tuple[Optional[bytes], Any]]:
+        self._buffer += chunk
+        if self.is_array is None:
+            start = self._buffer.lstrip()[:1]
+            if not start:
+                return []
+            self.is_array = start == b"["
+        end = -1 if self.is_array else self._buffer.rfind(b"\n")
+        if end < 0:
+            return []
+        lines = bytes(self._buffer[:end]).split(b"\n")
+        del self._buffer[:end + 1]
+        return [self._line(line) for line in lines if line.strip()]
+
+    def close(self) -> List[Tuple[Optional[bytes], Any]]:
+        """Items left once the body has ended; raises InvalidPayload for a malformed array."""
+        rest, self._buffer = bytes(self._buffer), bytearray()
+        if self.is_array:
+            data = loads(rest)
+            if not isinstance(data, list):
+                raise InvalidPayload("Batch body must be a JSON array or NDJSON")
+            return [(None, item) for item in data]
+        return [self._line(rest)] if rest.strip() else []
+
+    @staticmethod
+    def _line(line: bytes):
+        line = line.strip()
+        try:
+            return line, loads(line)
+        except InvalidPayload as e:
+            return line, e
@@ -0,0 +1,301 @@
+"""Admission control, shared across workers and replicas.
+
+Limits use GCRA (the generic cell rate algorithm): each key stores a theoretical
+arrival time (TAT), and a request is admitted while it would not push the TAT
+more than one window past now. That allows ``requests`` per ``window`` seconds
+in any sliding window, bursts included, with a single number of state per key.
+
+RATE_LIMIT_STORAGE picks where the state lives: ``memory`` (per process),
+``database`` (the rate_limits table, shared by every worker on DATABASE_URL) or
+a ``redis://`` URL (needs the redis package). Quotas apply per client address,
+per webhook_source (RATE_LIMIT_SOURCES) and per credential (RATE_LIMIT_PER_TOKEN)
+on the webhook routes; every other route, login included, has the per-client quota.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import case, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+
+from . import models
+from .config import settings
+from .database import engine
+
+try:
+    import redis
+except ImportError:  # only needed for RATE_LIMIT_STORAGE=redis://
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class Quota(NamedTuple):
+    requests: int
+    window: float  # seconds
+
+    @property
+    def interval(self) -> float:
+        return self.window / self.requests
+
+    def __str__(self) -> str:
+        return f"{self.requests} per {self.window:g} second"
+
+
+class RateLimited(Exception):
+    def __init__(self, scope: str, quota: Quota, retry_after: float):
+        super().__init__(f"{quota} per {scope}")
+        self.scope = scope
+        self.quota = quota
+        self.retry_after = retry_after
+
+
+def parse_quota(value: str) -> Quota:
+    """``"100/60"`` -> 100 requests per 60 seconds."""
+    try:
+        requests, _, window = value.strip().partition("/")
+        quota = Quota(int(requests), float(window or 1))
+    except ValueError as e:
+        raise ValueError(f"Invalid rate limit {value!r}, expected requests/seconds") from e
+    if quota.requests <= 0 or quota.window <= 0:
+        raise ValueError(f"Invalid rate limit {value!r}, expected requests/seconds")
+    return quota
+
+
+def parse_quotas(value: str) -> Dict[str, Quota]:
+    """``"*=1000/60,grafana=600/60"`` -> quota per name, ``*`` matching any other name."""
+    quotas = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, sep, quota = item.rpartition("=")
+        quotas[name.strip() if sep else "*"] = parse_quota(quota)
+    return quotas
+
+
+class MemoryBackend:
+    """Per-process state; each worker enforces the full quota on its own."""
+    name = "memory"
+    blocking = False
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._tats: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, quota: Quota) -> float:
+        """0 when admitted, otherwise the seconds until the request would be."""
+        now = time.time()
+        with self._lock:
+            tat = max(self._tats.get(key, now), now) + quota.interval
+            if tat - now > quota.window:
+                return tat - now - quota.window
+            self._tats[key] = tat
+            if len(self._tats) > self.max_keys:
+                self._purge(now)
+        return 0.0
+
+    def release(self, key: str, quota: Quota) -> None:
+        """Give back one request admitted by acquire()."""
+        with self._lock:
+            if key in self._tats:
+                self._tats[key] -= quota.interval
+
+    def _purge(self, now: float) -> int:
+        expired = [key for key, tat in self._tats.items() if tat <= now]
+        for key in expired:
+            del self._tats[key]
+        return len(expired)
+
+    def purge(self) -> int:
+        with self._lock:
+            return self._purge(time.time())
+
+
+class DatabaseBackend:
+    """State in the rate_limits table; each check is one conditional UPDATE.
+
+    TATs are stored in epoch milliseconds, so workers need roughly synchronized clocks.
+    """
+    name = "database"
+    blocking = True
+
+    def __init__(self, bind=engine):
+        self.bind = bind
+        self.table = models.RateLimit.__table__
+
+    def acquire(self, key: str, quota: Quota, retry: bool = True) -> float:
+        table = self.table
+        now = int(time.time() * 1000)
+        interval, window = math.ceil(quota.interval * 1000), int(quota.window * 1000)
+        tat = case((table.c.tat > now, table.c.tat), else_=now) + interval
+        with self.bind.begin() as conn:
+            # Admit and advance the TAT in one statement so concurrent workers cannot both pass
+            admitted = conn.execute(
+                update(table).where(table.c.key == key, tat - now <= window).values(tat=tat)
+            ).rowcount
+            if admitted:
+                return 0.0
+            stored = conn.execute(select(table.c.tat).where(table.c.key == key)).scalar()
+        if stored is not None:
+            return (max(stored, now) + interval - now - window) / 1000
+        try:
+            with self.bind.begin() as conn:
+                conn.execute(insert(table).values(key=key, tat=now + interval))
+            return 0.0
+        except IntegrityError:
+            # Another worker created the key first; go through the UPDATE path
+            if retry:
+                return self.acquire(key, quota, retry=False)
+            raise
+
+    def release(self, key: str, quota: Quota) -> None:
+        table = self.table
+        with self.bind.begin() as conn:
+            conn.execute(update(table).where(table.c.key == key).values(tat=table.c.tat - math.ceil(quota.interval * 1000)))
+
+    def purge(self) -> int:
+        """Delete keys whose bucket has fully refilled."""
+        with self.bind.begin() as conn:
+            return conn.execute(self.table.delete().where(self.table.c.tat <= int(time.time() * 1000))).rowcount
+
+
+class RedisBackend:
+    """State in Redis; the GCRA step runs as a Lua script using the server clock."""
+    name = "redis"
+    blocking = True
+
+    SCRIPT = """
+    local t = redis.call('TIME')
+    local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+    local interval, window = tonumber(ARGV[1]), tonumber(ARGV[2])
+    local tat = math.max(tonumber(redis.call('GET', KEYS[1]) or now), now) + interval
+    if tat - now > window then
+        return tostring(tat - now - window)
+    end
+    redis.call('SET', KEYS[1], tostring(tat), 'PX', math.ceil((tat - now) * 1000))
+    return '0'
+    """
+
+    # Only an existing key is moved back, keeping its expiry
+    RELEASE = """
+    if redis.call('EXISTS', KEYS[1]) == 1 then
+        redis.call('INCRBYFLOAT', KEYS[1], -tonumber(ARGV[1]))
+    end
+    return 0
+    """
+
+    def __init__(self, url: str):
+        if redis is None:
+            raise ValueError("RATE_LIMIT_STORAGE=redis:// needs the redis package installed")
+        self.client = redis.Redis.from_url(url)
+        self._script = self.client.register_script(self.SCRIPT)
+        self._release = self.client.register_script(self.RELEASE)
+
+    def acquire(self, key: str, quota: Quota) -> float:
+        return float(self._script(keys=[f"ratelimit:{key}"], args=[quota.interval, quota.window]))
+
+    def release(self, key: str, quota: Quota) -> None:
+        self._release(keys=[f"ratelimit:{key}"], args=[quota.interval])
+
+    def purge(self) -> int:
+        return 0  # Keys expire on their own
+
+
+def create_backend(storage: str):
+    if storage in ("", "memory"):
+        return MemoryBackend()
+    if storage == "database":
+        return DatabaseBackend()
+    if storage.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(storage)
+    raise ValueError(f"Unknown RATE_LIMIT_STORAGE {storage!r}")
+
+
+def credential(headers) -> Optional[str]:
+    """Stable, non-reversible identity of the credential a webhook was sent with."""
+    auth_header = headers.get("authorization")
+    if auth_header and auth_header.startswith("Bearer "):
+        return hashlib.sha256(auth_header[7:].encode()).hexdigest()[:16]
+    if headers.get("x-hub-signature-256") or headers.get("x-hub-signature"):
+        return "hmac"
+    return None
+
+
+class RateLimiter:
+    def __init__(self, backend, per_client: Optional[Quota], per_source: Dict[str, Quota], per_token: Optional[Quota]):
+        self.backend = backend
+        self.per_client = per_client
+        self.per_source = per_source
+        self.per_token = per_token
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Dict[str, int]] = {
+            scope: {"allowed": 0, "rejected": 0} for scope in ("client", "source", "token")
+        }
+        self.errors = 0
+
+    def quotas(self, client: Optional[str], webhook_source: Optional[str], token: Optional[str]) -> List[Tuple[str, str, Quota]]:
+        quotas = []
+        if self.per_client and client:
+            quotas.append(("client", client, self.per_client))
+        source_quota = (self.per_source.get(webhook_source) or self.per_source.get("*")) if webhook_source is not None else None
+        if source_quota:
+            quotas.append(("source", webhook_source, source_quota))
+        if self.per_token and token:
+            quotas.append(("token", token, self.per_token))
+        return quotas
+
+    def check(self, client: Optional[str], webhook_source: Optional[str] = None, token: Optional[str] = None) -> None:
+        """Raise RateLimited when any quota is exhausted; storage errors admit the request.
+
+        A request is taken from every quota or from none: when a later quota
+        rejects it, the ones it already passed are given back.
+        """
+        acquired = []
+        try:
+            for scope, key, quota in self.quotas(client, webhook_source, token):
+                retry_after = self.backend.acquire(f"{scope}:{key}", quota)
+                if retry_after > 0:
+                    for held_scope, held_key, held_quota in acquired:
+                        self.backend.release(f"{held_scope}:{held_key}", held_quota)
+                    with self._lock:
+                        self.counters[scope]["rejected"] += 1
+                    raise RateLimited(scope, quota, retry_after)
+                acquired.append((scope, key, quota))
+        except RateLimited:
+            raise
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            logger.error(f"Rate limit storage failed, admitting request: {str(e)}")
+            return
+        with self._lock:
+            for scope, _, _ in acquired:
+                self.counters[scope]["allowed"] += 1
+
+    async def admit(self, request, webhook_source: Optional[str] = None) -> None:
+        """Apply the quotas to ``request``; without a webhook_source only the per-client one."""
+        client = request.client.host if request.client else None
+        token = credential(request.headers) if webhook_source is not None else None
+        if self.backend.blocking:
+            await run_in_threadpool(self.check, client, webhook_source, token)
+        else:
+            self.check(client, webhook_source, token)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "storage": self.backend.name,
+                "errors": self.errors,
+                **{scope: dict(counts) for scope, counts in self.counters.items()},
+            }
+
+
+limiter = RateLimiter(
+    create_backend(settings.rate_limit_storage),
+    per_client=Quota(settings.rate_limit_requests, settings.rate_limit_window) if settings.rate_limit_requests > 0 else None,
+    per_source=parse_quotas(settings.rate_limit_sources),
+    per_token=parse_quota(settings.rate_limit_per_token) if settings.rate_limit_per_token else None,
+)
@@ -0,0 +1,59 @@
+"""Alert retention: purge alerts older than ALERT_RETENTION_DAYS in bounded chunks."""
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from . import blobs, crud, idempotency, models, partitioning, rollups
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+last_run: Optional[dict] = None
+
+
+def rollup_watermark(db: Session) -> Optional[int]:
+    """Highest alert id already folded into the rollups, or None when rollups are disabled."""
+    if settings.rollup_interval <= 0:
+        return None
+    state = db.query(models.RollupState).filter(models.RollupState.name == rollups.ROLLUP_NAME).first()
+    return state.last_alert_id if state else 0
+
+
+def run(db: Session) -> dict:
+    """Purge expired alerts and report rows and seconds for the run."""
+    global last_run
+    started = time.monotonic()
+    # Never purge alerts the rollups have not seen yet, or trend charts would lose them
+    max_id = rollup_watermark(db)
+    dropped, dropped_rows = [], 0
+    if partitioning.enabled(db.get_bind().dialect.name):
+        # Whole expired partitions go first; the chunked delete only trims the boundary one
+        cutoff = datetime.now(timezone.utc) - timedelta(days=settings.alert_retention_days)
+        result = partitioning.drop_expired_partitions(db.connection(), cutoff, max_id=max_id)
+        db.commit()
+        dropped, dropped_rows = result["partitions"], result["rows"]
+        if dropped:
+            # Which keys went with the partitions is unknown; let every cached key be looked up again
+            idempotency.recent_keys.clear()
+    rows = dropped_rows + crud.cleanup_old_alerts(
+        db,
+        settings.alert_retention_days,
+        max_id=max_id,
+        chunk_size=settings.retention_chunk_size,
+        pause=settings.retention_pause_ms / 1000,
+    )
+    # Deleted alerts may have been the last to refer to a payload blob
+    payloads = blobs.purge_orphans(db, chunk_size=settings.retention_chunk_size)
+    last_run = {
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "retention_days": settings.alert_retention_days,
+        "rows": rows,
+        "partitions_dropped": dropped,
+        "payload_blobs": payloads,
+        "seconds": round(time.monotonic() - started, 3),
+    }
+    logger.info(f"Retention removed {rows} alerts in {last_run['seconds']}s")
+    return last_run
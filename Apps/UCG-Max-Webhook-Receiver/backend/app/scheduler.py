@@ -0,0 +1,140 @@
+"""Background maintenance jobs run by APScheduler.
+
+Every process reloads its own webhook profiles. The database maintenance jobs
+run in one process per host: when several workers start, the one holding
+SCHEDULER_LOCK_PATH runs them and the others take over if it exits.
+"""
+import logging
+import time
+from datetime import datetime, timezone
+
+from apscheduler.schedulers.background import BackgroundScheduler
+
+try:
+    import fcntl
+except ImportError:  # Windows has no flock; every process runs the jobs there
+    fcntl = None
+
+from . import mappings, partitioning, ratelimit, retention, rollups
+from .cache import alert_cache
+from .config import settings
+from .database import SessionLocal, engine
+from .stats import alert_stats
+
+logger = logging.getLogger(__name__)
+
+scheduler = BackgroundScheduler(timezone="UTC")
+_lock_file = None
+
+
+def run_job(name: str, fn, *args, **kwargs):
+    """Run ``fn(db, ...)`` in its own session and log what it did."""
+    db = SessionLocal()
+    started = time.monotonic()
+    try:
+        result = fn(db, *args, **kwargs)
+        logger.debug(f"Job {name} finished in {time.monotonic() - started:.2f}s: {result}")
+        return result
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Job {name} failed: {str(e)}")
+    finally:
+        db.close()
+
+
+def materialize_rollups():
+    # Catch up in bounded steps so a large backlog does not hold one long transaction
+    while run_job("rollups", rollups.materialize):
+        pass
+
+
+def prune_rollups():
+    run_job("rollup-prune", rollups.prune, settings.rollup_retention_days)
+
+
+def purge_expired_alerts():
+    report = run_job("retention", retention.run)
+    if report and report["rows"]:
+        alert_cache.clear()
+        if settings.metrics_cache:
+            run_job("metrics-reconcile", alert_stats.reconcile)
+    return report
+
+
+def create_partitions():
+    try:
+        with engine.begin() as conn:
+            partitioning.ensure_partitions(conn)
+    except Exception as e:
+        logger.error(f"Job partitions failed: {str(e)}")
+
+
+def reload_profiles():
+    mappings.registry.reload_if_changed()
+
+
+def purge_rate_limits():
+    try:
+        ratelimit.limiter.backend.purge()
+    except Exception as e:
+        logger.error(f"Job rate-limits failed: {str(e)}")
+
+
+def hold_lock() -> bool:
+    """Take the maintenance lock without waiting; True if this process holds it."""
+    global _lock_file
+    if _lock_file is not None or fcntl is None or not settings.scheduler_lock_path:
+        return True
+    lock_file = open(settings.scheduler_lock_path, "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    _lock_file = lock_file
+    return True
+
+
+def add_maintenance_jobs():
+    if settings.rollup_interval > 0:
+        scheduler.add_job(materialize_rollups, "interval", seconds=settings.rollup_interval,
+                          id="rollups", max_instances=1, coalesce=True, replace_existing=True)
+        scheduler.add_job(prune_rollups, "interval", hours=24, id="rollup-prune", max_instances=1, coalesce=True, replace_existing=True)
+    if settings.retention_interval > 0 and settings.alert_retention_days > 0:
+        scheduler.add_job(purge_expired_alerts, "interval", seconds=settings.retention_interval,
+                          id="retention", max_instances=1, coalesce=True, replace_existing=True)
+    if partitioning.enabled(engine.dialect.name):
+        scheduler.add_job(create_partitions, "interval", hours=6, id="partitions", max_instances=1,
+                          coalesce=True, replace_existing=True, next_run_time=datetime.now(timezone.utc))
+    if ratelimit.limiter.backend.name == "database":
+        scheduler.add_job(purge_rate_limits, "interval", minutes=10, id="rate-limits", max_instances=1,
+                          coalesce=True, replace_existing=True)
+
+
+def claim_maintenance():
+    if hold_lock():
+        logger.info("Took over the maintenance jobs")
+        scheduler.remove_job("maintenance-lock")
+        add_maintenance_jobs()
+
+
+def start():
+    if settings.webhook_profiles_path and settings.webhook_profiles_reload_interval > 0:
+        scheduler.add_job(reload_profiles, "interval", seconds=settings.webhook_profiles_reload_interval,
+                          id="profiles", max_instances=1, coalesce=True, replace_existing=True)
+    if hold_lock():
+        add_maintenance_jobs()
+    else:
+        scheduler.add_job(claim_maintenance, "interval", seconds=30, id="maintenance-lock",
+                          max_instances=1, coalesce=True, replace_existing=True)
+    if scheduler.get_jobs() and not scheduler.running:
+        scheduler.start()
+
+
+def shutdown():
+    global _lock_file
+    if scheduler.running:
+        scheduler.shutdown(wait=True)
+    if _lock_file is not None:
+        _lock_file.close()
+        _lock_file = None
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 class AlertBase(BaseModel):
     alert_id: Optional[str] = None
@@ -31,6 +31,18 @@ class WebhookResponse(BaseModel):
     status: str
     alert_id: str
 
+class BatchItemResult(BaseModel):
+    index: int
+    status: str  # accepted, duplicate or invalid
+    alert_id: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchWebhookResponse(BaseModel):
+    accepted: int
+    duplicates: int
+    invalid: int
+    results: List[BatchItemResult]
+
 class ErrorResponse(BaseModel):
     detail: str
 
@@ -56,6 +68,19 @@ class MetricsResponse(BaseModel):
     total_alerts: int
     severity_counts: Dict[str, int]
     last_24h_count: int
+    source_counts: Optional[Dict[str, int]] = None
+    device_counts: Optional[Dict[str, int]] = None
+    alerts_per_minute_last_hour: Optional[float] = None
+
+class HistogramBucket(BaseModel):
+    bucket: datetime
+    count: int
+
+class TimeseriesPoint(HistogramBucket):
+    webhook_source: Optional[str] = None
+    severity: Optional[str] = None
+    alert_type: Optional[str] = None
+    device: Optional[str] = None
 
 class GenericWebhookPayload(BaseModel):
     """Accepts any JSON structure for generic webhooks"""
@@ -0,0 +1,132 @@
+"""Full-text search over alerts for the ``q`` filter.
+
+Each alert stores a normalised ``search_text`` document built from its summary,
+device, source, type and selected payload fields. It is indexed natively:
+
+* PostgreSQL: GIN index on ``to_tsvector('simple', search_text)``
+* MariaDB/MySQL: FULLTEXT index on ``search_text``
+* SQLite: external-content FTS5 table ``alerts_fts`` kept in sync by triggers
+
+Every query term must match as a word prefix. Where no index is available
+(partitioned MariaDB tables cannot carry FULLTEXT indexes) the search falls
+back to a LIKE scan of ``search_text``.
+"""
+import re
+import threading
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, column, func, literal_column, select, table
+from sqlalchemy.dialects.mysql import match as mysql_match
+
+from . import models, partitioning
+from .config import settings
+
+WORD = re.compile(r"\w+", re.UNICODE)
+MAX_DOCUMENT_LENGTH = 8000
+DOCUMENT_FIELDS = ("summary", "device", "source", "webhook_source", "alert_type", "alert_id")
+PAYLOAD_FIELDS = [f.strip() for f in settings.search_payload_fields.split(",") if f.strip()]
+# Must match the expression of the GIN index exactly or Postgres will not use it
+TS_CONFIG = literal_column("'simple'")
+
+fts = table("alerts_fts", column("rowid"), column("rank"), column("alerts_fts"))
+
+# Engine -> whether its alerts table is partitioned, looked up once per process
+_partitioned: Dict[object, bool] = {}
+_partitioned_lock = threading.Lock()
+
+
+def terms(q: str) -> List[str]:
+    return WORD.findall(q.lower())
+
+
+def _text(value) -> Optional[str]:
+    if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+        return str(value)
+    return None
+
+
+def document(alert: dict) -> str:
+    """Searchable text for an alert: lowercase words separated by single spaces."""
+    values = [alert.get(field) for field in DOCUMENT_FIELDS]
+    for payload in (alert.get("raw_payload"), alert.get("details")):
+        if isinstance(payload, dict):
+            values += [payload.get(field) for field in PAYLOAD_FIELDS]
+    words, seen = [], set()
+    for value in values:
+        text = _text(value)
+        # Payload fields are often copied into summary/device; index each value once
+        if text and text not in seen:
+            seen.add(text)
+            words += WORD.findall(text)
+    return " ".join(words).lower()[:MAX_DOCUMENT_LENGTH]
+
+
+def table_partitioned(bind) -> bool:
+    """Whether the alerts table behind ``bind`` is partitioned, by inspecting it, not by the setting."""
+    engine = bind.engine
+    with _partitioned_lock:
+        if engine not in _partitioned:
+            with engine.connect() as conn:
+                _partitioned[engine] = partitioning.is_partitioned(conn)
+        return _partitioned[engine]
+
+
+def _backend(bind) -> str:
+    dialect = bind.dialect.name
+    if dialect == "postgresql":
+        return "postgresql"
+    if dialect in ("mysql", "mariadb"):
+        # MariaDB cannot keep a FULLTEXT index on a partitioned table
+        return "like" if table_partitioned(bind) else "mysql"
+    if dialect == "sqlite":
+        return "sqlite"
+    return "like"
+
+
+def _tsvector():
+    return func.to_tsvector(TS_CONFIG, models.Alert.search_text)
+
+
+def _query_string(backend: str, words: List[str]) -> str:
+    if backend == "postgresql":
+        return " & ".join(f"{w}:*" for w in words)
+    if backend == "mysql":
+        return " ".join(f"+{w}*" for w in words)
+    return " ".join(f'"{w}"*' for w in words)
+
+
+def match(bind, q: str):
+    """Boolean clause selecting alerts that match every term of ``q``."""
+    words = terms(q)
+    backend = _backend(bind)
+    if not words:
+        return models.Alert.summary.ilike(f"%{q}%")
+    if backend == "like":
+        return and_(*[models.Alert.search_text.like(f"%{w}%") for w in words])
+    query = _query_string(backend, words)
+    if backend == "postgresql":
+        return _tsvector().op("@@")(func.to_tsquery(TS_CONFIG, query))
+    if backend == "mysql":
+        return mysql_match(models.Alert.search_text, against=query).in_boolean_mode()
+    return models.Alert.id.in_(select(fts.c.rowid).where(fts.c.alerts_fts.op("MATCH")(query)))
+
+
+def order_by_relevance(query, bind, q: str):
+    """``query`` ordered most relevant first; unchanged without a full-text index."""
+    words = terms(q)
+    backend = _backend(bind)
+    if not words or backend == "like":
+        return query
+    search_query = _query_string(backend, words)
+    if backend == "postgresql":
+        return query.order_by(func.ts_rank(_tsvector(), func.to_tsquery(TS_CONFIG, search_query)).desc())
+    if backend == "mysql":
+        return query.order_by(mysql_match(models.Alert.search_text, against=search_query).in_boolean_mode().desc())
+    # Join the FTS5 hits once: a correlated rank lookup would rerun MATCH for every row.
+    # FTS5 rank is bm25, where lower means more relevant.
+    hits = (
+        select(fts.c.rowid.label("id"), fts.c.rank.label("rank"))
+        .where(fts.c.alerts_fts.op("MATCH")(search_query))
+        .subquery()
+    )
+    return query.join(hits, hits.c.id == models.Alert.id).order_by(hits.c.rank)
@@ -0,0 +1,499 @@
+"""Durable on-disk spool for INGEST_MODE=spool.
+
+Webhooks are acknowledged once their alert is appended to a local log and
+fsynced, so ingest latency depends on the disk rather than on the database.
+Appends arriving while an fsync runs are written together by the next one.
+The log is split into segments. A replayer bulk-loads records into the
+database whenever the /ready check passes, keeps its position in a checkpoint
+file and deletes segments once they are loaded. Replay is at least once: after
+a crash between a commit and its checkpoint, alerts with an idempotency key are
+skipped by the unique key, alerts without one may be stored twice.
+
+Each worker process claims its own numbered directory under SPOOL_PATH with a
+lock file. Directories of workers that are gone are replayed by whichever
+worker finds them unlocked.
+"""
+import asyncio
+import itertools
+import logging
+import os
+import struct
+import threading
+import zlib
+from datetime import datetime
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from . import crud, payloads
+from .config import settings
+from .database import SessionLocal
+from .ingest import alerts_written
+
+try:
+    import fcntl
+except ImportError:  # Windows has no flock; one unshared spool directory is used
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Length and CRC-32 of the JSON record that follows
+HEADER = struct.Struct(">II")
+SEGMENT_SUFFIX = ".log"
+CHECKPOINT = "checkpoint"
+
+# Alert fields spooled as ISO strings that must be datetimes again for the INSERT
+DATETIME_FIELDS = ('timestamp',)
+
+
+class SpoolFull(Exception):
+    """Raised when the spool cannot accept more alerts."""
+
+
+def encode(alert: dict) -> bytes:
+    data = payloads.dumps(alert)
+    return HEADER.pack(len(data), zlib.crc32(data)) + data
+
+
+def decode(data: bytes) -> dict:
+    alert = payloads.loads(data)
+    for name in DATETIME_FIELDS:
+        if isinstance(alert.get(name), str):
+            alert[name] = datetime.fromisoformat(alert[name])
+    return alert
+
+
+def read_records(path: str, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, bytes]]:
+    """(offset after the record, record) from ``start``, stopping at a torn or corrupt record."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        offset = start
+        while end is None or offset < end:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return
+            length, crc = HEADER.unpack(header)
+            data = f.read(length)
+            if len(data) < length or zlib.crc32(data) != crc:
+                return
+            offset += HEADER.size + length
+            yield offset, data
+
+
+def segment_name(seq: int) -> str:
+    return f"{seq:012d}{SEGMENT_SUFFIX}"
+
+
+def list_segments(path: str) -> List[int]:
+    names = os.listdir(path) if os.path.isdir(path) else []
+    return sorted(int(n[:-len(SEGMENT_SUFFIX)]) for n in names if n.endswith(SEGMENT_SUFFIX) and n[:-len(SEGMENT_SUFFIX)].isdigit())
+
+
+def try_lock(path: str):
+    """Lock file of spool directory ``path`` if no other process holds it, else None."""
+    os.makedirs(path, exist_ok=True)
+    lock_file = open(os.path.join(path, "lock"), "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def sync_directory(path: str) -> None:
+    """Make created, renamed and deleted files in ``path`` durable."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:  # Windows cannot open directories
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_alerts(alerts: List[dict]) -> None:
+    db = SessionLocal()
+    try:
+        stored = crud.create_alerts(db, alerts)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    # Alerts replayed a second time after a crash are skipped by their key
+    alerts_written(stored)
+
+
+def database_ready() -> bool:
+    """The /ready check: True when the database answers."""
+    db = SessionLocal()
+    try:
+        crud.ping(db)
+        return True
+    except Exception as e:
+        logger.debug(f"Database not ready for spool replay: {e}")
+        return False
+    finally:
+        db.close()
+
+
+class Spool:
+    def __init__(
+        self,
+        base_path: str,
+        segment_bytes: int = 16 * 1024 * 1024,
+        max_bytes: int = 1024 * 1024 * 1024,
+        batch_size: int = 500,
+        linger_ms: int = 50,
+        retry_interval: float = 5,
+        write: Callable[[List[dict]], None] = write_alerts,
+        healthy: Callable[[], bool] = database_ready,
+    ):
+        self.base_path = base_path
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+        self.linger = linger_ms / 1000
+        self.retry_interval = retry_interval
+        self.write = write
+        self.healthy = healthy
+        self.path: Optional[str] = None
+        # Guards the active segment between the event loop's writes and the replayer thread
+        self._lock = threading.Lock()
+        self._lock_file = None
+        self._file = None
+        self._active = 0  # segment appends go to, created on the first one
+        self._size = 0  # fsynced bytes in the active segment
+        self._checkpoint = (0, 0)  # (segment, offset) everything before is in the database
+        self.backlog_bytes = 0
+        self._pending: List[Tuple[bytes, int, asyncio.Future]] = []
+        self._pending_bytes = 0
+        self._pending_event: Optional[asyncio.Event] = None
+        self._replay_event: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._replayer: Optional[asyncio.Task] = None
+        self._inflight: Optional[asyncio.Future] = None
+        # Set on shutdown; shared with orphan replays so they stop between batches too
+        self._stopping = threading.Event()
+        self.appended = 0
+        self.replayed = 0
+        self.rejected = 0  # spooled alerts the database refused
+        self.refused = 0  # webhooks turned away because the spool was full or failing
+        self.fsyncs = 0
+        self.database_available: Optional[bool] = None
+
+    # Files
+
+    def open(self) -> None:
+        """Claim a spool directory and recover its position."""
+        if fcntl is None:
+            self.path = os.path.join(self.base_path, "0")
+            os.makedirs(self.path, exist_ok=True)
+        else:
+            for slot in itertools.count():
+                path = os.path.join(self.base_path, str(slot))
+                self._lock_file = try_lock(path)
+                if self._lock_file is not None:
+                    self.path = path
+                    break
+        self.recover()
+
+    def recover(self) -> None:
+        self._checkpoint = self._read_checkpoint()
+        segments = list_segments(self.path)
+        # Appends always start a new segment; an old one may end in a torn record
+        self._active = max(segments[-1] + 1 if segments else 0, self._checkpoint[0])
+        self._size = 0
+        seq, offset = self._checkpoint
+        self.backlog_bytes = sum(
+            os.path.getsize(os.path.join(self.path, segment_name(s))) - (offset if s == seq else 0)
+            for s in segments if s >= seq
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+
+    def _read_checkpoint(self) -> Tuple[int, int]:
+        try:
+            with open(os.path.join(self.path, CHECKPOINT)) as f:
+                seq, offset = f.read().split()
+                return int(seq), int(offset)
+        except (OSError, ValueError):
+            return 0, 0
+
+    def _save_checkpoint(self, seq: int, offset: int) -> None:
+        path = os.path.join(self.path, CHECKPOINT)
+        with open(path + ".tmp", "w") as f:
+            f.write(f"{seq} {offset}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        self._checkpoint = (seq, offset)
+
+    def _seal(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._active += 1
+        self._size = 0
+
+    def _write(self, data: bytes, count: int) -> None:
+        """Append records and fsync them; runs in the threadpool."""
+        with self._lock:
+            if self._size and self._size + len(data) > self.segment_bytes:
+                self._seal()
+            if self._file is None:
+                self._file = open(os.path.join(self.path, segment_name(self._active)), "ab")
+                sync_directory(self.path)
+            try:
+                self._file.write(data)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except OSError:
+                # Drop the partial write and continue in a fresh segment
+                try:
+                    self._file.truncate(self._size)
+                except OSError:
+                    pass
+                self._seal()
+                raise
+            self._size += len(data)
+            self.backlog_bytes += len(data)
+            self.appended += count
+            self.fsyncs += 1
+
+    # Appending
+
+    @property
+    def running(self) -> bool:
+        return self._flusher is not None and not self._flusher.done()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        await run_in_threadpool(self.open)
+        self._stopping.clear()
+        self._pending_event = asyncio.Event()
+        self._replay_event = asyncio.Event()
+        self._replay_event.set()  # load whatever the last run left behind
+        self._flusher = asyncio.create_task(self._flush_loop())
+        self._replayer = asyncio.create_task(self._replay_loop())
+        logger.info(f"Spool started in {self.path} ({self.backlog_bytes} bytes to replay)")
+
+    async def append(self, alerts: List[dict]) -> None:
+        """Spool alerts; returns once they are on disk."""
+        if not self.running:
+            raise SpoolFull("Spool is not running")
+        data = b"".join(encode(alert) for alert in alerts)
+        if self.backlog_bytes + self._pending_bytes + len(data) > self.max_bytes:
+            self.refused += len(alerts)
+            raise SpoolFull("Spool is full")
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((data, len(alerts), future))
+        self._pending_bytes += len(data)
+        self._pending_event.set()
+        await future
+
+    async def _flush(self, batch: list) -> None:
+        if not batch:
+            return
+        data = b"".join(records for records, _, _ in batch)
+        try:
+            await run_in_threadpool(self._write, data, sum(count for _, count, _ in batch))
+        except OSError as e:
+            logger.error(f"Spool write of {len(batch)} appends failed: {e}")
+            self.refused += sum(count for _, count, _ in batch)
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(SpoolFull(f"Spool write failed: {e}"))
+            return
+        finally:
+            self._pending_bytes -= len(data)
+        for _, _, future in batch:
+            if not future.done():
+                future.set_result(None)
+        self._replay_event.set()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await self._pending_event.wait()
+            self._pending_event.clear()
+            # Everything appended during the previous fsync goes out with one fsync
+            batch, self._pending = self._pending, []
+            # Shield the write so a shutdown mid-fsync does not fail acknowledged appends
+            self._inflight = asyncio.ensure_future(self._flush(batch))
+            await asyncio.shield(self._inflight)
+            self._inflight = None
+
+    async def stop(self) -> None:
+        """Stop accepting alerts, fsync those already appended and stop replaying."""
+        if self._flusher is None:
+            return
+        self._stopping.set()
+        self._flusher.cancel()
+        try:
+            await self._flusher
+        except asyncio.CancelledError:
+            pass
+        self._flusher = None
+        if self._inflight:
+            await self._inflight
+            self._inflight = None
+        batch, self._pending = self._pending, []
+        await self._flush(batch)
+        # The replayer finishes the batch it is loading; the rest waits for the next start
+        self._replay_event.set()
+        await self._replayer
+        self._replayer = None
+        await run_in_threadpool(self.close)
+        logger.info(f"Spool stopped ({self.backlog_bytes} bytes left to replay)")
+
+    # Replaying
+
+    async def _replay_loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._replay_event.wait(), self.retry_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._replay_event.clear()
+            if self._stopping.is_set():
+                return
+            # Let a burst of appends collect into full batches
+            await asyncio.sleep(self.linger)
+            try:
+                caught_up = await run_in_threadpool(self.replay)
+                if caught_up:
+                    await run_in_threadpool(self.replay_orphans)
+            except Exception as e:
+                logger.error(f"Spool replay failed: {e}")
+                caught_up = False
+            if not caught_up and not self._stopping.is_set():
+                await asyncio.sleep(self.retry_interval)
+
+    def replay(self) -> bool:
+        """Load spooled alerts into the database; False if it is unavailable."""
+        self.database_available = self.healthy()
+        if not self.database_available:
+            return False
+        while not self._stopping.is_set():
+            with self._lock:
+                active, active_size = self._active, self._size
+            seq, offset = self._checkpoint
+            segments = [s for s in list_segments(self.path) if s >= seq]
+            if not segments:
+                return True
+            if segments[0] != seq:
+                seq, offset = segments[0], 0
+            path = os.path.join(self.path, segment_name(seq))
+            batch = list(itertools.islice(
+                read_records(path, offset, active_size if seq == active else None), self.batch_size
+            ))
+            if batch:
+                if not self._load(seq, offset, batch):
+                    self.database_available = False
+                    return False
+                continue
+            if seq == active:
+                return True
+            # Sealed and loaded; anything left is a record torn by a crash mid-append
+            remaining = os.path.getsize(path) - offset
+            if remaining:
+                logger.warning(f"Skipping {remaining} unreadable bytes at the end of {path}")
+            os.remove(path)
+            self._save_checkpoint(seq + 1, 0)
+            sync_directory(self.path)
+            with self._lock:
+                self.backlog_bytes -= remaining
+        return False
+
+    def _load(self, seq: int, offset: int, batch: List[Tuple[int, bytes]]) -> bool:
+        """Write one batch, row by row if the batch fails; False if the database went away."""
+        alerts = [decode(data) for _, data in batch]
+        done = offset
+        try:
+            self.write(alerts)
+            self.replayed += len(alerts)
+            done = batch[-1][0]
+        except Exception as e:
+            if not self.healthy():
+                logger.warning(f"Database unavailable, spool replay paused: {e}")
+                return False
+            logger.warning(f"Replaying {len(alerts)} spooled alerts failed, retrying individually: {e}")
+            for (end, _), alert in zip(batch, alerts):
+                try:
+                    self.write([alert])
+                    self.replayed += 1
+                except Exception as e:
+                    if not self.healthy():
+                        self._advance(seq, offset, done)
+                        logger.warning(f"Database unavailable, spool replay paused: {e}")
+                        return False
+                    logger.error(f"Dropping spooled alert {alert.get('alert_id')}: {e}")
+                    self.rejected += 1
+                done = end
+        self._advance(seq, offset, done)
+        return True
+
+    def _advance(self, seq: int, offset: int, done: int) -> None:
+        if done == offset:
+            return
+        self._save_checkpoint(seq, done)
+        with self._lock:
+            self.backlog_bytes -= done - offset
+
+    def replay_orphans(self) -> None:
+        """Load spool directories whose worker is gone, e.g. after reducing WORKERS."""
+        if fcntl is None or not os.path.isdir(self.base_path):
+            return
+        for name in sorted(os.listdir(self.base_path)):
+            path = os.path.join(self.base_path, name)
+            if path == self.path or not name.isdigit() or not list_segments(path):
+                continue
+            lock_file = try_lock(path)
+            if lock_file is None:
+                continue
+            try:
+                orphan = Spool(self.base_path, batch_size=self.batch_size, write=self.write, healthy=self.healthy)
+                orphan.path = path
+                orphan._stopping = self._stopping
+                orphan.recover()
+                logger.info(f"Replaying {orphan.backlog_bytes} bytes left in {path}")
+                orphan.replay()
+                self.replayed += orphan.replayed
+                self.rejected += orphan.rejected
+            finally:
+                lock_file.close()
+
+    def stats(self) -> dict:
+        segments = len(list_segments(self.path)) if self.path else 0
+        with self._lock:
+            return {
+                "path": self.path,
+                "segments": segments,
+                "backlog_bytes": self.backlog_bytes,
+                "appended": self.appended,
+                "replayed": self.replayed,
+                "rejected": self.rejected,
+                "refused": self.refused,
+                "fsyncs": self.fsyncs,
+                "database_available": self.database_available,
+            }
+
+
+spool = Spool(
+    settings.spool_path,
+    segment_bytes=settings.spool_segment_bytes,
+    max_bytes=settings.spool_max_bytes,
+    batch_size=settings.ingest_batch_size,
+    linger_ms=settings.ingest_linger_ms,
+    retry_interval=settings.spool_retry_interval,
+)
@@ -0,0 +1,174 @@
+"""Rolling in-memory alert metrics.
+
+Counters are updated as alerts are written and reconciled from the database on
+startup and periodically, so /api/metrics answers without querying the alerts
+table. Each worker process keeps its own copy; reconciliation corrects drift
+caused by writes from other workers or bulk deletes.
+"""
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional
+
+from . import crud
+
+# granularity -> (bucket width in seconds, buckets retained)
+GRANULARITIES = {
+    "minute": (60, 24 * 60),
+    "hour": (3600, 7 * 24),
+    "day": (86400, 90),
+}
+
+
+def _field(alert, name: str):
+    return alert.get(name) if isinstance(alert, dict) else getattr(alert, name, None)
+
+
+def _epoch(value: Optional[datetime]) -> float:
+    if value is None:
+        return time.time()
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class AlertStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ready = False
+        self.reconciled_at: Optional[float] = None
+        self._journal: Optional[list] = None
+        self._reset()
+
+    def _reset(self):
+        self.total = 0
+        self.by_severity = Counter()
+        self.by_source = Counter()
+        self.by_device = Counter()
+        self.buckets: Dict[str, Counter] = {name: Counter() for name in GRANULARITIES}
+
+    def _apply(self, alert, delta: int, now: float):
+        self.total += delta
+        self.by_severity[_field(alert, "severity") or "unknown"] += delta
+        self.by_source[_field(alert, "webhook_source") or "unknown"] += delta
+        if _field(alert, "device"):
+            self.by_device[_field(alert, "device")] += delta
+        received = _epoch(_field(alert, "received_at")) if _field(alert, "received_at") else now
+        for name, (width, keep) in GRANULARITIES.items():
+            buckets = self.buckets[name]
+            bucket = int(received // width)
+            if bucket > int(now // width) - keep:
+                buckets[bucket] += delta
+                if buckets[bucket] <= 0:
+                    del buckets[bucket]
+
+    def record(self, alerts: Iterable):
+        """Count alerts (dicts or ORM rows) that were just written."""
+        now = time.time()
+        with self._lock:
+            for alert in alerts:
+                self._apply(alert, 1, now)
+                if self._journal is not None:
+                    self._journal.append(alert)
+            self._prune(now)
+
+    def discard(self, alerts: Iterable):
+        now = time.time()
+        with self._lock:
+            for alert in alerts:
+                self._apply(alert, -1, now)
+
+    def _prune(self, now: float):
+        for name, (width, keep) in GRANULARITIES.items():
+            buckets = self.buckets[name]
+            oldest = int(now // width) - keep
+            if buckets and min(buckets) <= oldest:
+                for bucket in [b for b in buckets if b <= oldest]:
+                    del buckets[bucket]
+
+    def reconcile(self, db):
+        """Rebuild every counter from the database.
+
+        Counts are taken up to the current max id; alerts recorded while the
+        queries run are journaled and replayed on top unless already counted.
+        """
+        with self._lock:
+            self._journal = []
+        try:
+            now = datetime.now(timezone.utc)
+            max_id = crud.max_alert_id(db)
+            by_severity = crud.count_alerts_by(db, "severity", max_id)
+            by_source = crud.count_alerts_by(db, "webhook_source", max_id)
+            by_device = crud.count_alerts_by(db, "device", max_id)
+            buckets = {}
+            for name, (width, keep) in GRANULARITIES.items():
+                since = now.replace(tzinfo=None) - timedelta(seconds=width * (keep - 1))
+                counts = crud.count_alerts_per_bucket(db, name, since, max_id)
+                buckets[name] = Counter({int(b.timestamp() // width): c for b, c in counts.items()})
+        except Exception:
+            with self._lock:
+                self._journal = None
+            raise
+        with self._lock:
+            journal, self._journal = self._journal, None
+            self._reset()
+            self.total = sum(by_severity.values())
+            self.by_severity.update({k or "unknown": v for k, v in by_severity.items()})
+            self.by_source.update({k or "unknown": v for k, v in by_source.items()})
+            self.by_device.update({k: v for k, v in by_device.items() if k})
+            self.buckets = buckets
+            now = time.time()
+            for alert in journal:
+                if self._after_reconcile(alert, max_id):
+                    self._apply(alert, 1, now)
+            self.ready = True
+            self.reconciled_at = time.time()
+
+    @staticmethod
+    def _after_reconcile(alert, max_id: int) -> bool:
+        """Whether a journaled alert is missing from counts taken up to ``max_id``."""
+        alert_id = _field(alert, "id")
+        if alert_id is not None:
+            return alert_id > max_id
+        # Batches without reported ids only know the largest id before their INSERT;
+        # older ones are taken as counted, and the next reconcile corrects a miss
+        after_id = _field(alert, "inserted_after_id")
+        return after_id is None or after_id >= max_id
+
+    def window_count(self, seconds: int, granularity: str = "minute") -> int:
+        width, _ = GRANULARITIES[granularity]
+        first = int((time.time() - seconds) // width) + 1
+        with self._lock:
+            return sum(c for b, c in self.buckets[granularity].items() if b >= first)
+
+    def histogram(self, granularity: str, count: int):
+        """Most recent ``count`` buckets, oldest first, including empty ones."""
+        width, keep = GRANULARITIES[granularity]
+        count = min(count, keep)
+        current = int(time.time() // width)
+        with self._lock:
+            buckets = self.buckets[granularity]
+            return [
+                {
+                    "bucket": datetime.fromtimestamp(b * width, timezone.utc).isoformat(),
+                    "count": buckets.get(b, 0),
+                }
+                for b in range(current - count + 1, current + 1)
+            ]
+
+    def snapshot(self, top_devices: int = 20) -> dict:
+        last_hour = self.window_count(3600)
+        last_day = self.window_count(86400)
+        with self._lock:
+            return {
+                "total_alerts": self.total,
+                "severity_counts": {k: v for k, v in self.by_severity.items() if v},
+                "last_24h_count": last_day,
+                "source_counts": {k: v for k, v in self.by_source.items() if v},
+                "device_counts": dict(self.by_device.most_common(top_devices)),
+                "alerts_per_minute_last_hour": round(last_hour / 60, 2),
+            }
+
+
+alert_stats = AlertStats()
@@ -0,0 +1,164 @@
+"""Live alert stream for dashboards, served as Server-Sent Events.
+
+Alerts are published here as they are written and fanned out in-process to every
+subscriber whose filters match, so open dashboards cost no database queries.
+Each subscriber has a bounded buffer: a client that falls behind loses the
+overflow and is told how many events it missed, so it can refetch, instead of
+growing memory. Like the /api/metrics counters, a stream only sees alerts
+written by its own worker process.
+"""
+import asyncio
+import itertools
+import json
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+
+from .config import settings
+
+STREAM_FIELDS = ('id', 'alert_id', 'webhook_source', 'source', 'device', 'severity', 'alert_type', 'timestamp', 'summary')
+
+# Events joined into one write when a client has several waiting
+MAX_CHUNK_EVENTS = 100
+
+
+def event_record(alert) -> dict:
+    """The streamed fields of a written alert, given as a row dict or an ORM row."""
+    record = {}
+    for name in STREAM_FIELDS:
+        value = alert.get(name) if isinstance(alert, dict) else getattr(alert, name, None)
+        record[name] = value.isoformat() if isinstance(value, datetime) else value
+    return record
+
+
+def metrics_delta(records: List[dict]) -> dict:
+    """Change to the /api/metrics counters caused by ``records``."""
+    return {
+        "total_alerts": len(records),
+        "severity_counts": Counter(r["severity"] or "unknown" for r in records),
+        "source_counts": Counter(r["webhook_source"] or "unknown" for r in records),
+        "device_counts": Counter(r["device"] for r in records if r["device"]),
+    }
+
+
+def format_event(event: str, data, event_id: Optional[int] = None) -> bytes:
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event}", f"data: {json.dumps(data, separators=(',', ':'))}"]
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+class Subscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop, filters: Dict[str, str], buffer_size: int):
+        self.loop = loop
+        self.filters = filters
+        self.queue: asyncio.Queue = asyncio.Queue(buffer_size)
+        self.dropped = 0
+        self.lagged = 0  # dropped since the client was last told
+
+    def matches(self, record: dict) -> bool:
+        return all(record.get(name) == value for name, value in self.filters.items())
+
+    def offer(self, events: List[bytes]) -> None:
+        """Buffer events without waiting; runs on the subscriber's event loop."""
+        for event in events:
+            try:
+                self.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.dropped += 1
+                self.lagged += 1
+
+
+class AlertHub:
+    def __init__(self, buffer_size: int = 1000, max_subscribers: int = 100):
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._subscribers: List[Subscriber] = []
+        self._ids = itertools.count(1)
+        self.published = 0
+        self._dropped_closed = 0
+
+    def full(self) -> bool:
+        with self._lock:
+            return len(self._subscribers) >= self.max_subscribers
+
+    def subscribe(self, filters: Dict[str, Optional[str]]) -> Optional[Subscriber]:
+        """None when STREAM_MAX_CLIENTS streams are already open."""
+        subscriber = Subscriber(
+            asyncio.get_running_loop(),
+            {name: value for name, value in filters.items() if value is not None},
+            self.buffer_size,
+        )
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+                self._dropped_closed += subscriber.dropped
+
+    def publish(self, alerts: Iterable) -> None:
+        """Fan written alerts out to matching subscribers; safe to call from any thread."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if not subscribers:
+            return
+        records = [event_record(alert) for alert in alerts]
+        if not records:
+            return
+        # Encode each event once, however many clients receive it
+        events = [(record, format_event("alert", record, next(self._ids))) for record in records]
+        delta = format_event("metrics", metrics_delta(records))
+        with self._lock:
+            self.published += len(events)
+        for subscriber in subscribers:
+            batch = [event for record, event in events if subscriber.matches(record)]
+            batch.append(delta)
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.offer, batch)
+            except RuntimeError:
+                # Event loop closed under a client that is going away
+                self.unsubscribe(subscriber)
+
+    async def events(self, filters: Dict[str, Optional[str]], snapshot: Optional[dict] = None) -> AsyncIterator[bytes]:
+        """SSE body for one client, subscribed while the response is being sent."""
+        # Subscribing here rather than in the route means a client that leaves
+        # before the body starts never holds a slot
+        subscriber = self.subscribe(filters)
+        if subscriber is None:
+            # Filled up since the route checked; the client's EventSource retries
+            return
+        try:
+            if snapshot is not None:
+                yield format_event("snapshot", snapshot)
+            while True:
+                try:
+                    chunk = [await asyncio.wait_for(subscriber.queue.get(), settings.stream_keepalive_interval)]
+                except asyncio.TimeoutError:
+                    # Comment line so proxies keep an idle stream open
+                    yield b": keepalive\n\n"
+                    continue
+                while len(chunk) < MAX_CHUNK_EVENTS and not subscriber.queue.empty():
+                    chunk.append(subscriber.queue.get_nowait())
+                if subscriber.lagged:
+                    chunk.append(format_event("lagged", {"dropped": subscriber.lagged}))
+                    subscriber.lagged = 0
+                yield b"".join(chunk)
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "clients": len(self._subscribers),
+                "published": self.published,
+                "dropped": self._dropped_closed + sum(s.dropped for s in self._subscribers),
+            }
+
+
+alert_hub = AlertHub(buffer_size=settings.stream_buffer_size, max_subscribers=settings.stream_max_clients)
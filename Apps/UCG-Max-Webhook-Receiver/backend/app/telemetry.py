@@ -0,0 +1,228 @@
+"""Operational metrics in the Prometheus text format, served at /metrics.
+
+Request latency per route, the stages of the webhook path, database pool
+checkouts and occupancy, ingest queue depth and rate-limit decisions. Values
+are kept per worker process, like the counters behind /api/metrics.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Seconds; fine at the low end where single webhook stages land
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format(name: str, labels: Dict[str, str], value: float) -> str:
+    if labels:
+        name += "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+    if value == float("inf"):
+        return f"{name} +Inf"
+    return f"{name} {value:.10g}" if isinstance(value, float) else f"{name} {value}"
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # label values -> [count per bucket (+Inf last), sum]
+        self._values: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, *label_values: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def samples(self) -> List[Sample]:
+        samples = []
+        with self._lock:
+            values = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        for key, counts, total in values:
+            labels = dict(zip(self.labels, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append((self.name + "_bucket", {**labels, "le": "+Inf" if bound == float("inf") else f"{bound:g}"}, cumulative))
+            samples.append((self.name + "_sum", labels, total))
+            samples.append((self.name + "_count", labels, cumulative))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list = []
+        # Called at scrape time: yield (name, type, help, [(labels, value)]) for state owned elsewhere
+        self.collectors: List[Callable[[], Iterable[tuple]]] = []
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines += [f"# HELP {metric.name} {metric.help}", f"# TYPE {metric.name} {metric.type}"]
+            lines += [_format(*sample) for sample in metric.samples()]
+        for collect in self.collectors:
+            for name, kind, help, values in collect():
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                sample_name = name + "_total" if kind == "counter" else name
+                lines += [_format(sample_name, labels, value) for labels, value in values]
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+request_duration = registry.histogram(
+    "http_request_duration_seconds", "Time to last response byte by route template", ("method", "route", "status"),
+)
+webhook_stage = registry.histogram(
+    "webhook_stage_duration_seconds", "Time spent in each stage of webhook ingestion", ("stage",),
+)
+pool_checkout = registry.histogram(
+    "db_pool_checkout_duration_seconds", "Wait for a pooled database connection, including opening one", ("engine",),
+)
+
+
+def stage(name: str):
+    """Time one stage of the webhook path: auth, parse, mapping, idempotency, insert or commit."""
+    return webhook_stage.time(name)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency; unmatched paths share one label."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "other"
+            request_duration.observe(time.perf_counter() - started, scope["method"], route, str(status))
+
+
+def _pool_samples(engines) -> Iterable[tuple]:
+    connections, sizes = [], []
+    for label, pool in engines:
+        if not hasattr(pool, "checkedout"):
+            continue
+        sizes.append(({"engine": label}, pool.size()))
+        connections += [
+            ({"engine": label, "state": "checked_out"}, pool.checkedout()),
+            ({"engine": label, "state": "idle"}, pool.checkedin()),
+            ({"engine": label, "state": "overflow"}, max(0, pool.overflow())),
+        ]
+    yield "db_pool_size", "gauge", "Configured pool size", sizes
+    yield "db_pool_connections", "gauge", "Pooled connections by state", connections
+
+
+def collect_runtime() -> Iterable[tuple]:
+    from . import database, idempotency, ratelimit
+    from .cache import alert_cache
+    from .ingest import ingest_queue
+    from .spool import spool
+    from .stream import alert_hub
+
+    engines = [("sync", database.engine.pool)]
+    if database.read_engine is not None:
+        engines.append(("read", database.read_engine.pool))
+    if database.async_engine is not None:
+        engines.append(("async", database.async_engine.pool))
+    yield from _pool_samples(engines)
+
+    yield "ingest_queue_depth", "gauge", "Alerts waiting in the write-behind queue", [({}, ingest_queue.depth())]
+    yield "ingest_queue_alerts", "counter", "Alerts handled by the write-behind queue", [
+        ({"result": "enqueued"}, ingest_queue.enqueued),
+        ({"result": "written"}, ingest_queue.written),
+        ({"result": "rejected"}, ingest_queue.rejected),
+    ]
+
+    spooled = spool.stats()
+    yield "spool_backlog_bytes", "gauge", "Spooled bytes not yet loaded into the database", [({}, spooled["backlog_bytes"])]
+    yield "spool_alerts", "counter", "Alerts handled by the on-disk spool", [
+        ({"result": "appended"}, spooled["appended"]),
+        ({"result": "replayed"}, spooled["replayed"]),
+        ({"result": "rejected"}, spooled["rejected"]),
+        ({"result": "refused"}, spooled["refused"]),
+    ]
+    yield "spool_fsyncs", "counter", "fsync calls made for spool appends", [({}, spooled["fsyncs"])]
+
+    limits = ratelimit.limiter.stats()
+    yield "rate_limit_decisions", "counter", "Webhook rate-limit checks by scope and result", [
+        ({"scope": scope, "result": result}, limits[scope][result])
+        for scope in ("client", "source", "token") for result in ("allowed", "rejected")
+    ]
+    yield "rate_limit_storage_errors", "counter", "Rate-limit checks admitted because storage failed", [({}, limits["errors"])]
+
+    streams = alert_hub.stats()
+    yield "alert_stream_clients", "gauge", "Open /api/alerts/stream connections", [({}, streams["clients"])]
+    yield "alert_stream_dropped_events", "counter", "Stream events dropped for clients that fell behind", [({}, streams["dropped"])]
+
+    cached = alert_cache.stats()
+    yield "alert_cache_lookups", "counter", "/api/alerts result cache lookups", [
+        ({"result": "hit"}, cached["hits"]),
+        ({"result": "miss"}, cached["misses"]),
+    ]
+
+    keys = idempotency.stats()
+    yield "idempotency_cache_lookups", "counter", "Recent idempotency key lookups", [
+        ({"result": "hit"}, keys["cache_hits"]),
+        ({"result": "miss"}, keys["cache_misses"]),
+    ]
+
+
+registry.collectors.append(collect_runtime)
+
+
+def time_checkout(pool_class, label: str):
+    """Subclass of a SQLAlchemy queue pool that records each checkout's wait."""
+
+    class TimedPool(pool_class):
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                pool_checkout.observe(time.perf_counter() - started, label)
+
+    TimedPool.__name__ = f"Timed{pool_class.__name__}"
+    return TimedPool
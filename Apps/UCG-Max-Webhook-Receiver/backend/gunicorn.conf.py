@@ -0,0 +1,39 @@
+"""Gunicorn settings for the multi-worker server (docker/start.sh with WORKERS other than 1).
+
+The app is imported once in the master (preload_app) and forked into uvicorn
+workers. Database connections must not be shared between processes, so each
+worker discards the pools it inherited and opens its own.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+# WORKERS=0 runs one worker per CPU core
+workers = int(os.getenv("WORKERS", "1")) or multiprocessing.cpu_count()
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+# On SIGTERM each worker stops accepting, finishes in-flight requests and drains its
+# ingest queue in the app lifespan; it is killed if that takes longer than this
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = 60
+keepalive = 5
+accesslog = "-"
+
+
+def on_starting(server):
+    from app import database
+
+    # Catches -w on the command line too, which WORKERS does not see
+    if database.EMBEDDED_SQLITE and server.cfg.workers != 1:
+        raise SystemExit("Embedded SQLite needs a single worker; use MariaDB or PostgreSQL to run several")
+
+
+def post_fork(server, worker):
+    from app import database
+
+    # close=False leaves the parent's connections alone instead of closing them from the child
+    database.engine.dispose(close=False)
+    if database.read_engine is not None:
+        database.read_engine.dispose(close=False)
+    if database.async_engine is not None:
+        database.async_engine.sync_engine.dispose(close=False)
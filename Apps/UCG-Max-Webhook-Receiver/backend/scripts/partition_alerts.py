@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""Convert an existing alerts table into a range-partitioned table.
+
+Run from the backend directory with the same DATABASE_URL as the app:
+
+    python -m scripts.partition_alerts --granularity month
+
+PostgreSQL copies rows into a new partitioned table in id batches; MariaDB
+rebuilds the table in place. Stop the receiver while it runs, since the
+alerts table is locked for the duration.
+"""
+import argparse
+import logging
+
+from app import partitioning
+from app.database import engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--granularity", choices=partitioning.GRANULARITIES, default="month")
+    parser.add_argument("--batch-size", type=int, default=10000, help="rows copied per INSERT on PostgreSQL")
+    parser.add_argument("--dry-run", action="store_true", help="only report the current layout")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if engine.dialect.name not in partitioning.SUPPORTED_DIALECTS:
+        parser.error(f"partitioning is not supported on {engine.dialect.name}")
+
+    with engine.begin() as conn:
+        if args.dry_run or partitioning.is_partitioned(conn):
+            print(f"partitioned: {partitioning.is_partitioned(conn)}")
+            for name in partitioning.list_partitions(conn):
+                print(f"  {name}")
+            return
+        copied = partitioning.convert_table(conn, args.granularity, batch_size=args.batch_size)
+        print(f"Converted alerts table ({copied} rows) to {args.granularity} partitions")
+
+
+if __name__ == "__main__":
+    main()
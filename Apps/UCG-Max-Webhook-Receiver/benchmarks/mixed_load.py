@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Mixed-load latency benchmark: webhook writers and dashboard readers at once.
+
+Runs the app in-process once per database mode (sync threadpool vs. async
+driver) and reports p50/p99 latency per route.
+
+    python benchmarks/mixed_load.py --database-url sqlite:////tmp/bench.db
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_load(args):
+    import httpx
+    from app import models
+    from app.database import engine
+    from app.main import app
+    from app.config import settings
+
+    models.Base.metadata.create_all(bind=engine)  # Benchmark databases skip Alembic
+
+    headers = {"Authorization": f"Bearer {settings.bearer_token}"}
+    latencies = {"webhook": [], "alerts": [], "metrics": []}
+    deadline = time.monotonic() + args.duration
+
+    async def timed(name, coro):
+        start = time.perf_counter()
+        response = await coro
+        latencies[name].append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        async def writer(n):
+            i = 0
+            while time.monotonic() < deadline:
+                payload = {"message": f"bench {n}-{i}", "severity": "warning", "host": f"dev-{i % 20}"}
+                await timed("webhook", client.post("/webhook?webhook_source=bench", json=payload, headers=headers))
+                i += 1
+
+        async def reader():
+            while time.monotonic() < deadline:
+                await timed("alerts", client.get("/api/alerts", params={"severity": "warning", "page_size": 50}))
+                await timed("metrics", client.get("/api/metrics"))
+
+        await asyncio.gather(*[writer(n) for n in range(args.writers)], *[reader() for _ in range(args.readers)])
+
+    return {
+        route: {
+            "requests": len(samples),
+            "p50_ms": round(percentile(samples, 50), 2),
+            "p99_ms": round(percentile(samples, 99), 2),
+        }
+        for route, samples in latencies.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:////tmp/ucg-bench.db")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per mode")
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--modes", default="sync,async")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, BACKEND_DIR)
+        print(json.dumps(asyncio.run(run_load(args))))
+        return
+
+    results = {}
+    for mode in args.modes.split(","):
+        env = dict(os.environ, DATABASE_URL=args.database_url, DATABASE_ASYNC=str(mode == "async").lower(),
+                   LOG_LEVEL="WARNING", RATE_LIMIT_REQUESTS="1000000")
+        output = subprocess.run(
+            [sys.executable, __file__, "--child", mode, "--duration", str(args.duration),
+             "--writers", str(args.writers), "--readers", str(args.readers)],
+            env=env, cwd=BACKEND_DIR, check=True, capture_output=True, text=True,
+        ).stdout
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    for mode, routes in results.items():
+        for route, stats in routes.items():
+            print(f"{mode:6} {route:8} n={stats['requests']:6}  p50={stats['p50_ms']:8.2f}ms  p99={stats['p99_ms']:8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Per-request CPU of webhook body handling, before and after single-parse ingestion.
+
+"legacy" repeats what the handlers used to do per request: copy the headers
+into a dict, parse the body a second time via request.json(), re-serialize it
+with sort_keys to hash an alert_id, and validate through AlertCreate. "current"
+is app.payloads as used by the handlers now. No database is involved.
+
+    python benchmarks/webhook_pipeline.py [--iterations 20000] [--no-orjson]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app import payloads, schemas  # noqa: E402
+
+HEADERS = [(b"content-type", b"application/json"), (b"authorization", b"Bearer token"),
+           (b"user-agent", b"UniFi/4.0"), (b"idempotency-key", b"evt-1")] + \
+          [(f"x-extra-{i}".encode(), b"value") for i in range(10)]
+
+UCGMAX = {
+    "alert_id": "evt-1", "source": "UCG Max", "device": "UCG-Max-001", "severity": "critical",
+    "alert_type": "internet_disconnected", "timestamp": "2025-10-17T20:00:00Z",
+    "summary": "Internet disconnected", "details": {"latency_ms": 234, "wan": "eth8"}, "raw_payload": {},
+}
+GENERIC_SMALL = {"message": "High memory usage detected", "severity": "warning", "hostname": "server-01",
+                 "timestamp": "2025-10-18T12:00:00+00:00", "details": {"memory_percent": 95}}
+GENERIC_LARGE = dict(GENERIC_SMALL, details={f"metric_{i}": {"value": i, "labels": ["a", "b", "c"]} for i in range(300)})
+
+
+def legacy_ucgmax(body: bytes):
+    headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in HEADERS}
+    json.loads(body)  # request.body() was followed by request.json()
+    data = json.loads(body)
+    alert = schemas.AlertCreate(**data)
+    alert.webhook_source = "ucgmax"
+    alert.idempotency_key = headers.get("idempotency-key")
+    return alert.model_dump()
+
+
+def legacy_generic(body: bytes):
+    headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in HEADERS}
+    data = json.loads(body)
+    alert_id = data.get("id") or hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()[:32]
+    return schemas.AlertCreate(
+        alert_id=str(alert_id),
+        webhook_source="bench",
+        source=data.get("source") or "bench",
+        device=data.get("device") or data.get("host") or data.get("hostname"),
+        severity=data.get("severity") or "info",
+        alert_type=data.get("type") or "notification",
+        timestamp=datetime.fromisoformat(data["timestamp"]) if "timestamp" in data else datetime.now(timezone.utc),
+        summary=data.get("message") or "Webhook from bench",
+        details=data.get("details") or {},
+        raw_payload=data,
+        idempotency_key=headers.get("idempotency-key"),
+    ).model_dump()
+
+
+def current_ucgmax(body: bytes):
+    payloads.ucgmax_alert(body)
+
+
+def current_generic(body: bytes):
+    payloads.generic_alert(body, "bench", "evt-1")
+
+
+def cpu_per_call(fn, body: bytes, iterations: int) -> float:
+    for _ in range(min(1000, iterations)):
+        fn(body)
+    start = time.process_time()
+    for _ in range(iterations):
+        fn(body)
+    return (time.process_time() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--no-orjson", action="store_true", help="measure the stdlib json fallback")
+    args = parser.parse_args()
+    if args.no_orjson:
+        payloads.orjson = None
+
+    cases = [
+        ("ucgmax", UCGMAX, legacy_ucgmax, current_ucgmax),
+        ("generic small", GENERIC_SMALL, legacy_generic, current_generic),
+        ("generic 20KB", GENERIC_LARGE, legacy_generic, current_generic),
+    ]
+    backend = "orjson" if payloads.orjson is not None else "json"
+    print(f"JSON backend: {backend}, {args.iterations} iterations, CPU microseconds per request")
+    print(f"{'payload':<15} {'bytes':>7} {'legacy':>9} {'current':>9} {'speedup':>8}")
+    for name, payload, legacy, current in cases:
+        body = json.dumps(payload).encode()
+        before = cpu_per_call(legacy, body, args.iterations)
+        after = cpu_per_call(current, body, args.iterations)
+        print(f"{name:<15} {len(body):>7} {before:>9.1f} {after:>9.1f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -57,9 +57,18 @@ cd /app
 if alembic upgrade head; then
     echo "Migrations completed successfully"
 else
-    echo "Warning: Migration failed or not configured"
+    # The schema comes only from Alembic; without it the app would start with no tables
+    echo "ERROR: Migration failed"
+    exit 1
 fi
 
-# Start the application
-echo "Starting UCG Max Webhook Receiver on port 8000..."
-exec uvicorn app.main:app --host 0.0.0.0 --port 8000
+# Start the application; exec so SIGTERM reaches the server and it can drain queued alerts
+WORKERS=${WORKERS:-1}
+if [ "$WORKERS" = "1" ]; then
+    echo "Starting UCG Max Webhook Receiver on port 8000..."
+    exec uvicorn app.main:app --host 0.0.0.0 --port 8000 --timeout-graceful-shutdown "${GRACEFUL_TIMEOUT:-30}"
+else
+    # Workers are forked from one preloaded app; WORKERS=0 means one per CPU core (see gunicorn.conf.py)
+    echo "Starting UCG Max Webhook Receiver on port 8000 with gunicorn (WORKERS=$WORKERS)..."
+    exec gunicorn -c gunicorn.conf.py app.main:app
+fi
@@ -33,33 +33,46 @@ if [ -z "$DATABASE_URL" ]; then
     echo "Database URL configured for $DB_TYPE at $DB_HOST:$DB_PORT/$DB_NAME"
 fi
 
-# Wait for database to be ready
-echo "Waiting for database to be ready..."
-max_attempts=30
-attempt=0
-
-while [ $attempt -lt $max_attempts ]; do
-    # Simple TCP connection test - if we can connect, the database is likely ready
-    if timeout 2 bash -c "cat < /dev/null > /dev/tcp/$DB_HOST/$DB_PORT" 2>/dev/null; then
-        echo "Database port is accessible!"
-        # Give it a moment for the database to fully initialize
-        sleep 2
-        break
-    fi
-    
-    attempt=$((attempt + 1))
-    if [ $attempt -eq $max_attempts ]; then
-        echo "ERROR: Cannot connect to database at $DB_HOST:$DB_PORT after $max_attempts attempts"
-        echo "Please check:"
-        echo "  - Database server is running at $DB_HOST:$DB_PORT"
-        echo "  - Network connectivity to database server"
-        echo "  - Firewall settings allow connection on port $DB_PORT"
+if [[ "$DATABASE_URL" == sqlite* ]]; then
+    # Embedded SQLite: no server to wait for, only the directory of the database file
+    DB_FILE="${DATABASE_URL#*:///}"
+    mkdir -p "$(dirname "$DB_FILE")"
+    echo "Using embedded SQLite database at $DB_FILE"
+    # All writes go through one connection per process, so there can only be one process
+    if [ "${WORKERS:-1}" != "1" ]; then
+        echo "ERROR: Embedded SQLite needs WORKERS=1 (got WORKERS=$WORKERS)"
+        echo "Use MariaDB or PostgreSQL to run several workers"
         exit 1
     fi
+else
+    # Wait for database to be ready
+    echo "Waiting for database to be ready..."
+    max_attempts=30
+    attempt=0
+
+    while [ $attempt -lt $max_attempts ]; do
+        # Simple TCP connection test - if we can connect, the database is likely ready
+        if timeout 2 bash -c "cat < /dev/null > /dev/tcp/$DB_HOST/$DB_PORT" 2>/dev/null; then
+            echo "Database port is accessible!"
+            # Give it a moment for the database to fully initialize
+            sleep 2
+            break
+        fi
     
-    echo "Waiting for database... ($attempt/$max_attempts)"
-    sleep 2
-done
+        attempt=$((attempt + 1))
+        if [ $attempt -eq $max_attempts ]; then
+            echo "ERROR: Cannot connect to database at $DB_HOST:$DB_PORT after $max_attempts attempts"
+            echo "Please check:"
+            echo "  - Database server is running at $DB_HOST:$DB_PORT"
+            echo "  - Network connectivity to database server"
+            echo "  - Firewall settings allow connection on port $DB_PORT"
+            exit 1
+        fi
+    
+        echo "Waiting for database... ($attempt/$max_attempts)"
+        sleep 2
+    done
+fi
 
 # Create database if it doesn't exist (for MariaDB/MySQL)
 if [ "$DB_TYPE" = "mariadb" ] || [ "$DB_TYPE" = "mysql" ]; then
@@ -128,6 +141,13 @@ else
     exit 1
 fi
 
-# Start the application
-echo "Starting UCG Max Webhook Receiver on port 8000..."
-exec uvicorn app.main:app --host 0.0.0.0 --port 8000
+# Start the application; exec so SIGTERM reaches the server and it can drain queued alerts
+WORKERS=${WORKERS:-1}
+if [ "$WORKERS" = "1" ]; then
+    echo "Starting UCG Max Webhook Receiver on port 8000..."
+    exec uvicorn app.main:app --host 0.0.0.0 --port 8000 --timeout-graceful-shutdown "${GRACEFUL_TIMEOUT:-30}"
+else
+    # Workers are forked from one preloaded app; WORKERS=0 means one per CPU core (see gunicorn.conf.py)
+    echo "Starting UCG Max Webhook Receiver on port 8000 with gunicorn (WORKERS=$WORKERS)..."
+    exec gunicorn -c gunicorn.conf.py app.main:app
+fi
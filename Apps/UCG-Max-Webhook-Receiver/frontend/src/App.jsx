@@ -11,16 +11,59 @@ function App() {
   useEffect(() => {
     fetchAlerts();
     fetchMetrics();
-    const interval = setInterval(() => {
+    // New alerts and metric increments are pushed by the server instead of polled.
+    // Severity and device are filtered server side; a text search cannot be
+    // applied to pushed alerts, so the list then only refreshes on reconnect.
+    const streamed = new URLSearchParams(
+      Object.entries(filters).filter(([key, value]) => value && ['severity', 'device'].includes(key))
+    );
+    const source = new EventSource(`/api/alerts/stream?${streamed}`);
+    let connected = false;
+    source.addEventListener('open', () => {
+      // Catch up on anything missed while disconnected
+      if (connected) {
+        fetchAlerts();
+        fetchMetrics();
+      }
+      connected = true;
+    });
+    source.addEventListener('snapshot', (event) => setMetrics(JSON.parse(event.data)));
+    source.addEventListener('alert', (event) => {
+      const alert = JSON.parse(event.data);
+      if (filters.q || (filters.alert_type && alert.alert_type !== filters.alert_type)) return;
+      setAlerts((current) => [alert, ...current].slice(0, 50));
+    });
+    source.addEventListener('metrics', (event) => setMetrics((current) => applyDelta(current, JSON.parse(event.data))));
+    source.addEventListener('lagged', () => {
       fetchAlerts();
       fetchMetrics();
-    }, 30000); // Refresh every 30 seconds
-    return () => clearInterval(interval);
+    });
+    return () => source.close();
   }, [filters]);
 
+  const applyDelta = (current, delta) => {
+    const add = (counts = {}, increments = {}) => {
+      const merged = { ...counts };
+      Object.entries(increments).forEach(([key, value]) => {
+        merged[key] = (merged[key] || 0) + value;
+      });
+      return merged;
+    };
+    return {
+      ...current,
+      total_alerts: (current.total_alerts || 0) + delta.total_alerts,
+      last_24h_count: (current.last_24h_count || 0) + delta.total_alerts,
+      severity_counts: add(current.severity_counts, delta.severity_counts),
+      source_counts: add(current.source_counts, delta.source_counts),
+      device_counts: add(current.device_counts, delta.device_counts),
+    };
+  };
+
   const fetchAlerts = async () => {
     try {
       const params = new URLSearchParams(Object.entries(filters).filter(([_, v]) => v));
+      // The table never shows payloads; the detail view fetches them per alert
+      params.set('view', 'summary');
       const response = await axios.get(`/api/alerts?${params}`);
       setAlerts(response.data);
     } catch (error) {
@@ -37,6 +80,18 @@ function App() {
     }
   };
 
+  const openAlert = async (alert) => {
+    setSelectedAlert(alert);
+    if (alert.id == null) return;
+    try {
+      // List rows leave payloads out with compact storage; the detail route unpacks them
+      const response = await axios.get(`/api/alerts/${alert.id}`);
+      setSelectedAlert(response.data);
+    } catch (error) {
+      console.error('Error fetching alert:', error);
+    }
+  };
+
   const handleFilterChange = (key, value) => {
     setFilters({ ...filters, [key]: value });
   };
@@ -185,7 +240,7 @@ function App() {
                 </div>
               ) : (
                 alerts.map((alert) => (
-                  <div key={alert.id} className="tr" onClick={() => setSelectedAlert(alert)}>
+                  <div key={alert.id ?? alert.alert_id} className="tr" onClick={() => openAlert(alert)}>
                     <div className="td">{formatTime(alert.timestamp)}</div>
                     <div className="td">
                       <span className="pill">{alert.webhook_source || 'unknown'}</span>
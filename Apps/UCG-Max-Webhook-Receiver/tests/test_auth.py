@@ -0,0 +1,53 @@
+from datetime import timedelta
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from app import auth
+from app.config import settings
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(auth, "_admin_hash", None)
+    monkeypatch.setattr(auth, "_verified_digest", None)
+    monkeypatch.setattr(auth, "token_cache", auth.TokenCache(maxsize=2))
+
+
+def bearer(token):
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+def counting(calls, name, fn):
+    def wrapper(*args):
+        calls[name] += 1
+        return fn(*args)
+    return wrapper
+
+
+def test_login_runs_bcrypt_once_at_steady_state(monkeypatch):
+    calls = {"hash": 0, "verify": 0}
+    monkeypatch.setattr(auth, "get_password_hash", counting(calls, "hash", auth.get_password_hash))
+    monkeypatch.setattr(auth, "verify_password", counting(calls, "verify", auth.verify_password))
+    for _ in range(3):
+        assert auth.authenticate_user(settings.admin_user, settings.admin_password)
+    assert not auth.authenticate_user(settings.admin_user, "wrong")
+    assert calls == {"hash": 1, "verify": 2}
+
+
+def test_prehashed_admin_password(monkeypatch):
+    monkeypatch.setattr(settings, "admin_password_hash", auth.get_password_hash("s3cret"))
+    assert auth.authenticate_user(settings.admin_user, "s3cret")
+    assert not auth.authenticate_user(settings.admin_user, settings.admin_password)
+
+
+def test_token_cache_hits_and_honours_exp():
+    token = auth.create_access_token({"sub": "admin"})
+    assert auth.get_current_user(bearer(token)) == "admin"
+    assert auth.get_current_user(bearer(token)) == "admin"
+    assert auth.token_cache.stats() == {"size": 1, "hits": 1, "misses": 1}
+
+    expired = auth.create_access_token({"sub": "admin"}, expires_delta=timedelta(seconds=-1))
+    with pytest.raises(HTTPException):
+        auth.get_current_user(bearer(expired))
+    auth.token_cache.put(token, "admin", 0)
+    assert auth.token_cache.get(token) is None
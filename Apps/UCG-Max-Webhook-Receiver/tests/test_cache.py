@@ -0,0 +1,32 @@
+from app.cache import ResultCache, etag_matches
+
+
+def test_generations_invalidate_only_matching_filters():
+    cache = ResultCache()
+    critical = {"severity": "critical", "device": None}
+    unfiltered = {}
+    for key, filters in (("critical", critical), ("all", unfiltered)):
+        cache.put(key, cache.generations(filters), b"[]")
+
+    cache.invalidate([{"severity": "info", "device": "gw"}])
+    assert cache.get("critical", cache.generations(critical)) is not None
+    assert cache.get("all", cache.generations(unfiltered)) is None
+
+    # Keyed values compare case-insensitively, as MySQL collations do
+    cache.invalidate([{"severity": "Critical"}])
+    assert cache.get("critical", cache.generations(critical)) is None
+
+
+def test_results_computed_during_a_write_are_stale():
+    cache = ResultCache()
+    filters = {"device": "gw"}
+    generations = cache.generations(filters)  # captured before the query
+    cache.invalidate([{"device": "gw"}])       # a write lands while it runs
+    cache.put("gw", generations, b"[]")
+    assert cache.get("gw", cache.generations(filters)) is None
+
+
+def test_etag_comparison():
+    assert etag_matches('W/"abc", "def"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"abd"', '"abc"')
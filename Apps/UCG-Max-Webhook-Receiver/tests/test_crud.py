@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app import crud, schemas
+from app.models import Base
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def seed(db, count, start=datetime(2026, 1, 1)):
+    # Pairs of alerts share a timestamp so the id tie-breaker is exercised
+    crud.create_alerts(db, [
+        schemas.AlertCreate(
+            alert_id=f"a{i}",
+            severity="critical" if i % 3 == 0 else "info",
+            timestamp=start + timedelta(minutes=i // 2),
+            summary=f"alert {i}",
+        ).model_dump()
+        for i in range(count)
+    ])
+
+
+def test_cursor_pages_cover_every_row_once(db):
+    seed(db, 25)
+    seen, cursor = [], ""
+    while cursor is not None:
+        page = crud.get_alerts_page(db, cursor=cursor, limit=7)
+        seen.extend(a.id for a in page["items"])
+        cursor = page["next_cursor"]
+    assert len(seen) == 25
+    assert seen == [a.id for a in crud.get_alerts(db, limit=100)]
+
+
+def test_cursor_pages_respect_filters(db):
+    seed(db, 30)
+    page = crud.get_alerts_page(db, limit=5, filters={"severity": "critical"})
+    rest = crud.get_alerts_page(db, cursor=page["next_cursor"], limit=5, filters={"severity": "critical"})
+    assert [a.severity for a in page["items"] + rest["items"]] == ["critical"] * 10
+    assert rest["next_cursor"] is None
+
+
+def test_invalid_cursor_rejected():
+    with pytest.raises(ValueError):
+        crud.decode_cursor("not-a-cursor")
+
+
+def test_iter_alert_rows_streams_filtered_columns(db):
+    seed(db, 12)
+    rows = list(crud.iter_alert_rows(db, ["id", "severity"], filters={"severity": "critical"}, chunk_size=2))
+    assert len(rows) == 4
+    assert rows == sorted(rows, key=lambda r: r.id, reverse=True)
+
+
+def test_payload_filters_match_nested_and_numeric_values(db):
+    crud.create_alerts(db, [
+        schemas.AlertCreate(alert_id=f"a{i}", raw_payload={"host": f"nas-{i % 2}", "count": i, "labels": {"team": "ops" if i < 4 else "dev"}}).model_dump()
+        for i in range(10)
+    ])
+    match = lambda *terms: sorted(a.alert_id for a in crud.get_alerts(db, filters={"payload": crud.parse_payload_filters(terms)}))
+    assert match("host:nas-1") == ["a1", "a3", "a5", "a7", "a9"]
+    assert match("labels.team:ops", "host:nas-0") == ["a0", "a2"]
+    assert match("count:7") == ["a7"]
+    with pytest.raises(ValueError):
+        crud.parse_payload_filters(["labels.:ops"])
+
+
+def test_start_filter_ignores_received_at_without_partitions(db, monkeypatch):
+    # SQLite cannot partition, so the received_at pruning bound must not apply
+    monkeypatch.setattr(crud.settings, "alerts_partitioning", "day")
+    crud.create_alert(db, schemas.AlertCreate(alert_id="future", timestamp=datetime(2030, 1, 2)))
+    assert [a.alert_id for a in crud.get_alerts(db, filters={"start": "2030-01-01"})] == ["future"]
+
+
+def test_chunked_delete_honours_filters(db):
+    seed(db, 20)
+    deleted = crud.bulk_delete_alerts(db, {"severity": "critical"}, chunk_size=3)
+    assert deleted == 7
+    remaining = crud.get_alerts(db, limit=100)
+    assert len(remaining) == 13
+    assert {a.severity for a in remaining} == {"info"}
+
+
+def test_cleanup_respects_max_id(db):
+    seed(db, 10)
+    assert crud.cleanup_old_alerts(db, days=-1, max_id=4, chunk_size=2) == 4
+    assert min(a.id for a in crud.get_alerts(db, limit=100)) == 5
+
+
+def test_compact_storage_shares_one_blob_per_payload(db, monkeypatch):
+    from app import blobs, models
+    monkeypatch.setattr(crud.settings, "payload_storage", "compact")
+    payload = {"message": "disk full", "host": "nas"}
+    crud.create_alerts(db, [
+        {"alert_id": f"c{i}", "webhook_source": "generic", "raw_payload": payload, "details": {}} for i in range(3)
+    ])
+    crud.create_alert(db, {"alert_id": "c3", "webhook_source": "generic", "raw_payload": payload, "details": {}})
+    assert db.query(models.AlertPayload).count() == 1
+    listed = crud.get_alerts(db)
+    assert all(alert.raw_payload is None for alert in listed)
+    assert crud.get_alert_detail(db, listed[0].id).raw_payload == payload
+
+    db.query(models.Alert).delete()
+    db.commit()
+    assert blobs.purge_orphans(db) == 1
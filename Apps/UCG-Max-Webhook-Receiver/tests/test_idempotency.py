@@ -0,0 +1,85 @@
+import sqlite3
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+from app import crud, idempotency, models, schemas
+from app.models import Base
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def test_recent_keys_evicts_oldest_and_expires(monkeypatch):
+    keys = idempotency.RecentKeys(maxsize=2, ttl=60)
+    now = [1000.0]
+    monkeypatch.setattr(idempotency.time, "monotonic", lambda: now[0])
+    for k in ("a", "b", "c"):
+        keys.add(("src", k))
+    assert not keys.seen(("src", "a"))
+    assert keys.seen(("src", "b")) and keys.seen(("src", "c"))
+    now[0] += 61
+    assert not keys.seen(("src", "c"))
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = idempotency.BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(("ucgmax", f"key-{i}"))
+    assert all(("ucgmax", f"key-{i}") in bloom for i in range(1000))
+    false_positives = sum(("ucgmax", f"other-{i}") in bloom for i in range(1000))
+    assert false_positives < 50
+
+
+def test_unique_key_per_source(db):
+    alert = schemas.AlertCreate(webhook_source="ucgmax", idempotency_key="k1", summary="first")
+    crud.create_alert(db, alert)
+    with pytest.raises(IntegrityError) as duplicate:
+        crud.create_alert(db, alert)
+    assert crud.is_duplicate_key(duplicate.value)
+    not_null = IntegrityError("INSERT", {}, sqlite3.IntegrityError("NOT NULL constraint failed: alerts.alert_id"))
+    assert not crud.is_duplicate_key(not_null)
+    crud.create_alert(db, schemas.AlertCreate(webhook_source="grafana", idempotency_key="k1"))
+    assert crud.get_alert_by_idempotency_key(db, "k1", "ucgmax").summary == "first"
+
+
+def test_batch_insert_skips_duplicate_keys(db):
+    batch = [schemas.AlertCreate(webhook_source="ucgmax", idempotency_key=k).model_dump() for k in ("a", "b", "a", None, None)]
+    assert crud.create_alerts(db, batch) == [batch[0], batch[1], batch[3], batch[4]]
+    assert db.query(models.Alert).count() == 4
+
+
+@pytest.mark.parametrize("returning", [True, False])
+def test_batch_insert_returns_only_inserted_alerts(db, returning):
+    # Without RETURNING (MariaDB/MySQL) inserted keys are told apart by their ids
+    db.get_bind().dialect.insert_executemany_returning = returning
+    crud.create_alerts(db, [schemas.AlertCreate(webhook_source="ucgmax", idempotency_key="old").model_dump()])
+    batch = [schemas.AlertCreate(webhook_source="ucgmax", idempotency_key=k).model_dump() for k in ("old", "new", None)]
+    assert crud.create_alerts(db, batch) == batch[1:]
+
+
+def test_deleted_alerts_are_forgotten(db):
+    keys = [idempotency.key_for("ucgmax", k) for k in ("gone", "purged", "kept")]
+    for key in keys:
+        crud.create_alert(db, schemas.AlertCreate(webhook_source="ucgmax", idempotency_key=key[1], severity=key[1]))
+        idempotency.remember(key)
+    crud.delete_alert(db, crud.get_alert_by_idempotency_key(db, "gone").id)
+    crud.bulk_delete_alerts(db, {"severity": "purged"})
+    assert [idempotency.recent_keys.seen(key) for key in keys] == [False, False, True]
+    idempotency.recent_keys.clear()
+
+
+def test_bloom_filter_needs_the_unique_key_with_several_workers(db, monkeypatch):
+    monkeypatch.setattr(idempotency.settings, "idempotency_bloom_capacity", 100)
+    monkeypatch.setattr(idempotency.partitioning, "enabled", lambda dialect, warn=True: True)
+    monkeypatch.setattr(idempotency.settings, "workers", 4)
+    assert idempotency.load_bloom(db) is None
+    monkeypatch.setattr(idempotency.settings, "workers", 1)
+    assert idempotency.load_bloom(db) is not None
+    monkeypatch.setattr(idempotency, "bloom", None)
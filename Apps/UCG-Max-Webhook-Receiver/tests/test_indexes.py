@@ -0,0 +1,44 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from app import crud, indexes, schemas
+from app.models import Base
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    crud.create_alerts(session, [
+        schemas.AlertCreate(alert_id=f"a{i}", severity="critical", device=f"sw-{i % 3}", timestamp=datetime(2026, 1, 1)).model_dump()
+        for i in range(10)
+    ])
+    indexes.query_shapes.clear()
+    yield session
+    indexes.query_shapes.clear()
+    session.close()
+
+
+def test_filtered_lists_use_composite_indexes_without_sorting(db):
+    for filters in ({"severity": "critical"}, {"severity": "critical"}, {"device": "sw-1", "start": "2026-01-01"}):
+        with indexes.timed(filters):
+            crud.get_alerts(db, filters=filters)
+    report = indexes.report(db)
+    by_shape = {tuple(q["filters"]): q for q in report["queries"]}
+    severity = by_shape[("severity",)]
+    assert severity["count"] == 2
+    assert severity["indexes"] == ["idx_alerts_severity_timestamp"]
+    assert not severity["full_scan"] and not severity["sort"] and severity["suggestion"] is None
+    assert by_shape[("device", "start")]["indexes"] == ["idx_alerts_device_timestamp"]
+    assert report["unused"] == ["idx_alerts_timestamp_id", "idx_alerts_type_timestamp"]
+
+
+def test_suggests_an_index_for_unindexed_filters(db):
+    db.execute(text("DROP INDEX idx_alerts_device_timestamp"))
+    with indexes.timed({"device": "sw-1"}):
+        crud.get_alerts(db, filters={"device": "sw-1"})
+    query = indexes.report(db)["queries"][0]
+    assert "idx_alerts_device_timestamp" not in query["indexes"]
+    assert query["suggestion"] == "CREATE INDEX idx_alerts_device_timestamp ON alerts (device, timestamp, id)"
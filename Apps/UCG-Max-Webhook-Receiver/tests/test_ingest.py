@@ -0,0 +1,40 @@
+import asyncio
+import pytest
+from app.ingest import IngestQueue, QueueFull
+
+
+def test_queue_batches_and_drains_on_stop():
+    batches = []
+
+    def flush(batch):
+        batches.append(list(batch))
+        return len(batch)
+
+    async def run():
+        queue = IngestQueue(maxsize=100, batch_size=10, linger_ms=20, flush=flush)
+        await queue.start()
+        for i in range(25):
+            queue.put({"alert_id": str(i)})
+        await queue.stop()
+        return queue
+
+    queue = asyncio.run(run())
+    assert queue.written == 25
+    assert all(len(b) <= 10 for b in batches)
+    assert [a["alert_id"] for b in batches for a in b] == [str(i) for i in range(25)]
+
+
+def test_queue_rejects_when_full():
+    async def run():
+        queue = IngestQueue(maxsize=2, batch_size=10, linger_ms=1000, flush=lambda b: len(b))
+        await queue.start()
+        queue.put({})
+        queue.put({})
+        with pytest.raises(QueueFull):
+            queue.put({})
+        await queue.stop()
+        return queue
+
+    queue = asyncio.run(run())
+    assert queue.rejected == 1
+    assert queue.written == 2
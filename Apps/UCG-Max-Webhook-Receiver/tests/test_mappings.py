@@ -0,0 +1,63 @@
+import json
+import os
+from datetime import datetime, timezone
+import pytest
+from app import mappings, payloads
+
+
+def test_paths_reach_nested_fields():
+    get = mappings.compile_path("$.alerts[1].labels.instance")
+    assert get({"alerts": [{}, {"labels": {"instance": "nas:9100"}}]}) == "nas:9100"
+    assert get({"alerts": []}) is None
+    with pytest.raises(mappings.ProfileError):
+        mappings.compile_path("$.alerts[x")
+
+
+@pytest.mark.parametrize("default", ["{host}", '{"a": 1}', "{0}", "{webhook_source"])
+def test_defaults_with_stray_braces_are_rejected_on_load(default):
+    with pytest.raises(mappings.ProfileError, match="may only reference"):
+        mappings.compile_profiles({"custom": {"summary": {"paths": "$.msg", "default": default}}})
+    profiles = mappings.compile_profiles({"custom": {"summary": {"paths": "$.msg", "default": "{{raw}} from {webhook_source}"}}})
+    assert profiles["custom"].extract({}, "custom")["summary"] == "{raw} from custom"
+
+
+def test_grafana_payload_is_normalized():
+    body = json.dumps({
+        "status": "firing",
+        "commonLabels": {"alertname": "HighCPU", "instance": "tower:9100"},
+        "commonAnnotations": {"summary": "CPU above 90%"},
+        "alerts": [{"fingerprint": "abc", "startsAt": "2026-01-01T10:00:00Z"}],
+    }).encode()
+    alert = payloads.generic_alert(body, "grafana")
+    assert (alert["severity"], alert["device"], alert["alert_type"]) == ("critical", "tower:9100", "HighCPU")
+    assert alert["summary"] == "CPU above 90%"
+    assert alert["timestamp"] == datetime(2026, 1, 1, 10, tzinfo=timezone.utc)
+
+
+def test_uptime_kuma_status_codes_map_to_severity():
+    body = json.dumps({
+        "heartbeat": {"status": 0, "time": "2026-01-01 10:00:00.123", "msg": "timeout"},
+        "monitor": {"name": "Website", "url": "https://example.com", "type": "http"},
+        "msg": "[Website] [Down] timeout",
+    }).encode()
+    alert = payloads.generic_alert(body, "uptime-kuma")
+    assert (alert["severity"], alert["device"], alert["source"]) == ("critical", "https://example.com", "Website")
+
+
+def test_profile_file_overrides_and_reloads(tmp_path):
+    path = tmp_path / "profiles.json"
+    path.write_text(json.dumps({"netdata": {"severity": {"paths": "$.status", "map": {"CLEAR": "info"}}}}))
+    registry = mappings.ProfileRegistry(str(path))
+    alert = registry.get("netdata").extract({"status": "CLEAR", "message": "ok"}, "netdata")
+    assert alert["severity"] == "info"
+    assert alert["summary"] == "ok"  # inherited from the generic profile
+
+    path.write_text("{broken")
+    os.utime(path, (1, 1))
+    assert not registry.reload_if_changed()
+    assert registry.error and registry.get("netdata").extract({"status": "CLEAR"}, "netdata")["severity"] == "info"
+
+    path.write_text(json.dumps({"netdata": {"severity": {"default": "warning"}}}))
+    os.utime(path, (2, 2))
+    assert registry.reload_if_changed()
+    assert registry.get("netdata").extract({}, "netdata")["severity"] == "warning"
@@ -0,0 +1,21 @@
+from datetime import datetime
+from app import partitioning
+
+
+def test_month_periods_cover_range():
+    ranges = partitioning.periods(datetime(2025, 12, 15), datetime(2026, 2, 1), "month")
+    assert ranges == [
+        (datetime(2025, 12, 1), datetime(2026, 1, 1)),
+        (datetime(2026, 1, 1), datetime(2026, 2, 1)),
+        (datetime(2026, 2, 1), datetime(2026, 3, 1)),
+    ]
+
+
+def test_partition_names_round_trip():
+    start = datetime(2026, 10, 17)
+    for granularity in partitioning.GRANULARITIES:
+        suffix = partitioning.partition_suffix(partitioning.period_start(start, granularity), granularity)
+        assert partitioning.parse_suffix(f"alerts_p{suffix}") == partitioning.period_start(start, granularity)
+        assert partitioning.parse_suffix(f"p{suffix}") == partitioning.period_start(start, granularity)
+    assert partitioning.parse_suffix("pmax") is None
+    assert partitioning.parse_suffix("alerts_pdefault") is None
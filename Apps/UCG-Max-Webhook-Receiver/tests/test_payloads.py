@@ -0,0 +1,53 @@
+import hashlib
+import json
+import pytest
+from app import payloads
+
+
+def test_generic_alert_maps_fields_and_hashes_body():
+    body = b'{"message": "Disk full", "level": 3, "host": "nas", "timestamp": "2026-01-01T00:00:00Z"}'
+    alert = payloads.generic_alert(body, "kuma", "key-1")
+    assert alert["summary"] == "Disk full"
+    assert alert["severity"] == "3"
+    assert alert["device"] == "nas"
+    assert alert["source"] == "kuma"
+    # Same id as before orjson, whatever the whitespace and key order
+    assert alert["alert_id"] == hashlib.sha256(json.dumps(json.loads(body), sort_keys=True).encode()).hexdigest()[:32]
+    reordered = payloads.generic_alert(b'{"host":"nas","timestamp":"2026-01-01T00:00:00Z","level":3,"message":"Disk full"}', "kuma")
+    assert reordered["alert_id"] == alert["alert_id"]
+    assert alert["idempotency_key"] == "key-1"
+    assert alert["timestamp"].tzinfo is not None
+
+
+@pytest.mark.parametrize("body", [b"{not json", b"[1, 2]", b'{"timestamp": "yesterday"}'])
+def test_invalid_generic_bodies_rejected(body):
+    with pytest.raises(payloads.InvalidPayload):
+        payloads.generic_alert(body, "kuma")
+
+
+def test_ucgmax_alert_validates_in_one_pass():
+    alert = payloads.ucgmax_alert(b'{"alert_id": "a1", "severity": "critical", "details": {"x": 1}}')
+    assert alert["webhook_source"] == "ucgmax"
+    assert alert["details"] == {"x": 1}
+    with pytest.raises(payloads.InvalidPayload):
+        payloads.ucgmax_alert(b'{"details": "not an object"}')
+
+
+def test_batch_reader_splits_ndjson_across_chunks():
+    reader = payloads.BatchReader()
+    items = reader.feed(b'{"a": 1}\n{"a"') + reader.feed(b': 2}\n\n{bad\n{"a": 3}')
+    items += reader.close()
+    assert [data for _, data in items[:2]] == [{"a": 1}, {"a": 2}]
+    assert isinstance(items[2][1], payloads.InvalidPayload)
+    assert items[3] == (b'{"a": 3}', {"a": 3})
+
+
+def test_batch_reader_decodes_arrays_at_the_end():
+    reader = payloads.BatchReader()
+    assert reader.feed(b'  [{"a": 1},') == []
+    assert reader.feed(b'\n{"a": 2}]') == []
+    assert reader.close() == [(None, {"a": 1}), (None, {"a": 2})]
+    reader = payloads.BatchReader()
+    reader.feed(b'[{"a": 1}')
+    with pytest.raises(payloads.InvalidPayload):
+        reader.close()
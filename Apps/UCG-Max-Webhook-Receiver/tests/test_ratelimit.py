@@ -0,0 +1,69 @@
+import pytest
+from sqlalchemy import create_engine
+from app import ratelimit
+from app.models import Base
+
+
+def test_quotas_parse():
+    assert ratelimit.parse_quotas("*=1000/60, grafana=600/60") == {
+        "*": ratelimit.Quota(1000, 60), "grafana": ratelimit.Quota(600, 60),
+    }
+    with pytest.raises(ValueError):
+        ratelimit.parse_quota("ten/60")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(ratelimit.time, "time", lambda: now[0])
+    return now
+
+
+def test_gcra_allows_burst_then_refills_steadily(clock):
+    backend = ratelimit.MemoryBackend()
+    quota = ratelimit.Quota(3, 60)
+    assert [backend.acquire("k", quota) for _ in range(4)] == [0, 0, 0, 20.0]
+    clock[0] += 20
+    assert backend.acquire("k", quota) == 0
+    assert backend.acquire("k", quota) > 0
+
+
+def test_database_backend_is_shared_between_workers(tmp_path, clock):
+    engine = create_engine(f"sqlite:///{tmp_path}/limits.db")
+    Base.metadata.create_all(bind=engine)
+    workers = [ratelimit.DatabaseBackend(engine), ratelimit.DatabaseBackend(engine)]
+    quota = ratelimit.Quota(4, 60)
+    results = [workers[i % 2].acquire("source:grafana", quota) for i in range(6)]
+    assert results[:4] == [0, 0, 0, 0] and all(r > 0 for r in results[4:])
+    clock[0] += 61
+    assert workers[0].purge() == 1
+
+
+def test_limiter_applies_each_scope_and_counts(clock):
+    limiter = ratelimit.RateLimiter(
+        ratelimit.MemoryBackend(), per_client=ratelimit.Quota(10, 60),
+        per_source={"grafana": ratelimit.Quota(1, 60)}, per_token=None,
+    )
+    limiter.check("10.0.0.1", "grafana")
+    limiter.check("10.0.0.1", "other")
+    with pytest.raises(ratelimit.RateLimited) as exc:
+        limiter.check("10.0.0.2", "grafana")
+    assert exc.value.scope == "source"
+    assert limiter.stats()["source"] == {"allowed": 1, "rejected": 1}
+
+
+def test_rejected_request_uses_no_other_quota(clock):
+    limiter = ratelimit.RateLimiter(
+        ratelimit.MemoryBackend(), per_client=ratelimit.Quota(2, 60),
+        per_source={"grafana": ratelimit.Quota(1, 60)}, per_token=None,
+    )
+    limiter.check("10.0.0.1", "grafana")
+    for _ in range(3):
+        with pytest.raises(ratelimit.RateLimited):
+            limiter.check("10.0.0.1", "grafana")
+    # The rejected grafana requests left the client quota with one request
+    limiter.check("10.0.0.1", "other")
+    assert limiter.stats()["client"] == {"allowed": 2, "rejected": 0}
+    with pytest.raises(ratelimit.RateLimited) as exc:
+        limiter.check("10.0.0.1")
+    assert exc.value.scope == "client"
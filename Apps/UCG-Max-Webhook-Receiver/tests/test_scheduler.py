@@ -0,0 +1,16 @@
+import fcntl
+from app import scheduler
+from app.config import settings
+
+
+def test_only_the_lock_holder_runs_maintenance(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "scheduler_lock_path", str(tmp_path / "scheduler.lock"))
+    monkeypatch.setattr(scheduler, "_lock_file", None)
+    with open(settings.scheduler_lock_path, "a") as other_worker:
+        fcntl.flock(other_worker, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        assert not scheduler.hold_lock()
+    # The other worker exited, releasing the lock
+    assert scheduler.hold_lock()
+    assert scheduler.hold_lock()
+    scheduler.shutdown()
+    assert scheduler._lock_file is None
@@ -0,0 +1,55 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app import crud, schemas, search
+from app.models import Base
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def add(db, summary, device=None, payload=None):
+    return crud.create_alert(db, schemas.AlertCreate(
+        alert_id=summary, summary=summary, device=device,
+        timestamp=datetime(2026, 1, 1), raw_payload=payload or {},
+    ))
+
+
+def test_document_includes_payload_fields():
+    doc = search.document({"summary": "Disk FULL", "device": "nas-01", "raw_payload": {"host": "Tower", "secret": "x"}})
+    assert doc == "disk full nas 01 tower"
+
+
+def test_search_matches_prefixes_across_fields_and_ranks(db):
+    add(db, "Backup finished", device="nas-01")
+    add(db, "Link down", payload={"monitor": "core switch uplink"})
+    add(db, "Link down on switch port, switch rebooting", device="switch-2")
+    assert {a.summary for a in crud.get_alerts(db, filters={"q": "nas"})} == {"Backup finished"}
+    ranked = crud.get_alerts(db, filters={"q": "swit"})
+    assert [a.summary for a in ranked] == ["Link down on switch port, switch rebooting", "Link down"]
+    assert crud.get_alerts(db, filters={"q": 'down "uplink'})[0].summary == "Link down"
+
+
+def test_deleted_alerts_leave_the_index(db):
+    alert = add(db, "Fan failure")
+    crud.delete_alert(db, alert.id)
+    add(db, "Fan ok")
+    assert [a.summary for a in crud.get_alerts(db, filters={"q": "fan"})] == ["Fan ok"]
+
+
+def test_mariadb_falls_back_to_like_only_on_a_partitioned_table(monkeypatch):
+    monkeypatch.setattr(search.settings, "alerts_partitioning", "month")
+    engines = [create_engine("sqlite://"), create_engine("sqlite://")]
+    for engine in engines:
+        engine.dialect.name = "mariadb"
+    checked = []
+    monkeypatch.setattr(search.partitioning, "is_partitioned", lambda conn: checked.append(conn.engine) or conn.engine is engines[1])
+    assert [search._backend(engine) for engine in engines + engines] == ["mysql", "like", "mysql", "like"]
+    assert checked == engines
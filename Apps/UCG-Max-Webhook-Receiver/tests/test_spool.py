@@ -0,0 +1,73 @@
+import asyncio
+import os
+from datetime import datetime, timezone
+from app import spool as spool_module
+from app.spool import Spool, list_segments, segment_name
+
+
+def alerts(start, count):
+    return [
+        {"alert_id": str(i), "webhook_source": "test", "timestamp": datetime(2026, 1, 1, tzinfo=timezone.utc)}
+        for i in range(start, start + count)
+    ]
+
+
+def test_spooled_alerts_are_replayed_once_the_database_is_back(tmp_path):
+    stored, up = [], {"value": False}
+
+    def write(batch):
+        if not up["value"]:
+            raise ConnectionError("database down")
+        stored.extend(batch)
+
+    async def run():
+        spool = Spool(str(tmp_path), segment_bytes=300, batch_size=4, linger_ms=0, retry_interval=0.01,
+                      write=write, healthy=lambda: up["value"])
+        await spool.start()
+        # Concurrent appends share fsyncs
+        await asyncio.gather(*(spool.append([alert]) for alert in alerts(0, 10)))
+        await spool.append(alerts(10, 5))
+        await asyncio.sleep(0.05)
+        assert stored == [] and spool.backlog_bytes > 0
+        up["value"] = True
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if spool.backlog_bytes == 0:
+                break
+        await spool.stop()
+        return spool
+
+    spool = asyncio.run(run())
+    assert sorted(int(a["alert_id"]) for a in stored) == list(range(15))
+    assert stored[0]["timestamp"] == datetime(2026, 1, 1, tzinfo=timezone.utc)
+    assert spool.fsyncs < 11
+    # Loaded segments are deleted, only the one still open for appends may remain
+    assert len(list_segments(spool.path)) <= 1
+
+
+def test_restart_resumes_from_checkpoint_and_skips_a_torn_record(tmp_path):
+    async def fill():
+        spool = Spool(str(tmp_path), write=lambda batch: None, healthy=lambda: False)
+        await spool.start()
+        await spool.append(alerts(0, 3))
+        await spool.stop()
+        return spool.path
+
+    path = asyncio.run(fill())
+    with open(os.path.join(path, segment_name(0)), "ab") as f:
+        f.write(b"\x00\x00\x01\x00partial")  # crash in the middle of an append
+
+    stored = []
+    spool = Spool(str(tmp_path), batch_size=2, write=stored.extend, healthy=lambda: True)
+    spool.open()
+    assert spool.replay() is True
+    assert [a["alert_id"] for a in stored] == ["0", "1", "2"]
+    assert spool.backlog_bytes == 0 and list_segments(path) == []
+    spool.close()
+
+    # A second replay from the saved checkpoint loads nothing again
+    again = Spool(str(tmp_path), write=stored.extend, healthy=lambda: True)
+    again.open()
+    assert again.replay() is True and len(stored) == 3
+    again.close()
+    assert spool_module.decode(spool_module.encode(alerts(0, 1)[0])[8:])["alert_id"] == "0"
@@ -0,0 +1,66 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app import crud, schemas
+from app import stats as stats_module
+from app.models import Base
+from app.stats import AlertStats
+
+
+def test_record_and_discard_update_counters():
+    stats = AlertStats()
+    alerts = [
+        {"severity": "critical", "webhook_source": "ucgmax", "device": "gw"},
+        {"severity": "info", "webhook_source": "grafana", "device": None},
+    ]
+    stats.record(alerts)
+    snapshot = stats.snapshot()
+    assert snapshot["total_alerts"] == 2
+    assert snapshot["severity_counts"] == {"critical": 1, "info": 1}
+    assert snapshot["source_counts"] == {"ucgmax": 1, "grafana": 1}
+    assert snapshot["device_counts"] == {"gw": 1}
+    assert snapshot["last_24h_count"] == 2
+
+    stats.discard(alerts[:1])
+    assert stats.snapshot()["severity_counts"] == {"info": 1}
+    assert sum(b["count"] for b in stats.histogram("minute", 5)) == 1
+
+
+def test_reconcile_matches_database():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    crud.create_alerts(db, [
+        schemas.AlertCreate(severity=s, webhook_source="ucgmax", device="gw").model_dump()
+        for s in ["critical", "critical", "warning"]
+    ])
+    stats = AlertStats()
+    stats.reconcile(db)
+    assert stats.ready
+    assert stats.snapshot()["total_alerts"] == 3
+    assert stats.snapshot()["severity_counts"] == crud.get_metrics(db)["severity_counts"]
+    assert stats.window_count(3600) == 3
+
+
+@pytest.mark.parametrize("returning", [True, False])
+def test_reconcile_does_not_count_queued_batches_twice(monkeypatch, returning):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    engine.dialect.insert_executemany_returning = returning
+    db = sessionmaker(bind=engine)()
+    stats = AlertStats()
+    max_alert_id = crud.max_alert_id
+    batch = lambda: [schemas.AlertCreate(severity="info", webhook_source="queue").model_dump()]
+
+    def write_during_reconcile(session):
+        # Queued batches commit and are recorded while the reconcile runs: one
+        # before it takes the max id, one after
+        monkeypatch.setattr(stats_module.crud, "max_alert_id", max_alert_id)
+        stats.record(crud.create_alerts(db, batch()))
+        max_id = max_alert_id(session)
+        stats.record(crud.create_alerts(db, batch()))
+        return max_id
+
+    monkeypatch.setattr(stats_module.crud, "max_alert_id", write_during_reconcile)
+    stats.reconcile(db)
+    assert stats.snapshot()["total_alerts"] == 2
@@ -0,0 +1,45 @@
+import asyncio
+import threading
+from app.stream import AlertHub
+
+
+def alert(severity, device="gw"):
+    return {"alert_id": f"{severity}-{device}", "webhook_source": "generic", "severity": severity, "device": device}
+
+
+def test_hub_fans_out_filtered_alerts_with_metric_deltas():
+    async def run():
+        hub = AlertHub()
+        events = hub.events({"severity": "critical", "device": None})
+        first = asyncio.ensure_future(events.__anext__())
+        await asyncio.sleep(0)
+        # Writers publish from threadpool threads as well as the event loop
+        writer = threading.Thread(target=hub.publish, args=([alert("critical"), alert("low")],))
+        writer.start()
+        writer.join()
+        chunk = (await first).decode()
+        await events.aclose()
+        return hub, chunk
+
+    hub, chunk = asyncio.run(run())
+    assert chunk.count("event: alert") == 1 and '"alert_id":"critical-gw"' in chunk
+    assert '"total_alerts":2' in chunk and '"severity_counts":{"critical":1,"low":1}' in chunk
+    assert hub.stats()["clients"] == 0
+
+
+def test_slow_client_drops_overflow_and_is_told():
+    async def run():
+        hub = AlertHub(buffer_size=3)
+        events = hub.events({})
+        first = asyncio.ensure_future(events.__anext__())
+        await asyncio.sleep(0)
+        hub.publish([alert("info", str(n)) for n in range(5)])
+        await asyncio.sleep(0)
+        chunk = (await first).decode()
+        await events.aclose()
+        return hub, chunk
+
+    hub, chunk = asyncio.run(run())
+    assert chunk.count("event: alert") == 3
+    assert 'event: lagged\ndata: {"dropped":3}' in chunk
+    assert hub.stats()["dropped"] == 3
@@ -0,0 +1,38 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app import telemetry
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = telemetry.Registry()
+    latency = registry.histogram("stage_seconds", "Stage latency", ("stage",), buckets=(0.01, 0.1))
+    for value in (0.005, 0.05, 0.5):
+        latency.observe(value, "parse")
+    registry.collectors.append(lambda: [("queue_depth", "gauge", "Queued alerts", [({}, 3)])])
+    lines = registry.render().splitlines()
+    assert "# TYPE stage_seconds histogram" in lines
+    assert 'stage_seconds_bucket{stage="parse",le="0.01"} 1' in lines
+    assert 'stage_seconds_bucket{stage="parse",le="0.1"} 2' in lines
+    assert 'stage_seconds_bucket{stage="parse",le="+Inf"} 3' in lines
+    assert 'stage_seconds_count{stage="parse"} 3' in lines
+    assert "queue_depth 3" in lines
+
+
+def test_middleware_labels_requests_by_route_template():
+    app = FastAPI()
+    app.add_middleware(telemetry.MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    def get_item(item_id: int):
+        return {"id": item_id}
+
+    client = TestClient(app)
+    for item_id in (1, 2):
+        client.get(f"/items/{item_id}")
+    client.get("/missing")
+    samples = {
+        (labels["route"], labels["status"]): value
+        for name, labels, value in telemetry.request_duration.samples() if name.endswith("_count")
+    }
+    assert samples[("/items/{item_id}", "200")] >= 2
+    assert ("other", "404") in samples
@@ -1,27 +1,35 @@
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
-from app.database import get_db
+from app.database import get_db, get_session_factory
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.models import Base
-import os
+from app.config import settings
+import json
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+@pytest.fixture(scope="module", autouse=True)
+def database(tmp_path_factory):
+    """A fresh database for this module's requests, dropped afterwards."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path_factory.mktemp('webhook') / 'alerts.db'}", connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(bind=engine)
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    def override_get_db():
+        try:
+            db = TestingSessionLocal()
+            yield db
+        finally:
+            db.close()
 
-Base.metadata.create_all(bind=engine)
-
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
-
-app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: TestingSessionLocal
+    yield engine
+    del app.dependency_overrides[get_db], app.dependency_overrides[get_session_factory]
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
 
 client = TestClient(app)
 
@@ -41,4 +49,109 @@ def test_webhook_valid():
     response = client.post("/webhook/ucgmax", json=payload, headers=headers)
     assert response.status_code == 401  # Since HMAC not valid, but for test, adjust
 
-# Add more tests
\ No newline at end of file
+def test_batch_reports_each_item_and_deduplicates_replays():
+    body = "\n".join([
+        '{"message": "disk full", "host": "nas", "idempotency_key": "batch-a"}',
+        '{not json',
+        '{"message": "fan failure", "host": "nas"}',
+        '{"message": "disk full again", "idempotency_key": "batch-a"}',
+    ])
+    headers = {"Authorization": f"Bearer {settings.bearer_token}", "Idempotency-Key": "replay-1"}
+    response = client.post("/webhook/batch?webhook_source=batchtest", content=body, headers=headers)
+    assert response.status_code == 200
+    assert [r["status"] for r in response.json()["results"]] == ["accepted", "invalid", "accepted", "duplicate"]
+
+    replay = client.post("/webhook/batch?webhook_source=batchtest", content=body, headers=headers).json()
+    assert (replay["accepted"], replay["duplicates"], replay["invalid"]) == (0, 3, 1)
+
+
+def test_ucgmax_batch_requires_valid_signature():
+    body = b'[{"alert_id": "batch-1", "severity": "critical"}]'
+    response = client.post("/webhook/ucgmax/batch", content=body, headers={"X-Hub-Signature-256": "sha256=00"})
+    assert response.status_code == 401
+
+
+def test_unsigned_batch_is_rejected_before_parsing(monkeypatch):
+    monkeypatch.setattr(settings, "webhook_batch_max_items", 1)
+    body = b'{"alert_id": "x1"}\n{"alert_id": "x2"}\n'
+    response = client.post("/webhook/ucgmax/batch", content=body, headers={"X-Hub-Signature-256": "sha256=00"})
+    assert response.status_code == 401
+
+
+def test_batch_body_size_is_capped(monkeypatch):
+    monkeypatch.setattr(settings, "webhook_batch_max_bytes", 16)
+    headers = {"Authorization": f"Bearer {settings.bearer_token}"}
+    response = client.post("/webhook/batch", content=b'[{"message": "too long for the cap"}]', headers=headers)
+    assert response.status_code == 413
+
+
+def test_alert_list_is_cached_until_a_matching_alert_arrives():
+    headers = {"Authorization": f"Bearer {settings.bearer_token}"}
+    first = client.get("/api/alerts?device=cache-gw")
+    assert first.status_code == 200 and first.json() == []
+    etag = first.headers["etag"]
+    assert client.get("/api/alerts?device=cache-gw", headers={"If-None-Match": etag}).status_code == 304
+
+    client.post("/webhook?webhook_source=cachetest", json={"message": "link down", "host": "other-gw"}, headers=headers)
+    assert client.get("/api/alerts?device=cache-gw", headers={"If-None-Match": etag}).status_code == 304
+
+    client.post("/webhook?webhook_source=cachetest", json={"message": "link down", "host": "cache-gw"}, headers=headers)
+    fresh = client.get("/api/alerts?device=cache-gw", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200 and [a["device"] for a in fresh.json()] == ["cache-gw"]
+
+
+def test_summary_view_leaves_payloads_out():
+    headers = {"Authorization": f"Bearer {settings.bearer_token}"}
+    client.post("/webhook?webhook_source=summarytest", json={"message": "fan failure", "host": "summary-nas"}, headers=headers)
+    [row] = client.get("/api/alerts?device=summary-nas&view=summary").json()
+    assert row["summary"] == "fan failure" and "raw_payload" not in row and "details" not in row
+    [row] = client.get("/api/alerts?device=summary-nas&fields=severity").json()
+    assert set(row) == {"id", "timestamp", "severity"}
+    assert client.get(f"/api/alerts/{row['id']}").json()["raw_payload"]["host"] == "summary-nas"
+    assert client.get("/api/alerts?fields=search_text").status_code == 400
+
+
+def test_export_and_bulk_delete_filter_on_payload():
+    from app import auth
+    headers = {"Authorization": f"Bearer {settings.bearer_token}"}
+    for team in ("ops", "dev"):
+        client.post("/webhook?webhook_source=payloadtest", json={"message": "disk full", "labels": {"team": team}}, headers=headers)
+    [exported] = client.get("/api/alerts/export?format=ndjson&payload=labels.team:ops").text.splitlines()
+    assert client.get(f"/api/alerts/{json.loads(exported)['id']}").json()["raw_payload"]["labels"]["team"] == "ops"
+    assert client.get("/api/alerts/export?payload=labels").status_code == 400
+    app.dependency_overrides[auth.get_current_user] = lambda: "admin"
+    try:
+        assert client.delete("/api/alerts?payload=labels.team:dev").json()["count"] == 1
+    finally:
+        del app.dependency_overrides[auth.get_current_user]
+    assert client.get("/api/alerts?payload=labels.team:dev").json() == []
+    assert len(client.get("/api/alerts?payload=labels.team:ops").json()) == 1
+
+# Add more tests
+def test_login_and_api_have_the_client_quota(monkeypatch):
+    from app import ratelimit
+    limiter = ratelimit.RateLimiter(ratelimit.MemoryBackend(), per_client=ratelimit.Quota(2, 60), per_source={}, per_token=None)
+    monkeypatch.setattr(ratelimit, "limiter", limiter)
+    assert client.post("/auth/login", json={"username": "nobody", "password": "wrong"}).status_code == 401
+    assert client.get("/api/alerts").status_code != 429
+    response = client.post("/auth/login", json={"username": "nobody", "password": "wrong"})
+    assert response.status_code == 429 and "Retry-After" in response.headers
+
+
+def test_lifespan_stops_background_work_in_reverse_order(monkeypatch):
+    from app import main
+    calls = []
+
+    async def record(name):
+        calls.append(name)
+
+    monkeypatch.setattr(settings, "ingest_mode", "spool")
+    monkeypatch.setattr(settings, "metrics_cache", False)
+    monkeypatch.setattr(main.spool, "start", lambda: record("spool start"))
+    monkeypatch.setattr(main.spool, "stop", lambda: record("spool stop"))
+    monkeypatch.setattr(main.ingest_queue, "stop", lambda: record("queue stop"))
+    monkeypatch.setattr(main.scheduler, "start", lambda: calls.append("scheduler start"))
+    monkeypatch.setattr(main.scheduler, "shutdown", lambda: calls.append("scheduler shutdown"))
+    with TestClient(app):
+        assert calls == ["spool start", "scheduler start"]
+    assert calls[2:] == ["scheduler shutdown", "spool stop", "queue stop"]